@@ -16,11 +16,17 @@
 
 import logging
 
+from google.auth._default import clear_default_cache
 from google.auth._default import default
+from google.auth._default import enable_default_cache
+from google.auth._json import set_codec as set_json_codec
 
 
 __all__ = [
+    'clear_default_cache',
     'default',
+    'enable_default_cache',
+    'set_json_codec',
 ]
 
 
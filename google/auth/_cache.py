@@ -0,0 +1,128 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory caches used internally by this library."""
+
+import collections
+import threading
+import time
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+"""The statistics of a cache, like :func:`functools.lru_cache`'s."""
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """A thread-safe, size-bounded, least recently used cache.
+
+    Entries can optionally expire, expired entries are treated as missing
+    and removed when they are looked up.
+
+    Args:
+        maxsize (int): The maximum number of entries. When the cache is full
+            the least recently used entry is evicted.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __getstate__(self):
+        """Returns the state to pickle or copy. Only the maximum size is
+        kept, the lock can't be pickled and the entries may not be."""
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        """Restores an empty cache from the pickled or copied state."""
+        self.__init__(state['maxsize'])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Looks up an entry and marks it as the most recently used.
+
+        Args:
+            key (Hashable): The entry's key.
+            default (Any): The value to return if there is no entry.
+
+        Returns:
+            Any: The entry's value, or ``default``.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or (
+                    entry[1] is not None and entry[1] <= time.time()):
+                self._misses += 1
+                return default
+            self._entries[key] = entry
+            self._hits += 1
+            return entry[0]
+
+    def set(self, key, value, expiry=None):
+        """Stores an entry, evicting the least recently used one if needed.
+
+        Args:
+            key (Hashable): The entry's key.
+            value (Any): The entry's value.
+            expiry (Optional[float]): When the entry expires, in seconds
+                since the epoch. If None, it never expires.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expiry)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_create(self, key, factory):
+        """Looks up an entry, creating and storing it if there is none.
+
+        The factory is called without holding the cache's lock, so two
+        threads that miss at the same time may both call it.
+
+        Args:
+            key (Hashable): The entry's key.
+            factory (Callable[[], Any]): Creates the value on a miss.
+
+        Returns:
+            Any: The cached or newly created value.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Removes all entries and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self):
+        """Returns the cache's statistics.
+
+        Returns:
+            CacheInfo: The number of hits and misses and the size of the
+                cache.
+        """
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self.maxsize, len(self._entries))
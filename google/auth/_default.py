@@ -17,11 +17,17 @@
 Implements application default credentials and project ID detection.
 """
 
+import functools
 import io
 import json
 import logging
 import os
+import sys
+import threading
 
+import six
+
+from google.auth import _cache
 from google.auth import environment_vars
 from google.auth import exceptions
 import google.auth.transport._http_client
@@ -41,6 +47,100 @@ information, please see
 https://developers.google.com/accounts/docs/application-default-credentials.
 """.format(env=environment_vars.CREDENTIALS).strip()
 
+# The environment variables that affect the result of default().
+_CACHE_KEY_ENVIRONMENT_VARS = (
+    environment_vars.CREDENTIALS,
+    environment_vars.PROJECT,
+    environment_vars.LEGACY_PROJECT,
+    environment_vars.CLOUD_SDK_CONFIG_DIR,
+    environment_vars.GCE_METADATA_HOST,
+    environment_vars.GCE_METADATA_IP,
+)
+# One entry for each set of scopes an application asks for.
+_DEFAULT_CACHE_SIZE = 16
+
+# None unless enable_default_cache() was called.
+_default_cache = None
+
+# Set by _import_compute_engine().
+_compute_engine_modules = None
+
+
+def enable_default_cache(enabled=True):
+    """Makes :func:`default` remember the credentials it finds.
+
+    Finding the default credentials can involve reading and parsing files
+    and asking the Compute Engine metadata server, which takes up to
+    a few seconds if there is no metadata server. Libraries that call
+    :func:`default` every time they create a client repeat all of that. With
+    the cache enabled, later calls return the same credentials and project ID
+    as long as the scopes, the relevant environment variables and the
+    credential and Cloud SDK configuration files haven't changed.
+
+    The cached credentials are shared by the callers, so they share their
+    access tokens too. Only successful results are cached.
+
+    Args:
+        enabled (bool): Whether to enable or disable the cache. Disabling it
+            also empties it.
+    """
+    global _default_cache
+    if enabled:
+        if _default_cache is None:
+            _default_cache = _cache.LRUCache(_DEFAULT_CACHE_SIZE)
+    else:
+        _default_cache = None
+
+
+def clear_default_cache():
+    """Forgets the credentials remembered by :func:`default`, so that the
+    next call looks for them again."""
+    cache = _default_cache
+    if cache is not None:
+        cache.clear()
+
+
+def _get_mtime(filename):
+    """Returns a file's modification time, or None if it doesn't exist."""
+    if filename is None:
+        return None
+    try:
+        return os.stat(filename).st_mtime
+    except OSError:
+        return None
+
+
+def _make_default_cache_key(scopes):
+    """Makes the key identifying a result of :func:`default`.
+
+    Args:
+        scopes (Optional[Sequence[str]]): The requested scopes.
+
+    Returns:
+        Tuple: The scopes, the relevant environment variables and the
+            modification times of the files that are read.
+    """
+    from google.auth import _cloud_sdk
+
+    config_path = _cloud_sdk.get_config_path()
+    active_config_filename = os.path.join(config_path, 'active_config')
+    config_file = _cloud_sdk._get_config_file(
+        config_path, _cloud_sdk._get_active_config(config_path))
+
+    filenames = (
+        os.environ.get(environment_vars.CREDENTIALS),
+        _cloud_sdk.get_application_default_credentials_path(),
+        active_config_filename,
+        config_file,
+    )
+
+    return (
+        tuple(scopes) if scopes is not None else None,
+        config_path,
+        tuple(os.environ.get(name) for name in _CACHE_KEY_ENVIRONMENT_VARS),
+        tuple((name, _get_mtime(name)) for name in filenames),
+    )
+
 
 def _load_credentials_from_file(filename):
     """Loads credentials from a file.
@@ -161,14 +261,56 @@ def _get_gae_credentials():
         return None, None
 
 
+def _import_compute_engine():
+    """Imports the modules used to check for Compute Engine.
+
+    Only the first call runs the import statements, so that the concurrent
+    Compute Engine check can import the modules before starting its thread,
+    see :func:`_import_lock_held`.
+
+    Returns:
+        Tuple[module, module]: The ``google.auth.compute_engine`` and
+            ``google.auth.compute_engine._metadata`` modules.
+    """
+    global _compute_engine_modules  # pylint: disable=global-statement
+    if _compute_engine_modules is None:
+        from google.auth import compute_engine
+        from google.auth.compute_engine import _metadata
+        _compute_engine_modules = (compute_engine, _metadata)
+    return _compute_engine_modules
+
+
+def _import_lock_held():
+    """Checks if a module is being imported on Python 2.
+
+    Python 2 has a global import lock. If :func:`default` is called while a
+    module is being imported, for example at the top of a module, a thread
+    that imports anything, including the modules that :mod:`six.moves`
+    imports when they are first used, waits for the import to finish. So
+    :func:`default` must not wait for such a thread.
+
+    Returns:
+        bool: True if the global import lock is held.
+    """
+    if not six.PY2:
+        return False
+    import imp
+    return imp.lock_held()
+
+
 def _get_gce_credentials(request=None):
     """Gets credentials and project ID from the GCE Metadata Service."""
     # Ping requires a transport, but we want application default credentials
     # to require no arguments. So, we'll use the _http_client transport which
     # uses http.client. This is only acceptable because the metadata server
     # doesn't do SSL and never requires proxies.
-    from google.auth import compute_engine
-    from google.auth.compute_engine import _metadata
+    compute_engine, _metadata = _import_compute_engine()
+
+    # Waiting for a metadata server that doesn't exist takes seconds, skip
+    # it if the machine certainly isn't a Compute Engine instance.
+    if _metadata.detect_gce_locally() is False:
+        _LOGGER.debug('Not running on Compute Engine.')
+        return None, None
 
     if request is None:
         request = google.auth.transport._http_client.Request()
@@ -189,7 +331,45 @@ def _get_gce_credentials(request=None):
         return None, None
 
 
-def default(scopes=None, request=None):
+class _BackgroundCall(object):
+    """Calls a function on a daemon thread.
+
+    Args:
+        func (Callable[[], Any]): The function to call.
+    """
+
+    def __init__(self, func):
+        self._func = func
+        self._result = None
+        self._exc_info = None
+        self._thread = threading.Thread(
+            target=self._run, name='google-auth-default-probe')
+        # Don't keep the process alive if the result is never needed.
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._result = self._func()
+        except Exception:  # pylint: disable=broad-except
+            self._exc_info = sys.exc_info()
+
+    def result(self):
+        """Waits for the function to return.
+
+        Returns:
+            Any: The function's return value.
+
+        Raises:
+            Exception: The exception raised by the function, if any.
+        """
+        self._thread.join()
+        if self._exc_info is not None:
+            six.reraise(*self._exc_info)
+        return self._result
+
+
+def default(scopes=None, request=None, concurrent=False):
     """Gets the default credentials for the current environment.
 
     `Application Default Credentials`_ provides an easy way to obtain
@@ -249,6 +429,12 @@ def default(scopes=None, request=None):
             HTTP requests. This is used to detect whether the application
             is running on Compute Engine. If not specified, then it will
             use the standard library http client to make requests.
+        concurrent (bool): Whether to check for Compute Engine while the
+            other sources are checked, rather than after them. The sources
+            still take precedence in the order above, but when none of them
+            has credentials the time spent checking them overlaps with the
+            wait for the metadata server. The check for Compute Engine is
+            made even if it isn't needed, on a background thread.
 
     Returns:
         Tuple[~google.auth.credentials.Credentials, Optional[str]]:
@@ -256,6 +442,40 @@ def default(scopes=None, request=None):
             may be None, which indicates that the Project ID could not be
             ascertained from the environment.
 
+    Raises:
+        ~google.auth.exceptions.DefaultCredentialsError:
+            If no credentials were found, or if the credentials found were
+            invalid.
+
+    .. note:: To avoid looking for the credentials on every call, see
+        :func:`enable_default_cache`.
+    """
+    cache = _default_cache
+    if cache is None:
+        return _find_default(scopes, request, concurrent)
+
+    key = _make_default_cache_key(scopes)
+    result = cache.get(key)
+    if result is None:
+        result = _find_default(scopes, request, concurrent)
+        cache.set(key, result)
+    return result
+
+
+def _find_default(scopes, request, concurrent=False):
+    """Finds the default credentials, see :func:`default`.
+
+    Args:
+        scopes (Sequence[str]): The list of scopes for the credentials.
+        request (google.auth.transport.Request): An object used to make
+            HTTP requests.
+        concurrent (bool): Whether to check for Compute Engine concurrently
+            with the other sources.
+
+    Returns:
+        Tuple[~google.auth.credentials.Credentials, Optional[str]]:
+            the current environment's credentials and project ID.
+
     Raises:
         ~google.auth.exceptions.DefaultCredentialsError:
             If no credentials were found, or if the credentials found were
@@ -267,11 +487,21 @@ def default(scopes=None, request=None):
         environment_vars.PROJECT,
         os.environ.get(environment_vars.LEGACY_PROJECT))
 
+    if concurrent and not _import_lock_held():
+        # The other checks only look at the local environment, only the
+        # metadata server ping is slow enough to be worth a thread.
+        _import_compute_engine()
+        gce_check = _BackgroundCall(lambda: _get_gce_credentials(request))
+        get_gce_credentials = gce_check.result
+    else:
+        get_gce_credentials = functools.partial(
+            _get_gce_credentials, request)
+
     checkers = (
         _get_explicit_environ_credentials,
         _get_gcloud_sdk_credentials,
         _get_gae_credentials,
-        lambda: _get_gce_credentials(request))
+        get_gce_credentials)
 
     for checker in checkers:
         credentials, project_id = checker()
@@ -22,6 +22,12 @@ import six
 from six.moves import urllib
 
 
+CLOCK_SKEW_SECS = 10  # 10 seconds
+CLOCK_SKEW = datetime.timedelta(seconds=CLOCK_SKEW_SECS)
+"""datetime.timedelta: How long before its expiry a token is treated as
+expired, to make up for clock differences and request latency."""
+
+
 def copy_docstring(source_class):
     """Decorator that copies a method's docstring from another class.
 
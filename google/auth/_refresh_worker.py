@@ -0,0 +1,201 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Background scheduler used to refresh credentials off the request path."""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+import weakref
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Job(object):
+    """A callback scheduled on a :class:`Scheduler`.
+
+    Args:
+        callback (Callable[[], None]): The function to run.
+    """
+
+    def __init__(self, callback):
+        self._callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        """Prevents the job from running if it hasn't started yet."""
+        self.cancelled = True
+
+    def run(self):
+        """Runs the callback unless the job was cancelled."""
+        if self.cancelled:
+            return
+        try:
+            self._callback()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception('Background refresh job failed.')
+
+
+class Scheduler(object):
+    """Runs callbacks after a delay.
+
+    A single daemon thread waits for the next job to become due and then
+    starts it on its own short-lived daemon thread, so that a slow refresh
+    of one set of credentials doesn't delay the others. The thread is
+    started lazily and restarted in child processes after a fork.
+    """
+
+    def __init__(self):
+        self._init_lock = threading.Lock()
+        self._pid = None
+        self._condition = None
+        self._queue = None
+        self._counter = None
+
+    def _reset_if_needed(self):
+        """(Re)initializes the scheduler's state in the current process."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._init_lock:
+            if self._pid == pid:
+                return
+            # Threads do not survive a fork, so the child starts from
+            # scratch. Jobs scheduled by the parent are dropped.
+            self._condition = threading.Condition()
+            self._queue = []
+            self._counter = itertools.count()
+            thread = threading.Thread(
+                target=self._run, args=(self._condition, self._queue),
+                name='google-auth-refresh-scheduler')
+            thread.daemon = True
+            thread.start()
+            self._pid = pid
+
+    def schedule(self, delay, callback):
+        """Schedules a callback to be run.
+
+        Args:
+            delay (float): The number of seconds to wait before running the
+                callback.
+            callback (Callable[[], None]): The function to run.
+
+        Returns:
+            Job: The scheduled job, which can be cancelled.
+        """
+        self._reset_if_needed()
+        job = Job(callback)
+        with self._condition:
+            heapq.heappush(
+                self._queue,
+                (time.time() + max(delay, 0), next(self._counter), job))
+            self._condition.notify()
+        return job
+
+    @staticmethod
+    def _next_job(condition, queue):
+        """Blocks until the next job is due and removes it from the queue."""
+        with condition:
+            while True:
+                if not queue:
+                    condition.wait()
+                    continue
+                due, _, job = queue[0]
+                remaining = due - time.time()
+                if remaining > 0:
+                    condition.wait(remaining)
+                    continue
+                heapq.heappop(queue)
+                return job
+
+    def _run(self, condition, queue):
+        """The scheduler thread's main loop.
+
+        Args:
+            condition (threading.Condition): Guards ``queue``.
+            queue (List[Tuple[float, int, Job]]): The heap of pending jobs.
+        """
+        while True:
+            job = self._next_job(condition, queue)
+            if job.cancelled:
+                continue
+            worker = threading.Thread(
+                target=job.run, name='google-auth-refresh')
+            worker.daemon = True
+            worker.start()
+
+
+class BackgroundRefresh(object):
+    """Keeps track of the next background refresh of an object.
+
+    At most one refresh is pending at a time. Scheduling a refresh replaces
+    the pending one.
+
+    Args:
+        scheduler (Scheduler): The scheduler used to run the refresh.
+    """
+
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._job = None
+
+    @property
+    def pending(self):
+        """bool: Whether a refresh is scheduled and hasn't started yet."""
+        return self._job is not None
+
+    def schedule(self, target, delay, refresh):
+        """Schedules a refresh, replacing any pending one.
+
+        Args:
+            target (Any): The object to refresh. Only a weak reference is
+                held so that pending refreshes don't keep otherwise unused
+                objects alive.
+            delay (datetime.timedelta): How long to wait before refreshing.
+            refresh (Callable[[Any], None]): Called with ``target`` to
+                refresh it, unless it has been garbage collected.
+        """
+        target_ref = weakref.ref(target)
+        job_holder = []
+
+        def callback():
+            """Runs the scheduled refresh."""
+            with self._lock:
+                if self._job is job_holder[0]:
+                    self._job = None
+            target = target_ref()
+            if target is not None:
+                refresh(target)
+
+        with self._lock:
+            if self._job is not None:
+                self._job.cancel()
+            self._job = self._scheduler.schedule(
+                delay.total_seconds(), callback)
+            job_holder.append(self._job)
+
+    def cancel(self):
+        """Cancels the pending refresh, if any."""
+        with self._lock:
+            if self._job is not None:
+                self._job.cancel()
+                self._job = None
+
+
+DEFAULT_SCHEDULER = Scheduler()
+"""Scheduler: The scheduler shared by all credentials by default."""
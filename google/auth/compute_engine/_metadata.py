@@ -15,26 +15,37 @@
 """Provides helper methods for talking to the Compute Engine metadata server.
 
 See https://cloud.google.com/compute/docs/metadata for more details.
+
+Values that never change while the instance is running, such as the project
+ID and zone, are cached after they are first retrieved. :func:`cache_info`
+reports the cache's hits and misses.
 """
 
 import datetime
-import json
+import io
 import logging
 import os
+import re
+import sys
 
 from six.moves import http_client
 from six.moves.urllib import parse as urlparse
 
+from google.auth import _cache
 from google.auth import _helpers
+from google.auth import _json
+from google.auth import environment_vars
 from google.auth import exceptions
 
 _LOGGER = logging.getLogger(__name__)
 
-_METADATA_ROOT = 'http://metadata.google.internal/computeMetadata/v1/'
+_METADATA_ROOT = 'http://{}/computeMetadata/v1/'.format(
+    os.getenv(environment_vars.GCE_METADATA_HOST, 'metadata.google.internal'))
 
 # This is used to ping the metadata server, it avoids the cost of a DNS
 # lookup.
-_METADATA_IP_ROOT = 'http://169.254.169.254'
+_METADATA_IP_ROOT = 'http://{}'.format(
+    os.getenv(environment_vars.GCE_METADATA_IP, '169.254.169.254'))
 _METADATA_FLAVOR_HEADER = 'metadata-flavor'
 _METADATA_FLAVOR_VALUE = 'Google'
 _METADATA_HEADERS = {_METADATA_FLAVOR_HEADER: _METADATA_FLAVOR_VALUE}
@@ -47,6 +58,72 @@ except ValueError:  # pragma: NO COVER
     _METADATA_DEFAULT_TIMEOUT = 3
 
 
+# Linux exposes the machine's DMI product name here, Compute Engine sets it to
+# 'Google Compute Engine'.
+_SYSFS_ROOT = '/sys'
+_DMI_PRODUCT_NAME_PATH = os.path.join('class', 'dmi', 'id', 'product_name')
+_GOOGLE_PRODUCT_NAME_PREFIX = 'Google'
+
+# The paths whose values are fixed when the instance is created.
+_IMMUTABLE_PATHS = re.compile(
+    r'^(project/(numeric-)?project-id|instance/(id|zone|name|hostname))$')
+# Only a handful of paths are cached.
+_CACHE_SIZE = 64
+
+_CACHE = _cache.LRUCache(_CACHE_SIZE)
+
+
+def cache_info():
+    """Returns the statistics of the metadata cache.
+
+    Returns:
+        google.auth._cache.CacheInfo: The number of hits and misses and the
+            size of the cache.
+    """
+    return _CACHE.info()
+
+
+def clear_cache():
+    """Removes all cached metadata and resets the statistics."""
+    _CACHE.clear()
+
+
+def detect_gce_locally(sysfs_root=_SYSFS_ROOT):
+    """Checks whether this might be Compute Engine without using the network.
+
+    On Linux, the DMI product name of a Compute Engine instance starts with
+    ``Google``. If the product name is something else, this is certainly not
+    Compute Engine and there is no need to wait for the metadata server to
+    not respond.
+
+    Args:
+        sysfs_root (str): Where sysfs is mounted.
+
+    Returns:
+        Optional[bool]: True if this is Compute Engine, False if it is not,
+            or None if that can't be determined locally, for example on
+            other operating systems or if :data:`~google.auth.environment_vars
+            .GCE_METADATA_HOST` or :data:`~google.auth.environment_vars
+            .GCE_METADATA_IP` point to another metadata server.
+    """
+    if (os.environ.get(environment_vars.GCE_METADATA_HOST) or
+            os.environ.get(environment_vars.GCE_METADATA_IP)):
+        return None
+
+    if not sys.platform.startswith('linux'):
+        return None
+
+    product_name_path = os.path.join(sysfs_root, _DMI_PRODUCT_NAME_PATH)
+    try:
+        with io.open(product_name_path, 'r', encoding='utf-8') as file_obj:
+            product_name = file_obj.read().strip()
+    except (IOError, OSError, ValueError):
+        # Containers and sandboxes don't always expose DMI.
+        return None
+
+    return product_name.startswith(_GOOGLE_PRODUCT_NAME_PREFIX)
+
+
 def ping(request, timeout=_METADATA_DEFAULT_TIMEOUT):
     """Checks to see if the metadata server is available.
 
@@ -81,6 +158,11 @@ def ping(request, timeout=_METADATA_DEFAULT_TIMEOUT):
 def get(request, path, root=_METADATA_ROOT, recursive=False):
     """Fetch a resource from the metadata server.
 
+    Immutable values are returned from the cache if possible, see
+    :func:`cache_info`. Access tokens are never cached, the credentials
+    that request them hold on to them and only ask for a new one when the
+    current one must be replaced.
+
     Args:
         request (google.auth.transport.Request): A callable used to make
             HTTP requests.
@@ -108,19 +190,26 @@ def get(request, path, root=_METADATA_ROOT, recursive=False):
 
     url = _helpers.update_query(base_url, query_params)
 
+    cached = _CACHE.get(url)
+    if cached is not None:
+        return cached
+
     response = request(url=url, method='GET', headers=_METADATA_HEADERS)
 
     if response.status == http_client.OK:
         content = _helpers.from_bytes(response.data)
         if response.headers['content-type'] == 'application/json':
             try:
-                return json.loads(content)
+                value = _json.loads(content)
             except ValueError:
                 raise exceptions.TransportError(
                     'Received invalid JSON from the Google Compute Engine'
                     'metadata service: {:.20}'.format(content))
         else:
-            return content
+            value = content
+        if _IMMUTABLE_PATHS.match(path):
+            _CACHE.set(url, value)
+        return value
     else:
         raise exceptions.TransportError(
             'Failed to retrieve {} from the Google Compute Engine'
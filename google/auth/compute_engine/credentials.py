@@ -22,6 +22,7 @@ Engine using the Compute Engine metadata server.
 from google.auth import credentials
 from google.auth import exceptions
 from google.auth.compute_engine import _metadata
+import google.auth.token_cache
 
 
 class Credentials(credentials.Scoped, credentials.Credentials):
@@ -42,35 +43,63 @@ class Credentials(credentials.Scoped, credentials.Credentials):
         :meth:`~google.auth.credentials.ScopedCredentials.has_scopes` will not
         work until the credentials have been refreshed.
 
+    The service account's email and scopes are looked up on the first
+    refresh and remembered, so later refreshes only request a new token. Call
+    :meth:`invalidate_service_account_info` to look them up again, for
+    example after the instance's service account or scopes were changed.
+
     .. _Compute Engine authentication documentation:
         https://cloud.google.com/compute/docs/authentication#using
     """
 
-    def __init__(self, service_account_email='default'):
+    def __init__(self, service_account_email='default', token_cache=None):
         """
         Args:
             service_account_email (str): The service account email to use, or
                 'default'. A Compute Engine instance may have multiple service
                 accounts.
+            token_cache (google.auth.token_cache.TokenCache): A cache
+                consulted before requesting a new access token from the
+                metadata server, and used to store the access tokens that are
+                obtained.
         """
         super(Credentials, self).__init__()
         self._service_account_email = service_account_email
+        self._token_cache = token_cache
+        # The key is based on the account as originally specified, which
+        # (unlike the email address) is known without asking the metadata
+        # server.
+        self._token_cache_key = google.auth.token_cache.make_key(
+            'compute_engine', service_account_email)
+        self._requested_service_account_email = service_account_email
+        self._info_retrieved = False
 
     def _retrieve_info(self, request):
         """Retrieve information about the service account.
 
-        Updates the scopes and retrieves the full service account email.
+        Updates the scopes and retrieves the full service account email. This
+        only talks to the metadata server the first time it is called, or
+        after :meth:`invalidate_service_account_info`.
 
         Args:
             request (google.auth.transport.Request): The object used to make
                 HTTP requests.
         """
+        if self._info_retrieved:
+            return
+
         info = _metadata.get_service_account_info(
             request,
-            service_account=self._service_account_email)
+            service_account=self._requested_service_account_email)
 
         self._service_account_email = info['email']
         self._scopes = info['scopes']
+        self._info_retrieved = True
+
+    def invalidate_service_account_info(self):
+        """Forgets the service account's email and scopes, so that they are
+        looked up again on the next refresh."""
+        self._info_retrieved = False
 
     def refresh(self, request):
         """Refresh the access token and scopes.
@@ -84,6 +113,14 @@ class Credentials(credentials.Scoped, credentials.Credentials):
                 service can't be reached if if the instance has not
                 credentials.
         """
+        if self._token_cache is not None:
+            cached = self._token_cache.get(self._token_cache_key)
+            # A cached token that is the same as the current token is the one
+            # the caller wants to replace.
+            if cached is not None and cached[0] != self.token:
+                self.token, self.expiry = cached
+                return
+
         try:
             self._retrieve_info(request)
             self.token, self.expiry = _metadata.get_service_account_token(
@@ -92,6 +129,10 @@ class Credentials(credentials.Scoped, credentials.Credentials):
         except exceptions.TransportError as exc:
             raise exceptions.RefreshError(exc)
 
+        if self._token_cache is not None:
+            self._token_cache.set(
+                self._token_cache_key, self.token, self.expiry)
+
     @property
     def service_account_email(self):
         """The service account email.
@@ -16,10 +16,26 @@
 """Interfaces for credentials."""
 
 import abc
+import datetime
+import logging
+import random
+import threading
 
 import six
 
 from google.auth import _helpers
+from google.auth import _refresh_worker
+
+_LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_BACKGROUND_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+_DEFAULT_BACKGROUND_REFRESH_JITTER = datetime.timedelta(seconds=30)
+# How long to wait before retrying a failed background refresh.
+_BACKGROUND_REFRESH_RETRY_DELAY = datetime.timedelta(seconds=30)
+_DEFAULT_STALE_MARGIN = datetime.timedelta(minutes=3, seconds=45)
+# How long to keep serving a stale token after refreshing it failed before
+# trying again.
+_STALE_REFRESH_RETRY_DELAY = datetime.timedelta(seconds=30)
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -41,6 +57,16 @@ class Credentials(object):
     construction. Some classes will provide mechanisms to copy the credentials
     with modifications such as :meth:`ScopedCredentials.with_scopes`.
     """
+    # The refresh state is declared here rather than in __init__, so that
+    # subclasses that don't call it and credentials pickled before it
+    # existed still work. _refresh_flight is the refresh (if any) that is in
+    # progress via before_request, guarded by _refresh_lock.
+    _refresh_flight = None
+    _background_refresh = None
+    _stale_margin = None
+    _stale_scheduler = None
+    _stale_retry_at = None
+
     def __init__(self):
         self.token = None
         """str: The bearer token that can be used in HTTP headers to make
@@ -49,15 +75,55 @@ class Credentials(object):
         """Optional[datetime]: When the token expires and is no longer valid.
         If this is None, the token is assumed to never expire."""
 
+    def __getstate__(self):
+        """Returns the state to pickle or copy, without the refresh lock."""
+        state = self.__dict__.copy()
+        # Locks can't be pickled and an in-flight refresh belongs to this
+        # instance only.
+        state.pop('_refresh_lock_instance', None)
+        state.pop('_refresh_flight', None)
+        return state
+
+    @property
+    def _refresh_lock(self):
+        """threading.Lock: The lock guarding the refresh state, created the
+        first time it is used."""
+        lock = self.__dict__.get('_refresh_lock_instance')
+        if lock is None:
+            # setdefault is atomic, so concurrent callers get the same lock.
+            lock = self.__dict__.setdefault(
+                '_refresh_lock_instance', threading.Lock())
+        return lock
+
     @property
     def expired(self):
         """Checks if the credentials are expired.
 
         Note that credentials can be invalid but not expired becaue Credentials
         with :attr:`expiry` set to None is considered to never expire.
+
+        Credentials are considered expired slightly before their
+        :attr:`expiry` to allow for clock skew, so that an expired token is
+        never sent.
         """
-        now = _helpers.utcnow()
-        return self.expiry is not None and self.expiry <= now
+        if self.expiry is None:
+            return False
+        return self.expiry <= _helpers.utcnow() + _helpers.CLOCK_SKEW
+
+    @property
+    def stale(self):
+        """Checks if the credentials should be refreshed soon.
+
+        Stale credentials are still :attr:`valid` but are close to expiring.
+        Unless :meth:`enable_stale_while_revalidate` has been called, this is
+        the same as :attr:`expired`.
+        """
+        if self.expiry is None:
+            return False
+        margin = self._stale_margin
+        if margin is None:
+            margin = _helpers.CLOCK_SKEW
+        return self.expiry <= _helpers.utcnow() + margin
 
     @property
     def valid(self):
@@ -99,7 +165,9 @@ class Credentials(object):
         """Performs credential-specific before request logic.
 
         Refreshes the credentials if necessary, then calls :meth:`apply` to
-        apply the token to the authentication header.
+        apply the token to the authentication header. When several threads
+        share the credentials, only one of them performs the refresh and the
+        others wait for its result.
 
         Args:
             request (google.auth.transport.Request): The object used to make
@@ -113,9 +181,273 @@ class Credentials(object):
         # (Subclasses may use these arguments to ascertain information about
         # the http request.)
         if not self.valid:
-            self.refresh(request)
+            self._refresh_if_needed(request)
+        else:
+            if self._stale_margin is not None and self.stale:
+                self._start_async_refresh(request)
+            if self._background_refresh is not None:
+                self._background_refresh.ensure_scheduled(self, request)
         self.apply(headers)
 
+    def enable_stale_while_revalidate(
+            self, stale_margin=_DEFAULT_STALE_MARGIN, scheduler=None):
+        """Refreshes stale credentials without blocking the request.
+
+        Once enabled, :meth:`before_request` treats the token as having a
+        soft and a hard expiry. Past the soft expiry (``stale_margin`` before
+        :attr:`expiry`) the token is :attr:`stale`: it is still used, and a
+        single asynchronous refresh is started. Only past the hard expiry,
+        when the token is :attr:`expired`, do callers block until the token
+        has been refreshed. A token endpoint that is slow to respond
+        therefore only delays requests if it takes longer than
+        ``stale_margin`` to do so.
+
+        Args:
+            stale_margin (datetime.timedelta): How long before the expiry
+                to start refreshing the token asynchronously. This should be
+                longer than the clock skew allowance used by
+                :attr:`expired`.
+            scheduler (google.auth._refresh_worker.Scheduler): The scheduler
+                used to run the refresh. Defaults to a scheduler shared by all
+                credentials.
+        """
+        self._stale_scheduler = (
+            scheduler if scheduler is not None
+            else _refresh_worker.DEFAULT_SCHEDULER)
+        self._stale_margin = stale_margin
+
+    def _start_async_refresh(self, request):
+        """Starts refreshing the credentials on the stale refresh scheduler,
+        unless a refresh is already in flight or the previous one failed
+        less than ``_STALE_REFRESH_RETRY_DELAY`` ago.
+
+        Args:
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests.
+        """
+        with self._refresh_lock:
+            if self._refresh_flight is not None:
+                return
+            retry_at = self._stale_retry_at
+            if retry_at is not None and _helpers.utcnow() < retry_at:
+                return
+            flight = self._refresh_flight = _RefreshFlight()
+
+        def callback():
+            """Runs the refresh."""
+            try:
+                self._run_refresh(request, flight)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.warning(
+                    'Refreshing stale credentials failed, retrying in %s.',
+                    _STALE_REFRESH_RETRY_DELAY, exc_info=True)
+                self._stale_retry_at = (
+                    _helpers.utcnow() + _STALE_REFRESH_RETRY_DELAY)
+            else:
+                self._stale_retry_at = None
+
+        self._stale_scheduler.schedule(0, callback)
+
+    def enable_background_refresh(
+            self, margin=_DEFAULT_BACKGROUND_REFRESH_MARGIN,
+            jitter=_DEFAULT_BACKGROUND_REFRESH_JITTER, scheduler=None):
+        """Refreshes the credentials in the background before they expire.
+
+        Once enabled, every time the credentials obtain a new token a refresh
+        is scheduled ``margin`` (minus a random amount up to ``jitter``)
+        before its :attr:`expiry`. As long as the background refresh
+        succeeds, :meth:`before_request` never blocks on a refresh after the
+        initial one. The background refresh uses the request object from the
+        most recent :meth:`before_request` call, so it works with
+        :class:`~google.auth.transport.requests.AuthorizedSession`,
+        :class:`~google.auth.transport.urllib3.AuthorizedHttp` and
+        :class:`~google.auth.transport.grpc.AuthMetadataPlugin` without any
+        other changes. Tokens that never expire are never refreshed, and
+        tokens that expire sooner than ``margin`` are refreshed halfway
+        through their remaining lifetime.
+
+        Args:
+            margin (datetime.timedelta): How long before the expiry to
+                refresh.
+            jitter (datetime.timedelta): The maximum random amount of time
+                to refresh earlier than ``margin``. This spreads out the
+                refreshes of credentials that were created together.
+            scheduler (google.auth._refresh_worker.Scheduler): The scheduler
+                used to run the refresh. Defaults to a scheduler shared by all
+                credentials.
+        """
+        self.disable_background_refresh()
+        self._background_refresh = _BackgroundRefresh(
+            margin, jitter,
+            scheduler if scheduler is not None
+            else _refresh_worker.DEFAULT_SCHEDULER)
+
+    def disable_background_refresh(self):
+        """Stops refreshing the credentials in the background."""
+        background_refresh = self._background_refresh
+        self._background_refresh = None
+        if background_refresh is not None:
+            background_refresh.cancel()
+
+    def _refresh_in_background(self, request):
+        """Refreshes the credentials, unless a refresh is already in flight.
+
+        Args:
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests.
+        """
+        with self._refresh_lock:
+            if self._refresh_flight is not None:
+                return
+            flight = self._refresh_flight = _RefreshFlight()
+
+        try:
+            self._run_refresh(request, flight)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.warning(
+                'Background refresh failed, retrying in %s.',
+                _BACKGROUND_REFRESH_RETRY_DELAY, exc_info=True)
+            background_refresh = self._background_refresh
+            if background_refresh is not None:
+                background_refresh.schedule(
+                    self, request, _BACKGROUND_REFRESH_RETRY_DELAY)
+
+    def _refresh_if_needed(self, request, force=False, rejected_token=None):
+        """Refreshes the credentials unless they became valid in the meantime.
+
+        At most one refresh is in flight per credentials instance. If another
+        thread is already refreshing, this waits for that refresh to finish
+        and either returns (if it succeeded) or raises the same exception
+        that the refreshing thread raised.
+
+        Args:
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests.
+            force (bool): Whether to refresh even if the credentials are
+                valid, because a server rejected ``rejected_token``. The
+                credentials are only refreshed if they still have that
+                token, so that when the requests of several threads are
+                rejected only one of them refreshes.
+            rejected_token (str): The token that was rejected.
+
+        Raises:
+            google.auth.exceptions.RefreshError: If the credentials could
+                not be refreshed.
+        """
+        with self._refresh_lock:
+            if force:
+                if self.token != rejected_token:
+                    return
+            elif self.valid:
+                return
+            flight = self._refresh_flight
+            is_leader = flight is None
+            if is_leader:
+                flight = self._refresh_flight = _RefreshFlight()
+
+        if is_leader:
+            self._run_refresh(request, flight)
+        else:
+            flight.wait()
+
+    def _run_refresh(self, request, flight):
+        """Calls :meth:`refresh` on behalf of every caller waiting on the
+        flight.
+
+        Args:
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests.
+            flight (_RefreshFlight): The flight to complete once the refresh
+                has finished.
+        """
+        try:
+            self.refresh(request)
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._refresh_lock:
+                self._refresh_flight = None
+            flight.done.set()
+
+        background_refresh = self._background_refresh
+        if background_refresh is not None:
+            background_refresh.schedule_before_expiry(self, request)
+
+
+class _RefreshFlight(object):
+    """A refresh in progress that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+    def wait(self):
+        """Blocks until the refresh finishes.
+
+        Raises:
+            Exception: The exception raised by the refresh, if it failed.
+        """
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class _BackgroundRefresh(_refresh_worker.BackgroundRefresh):
+    """Keeps track of the next background refresh for a set of credentials.
+
+    Args:
+        margin (datetime.timedelta): How long before the expiry to refresh.
+        jitter (datetime.timedelta): The maximum random amount of time to
+            refresh earlier than ``margin``.
+        scheduler (google.auth._refresh_worker.Scheduler): The scheduler used
+            to run the refresh.
+    """
+
+    def __init__(self, margin, jitter, scheduler):
+        super(_BackgroundRefresh, self).__init__(scheduler)
+        self._margin = margin
+        self._jitter = jitter
+
+    def ensure_scheduled(self, credentials, request):
+        """Schedules a refresh if none is pending."""
+        if not self.pending:
+            self.schedule_before_expiry(credentials, request)
+
+    def schedule_before_expiry(self, credentials, request):
+        """Schedules a refresh ahead of the credentials' current expiry."""
+        expiry = credentials.expiry
+        if expiry is None:
+            return
+        now = _helpers.utcnow()
+        jitter = self._jitter.total_seconds() * random.random()
+        refresh_at = expiry - self._margin - datetime.timedelta(
+            seconds=jitter)
+        delay = refresh_at - now
+        if delay <= datetime.timedelta(0):
+            # The token's lifetime is shorter than the margin. Refresh
+            # halfway through it instead of immediately, which would start
+            # the next refresh as soon as this one returned.
+            delay = (expiry - now) // 2
+        self.schedule(
+            credentials, request,
+            max(delay, _BACKGROUND_REFRESH_RETRY_DELAY))
+
+    # pylint: disable=arguments-differ
+    def schedule(self, credentials, request, delay):
+        """Schedules a refresh, replacing any pending one.
+
+        Args:
+            credentials (Credentials): The credentials to refresh.
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests.
+            delay (datetime.timedelta): How long to wait before refreshing.
+        """
+        # pylint: disable=protected-access
+        super(_BackgroundRefresh, self).schedule(
+            credentials, delay,
+            lambda credentials: credentials._refresh_in_background(request))
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Scoped(object):
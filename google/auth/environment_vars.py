@@ -37,3 +37,15 @@ credentials."""
 CLOUD_SDK_CONFIG_DIR = 'CLOUDSDK_CONFIG'
 """Environment variable defines the location of Google Cloud SDK's config
 files."""
+
+GCE_METADATA_HOST = 'GCE_METADATA_HOST'
+"""Environment variable providing an alternate hostname or host:port to be
+used for the Compute Engine metadata server, for example an emulator.
+
+When this or :data:`GCE_METADATA_IP` is set, :func:`google.auth.default`
+always checks for the metadata server rather than first checking whether the
+machine looks like a Compute Engine instance."""
+
+GCE_METADATA_IP = 'GCE_METADATA_IP'
+"""Environment variable providing an alternate IP address or IP:port to be
+used to check whether the Compute Engine metadata server is available."""
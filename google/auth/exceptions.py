@@ -28,5 +28,27 @@ class RefreshError(GoogleAuthError):
     failed."""
 
 
+class PartialRefreshError(RefreshError):
+    """Used to indicate that some of the credentials that were refreshed
+    together could not be refreshed.
+
+    Args:
+        message (str): The error message.
+        errors (Mapping[Hashable, Exception]): The errors, keyed like the
+            credentials that raised them.
+        credentials (Mapping[Hashable, google.auth.credentials.Credentials]):
+            The credentials that were refreshed.
+    """
+    def __init__(self, message, errors, credentials):
+        super(PartialRefreshError, self).__init__(
+            message, errors, credentials)
+        self.errors = errors
+        """Mapping[Hashable, Exception]: The errors, keyed like the
+        credentials that raised them."""
+        self.credentials = credentials
+        """Mapping[Hashable, google.auth.credentials.Credentials]: The
+        credentials that were refreshed."""
+
+
 class DefaultCredentialsError(GoogleAuthError):
     """Used to indicate that acquiring default credentials failed."""
@@ -20,11 +20,11 @@ API`_'s auth-related functionality.
 """
 
 import base64
-import json
 
 from six.moves import http_client
 
 from google.auth import _helpers
+from google.auth import _json
 from google.auth import crypt
 from google.auth import exceptions
 
@@ -71,7 +71,7 @@ class Signer(crypt.Signer):
         method = 'POST'
         url = _SIGN_BLOB_URI.format(self._service_account_email)
         headers = {}
-        body = json.dumps({
+        body = _json.dumps({
             'bytesToSign': base64.b64encode(message).decode('utf-8'),
         })
 
@@ -84,7 +84,7 @@ class Signer(crypt.Signer):
                 'Error calling the IAM signBytes API: {}'.format(
                     response.data))
 
-        return json.loads(response.data.decode('utf-8'))
+        return _json.loads(response.data)
 
     @property
     def key_id(self):
@@ -28,6 +28,12 @@ To encode a JWT use :func:`encode`::
     payload = {'some': 'payload'}
     encoded = jwt.encode(signer, payload)
 
+To make many JWTs with the same signer and mostly the same claims use an
+:class:`Encoder`, which serializes the header and the fixed claims once::
+
+    encoder = jwt.Encoder(signer, claims={'iss': issuer, 'aud': audience})
+    encoded = encoder.encode({'iat': now, 'exp': expiry})
+
 To decode a JWT and verify claims use :func:`decode`::
 
     claims = jwt.decode(encoded, certs=public_certs)
@@ -36,6 +42,22 @@ You can also skip verification::
 
     claims = jwt.decode(encoded, verify=False)
 
+Services that receive the same token many times can keep the tokens they
+have verified in a :class:`VerifiedTokenCache`, so that verifying a token
+again only costs a cache lookup::
+
+    cache = jwt.VerifiedTokenCache()
+    claims = jwt.decode(encoded, certs=public_certs, cache=cache)
+
+To decode many JWTs at once use :func:`decode_many`, which returns a result
+for every token instead of raising on the first invalid one::
+
+    for claims, error in jwt.decode_many(tokens, certs=public_certs):
+        ...
+
+:func:`decode_parallel` does the same with a pool of processes, to use more
+than one CPU core for very large batches.
+
 .. _rfc7519: https://tools.ietf.org/html/rfc7519
 
 """
@@ -43,9 +65,16 @@ You can also skip verification::
 import base64
 import collections
 import datetime
-import json
+import hashlib
+import itertools
+import multiprocessing
 
+import six
+from six.moves import urllib
+
+from google.auth import _cache
 from google.auth import _helpers
+from google.auth import _json
 from google.auth import _service_account_info
 from google.auth import crypt
 import google.auth.credentials
@@ -53,6 +82,17 @@ import google.auth.credentials
 
 _DEFAULT_TOKEN_LIFETIME_SECS = 3600  # 1 hour in sections
 _CLOCK_SKEW_SECS = 300  # 5 minutes in seconds
+_DEFAULT_VERIFIED_TOKEN_CACHE_SIZE = 1024
+_DEFAULT_MAX_CACHE_SIZE = 10
+# Large enough that sending the tokens to the workers is cheap compared to
+# verifying them.
+_DEFAULT_PARALLEL_CHUNKSIZE = 256
+# How many chunks per worker process decode_parallel submits ahead of the
+# results it has yielded.
+_PARALLEL_CHUNKS_IN_FLIGHT_PER_PROCESS = 2
+# How often, in seconds, decode_parallel checks that its worker processes are
+# still running while it waits for a chunk.
+_PARALLEL_WORKER_CHECK_INTERVAL = 1
 
 
 def encode(signer, payload, header=None, key_id=None):
@@ -81,8 +121,8 @@ def encode(signer, payload, header=None, key_id=None):
         header['kid'] = key_id
 
     segments = [
-        base64.urlsafe_b64encode(json.dumps(header).encode('utf-8')),
-        base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')),
+        base64.urlsafe_b64encode(_json.dumps(header)),
+        base64.urlsafe_b64encode(_json.dumps(payload)),
     ]
 
     signing_input = b'.'.join(segments)
@@ -92,15 +132,173 @@ def encode(signer, payload, header=None, key_id=None):
     return b'.'.join(segments)
 
 
+class Encoder(object):
+    """Makes signed JWTs that share a signer, header and some claims.
+
+    :func:`encode` serializes and base64-encodes the whole token every time.
+    An encoder does that once for the header and the claims that are the
+    same in every token, such as the issuer and audience, so that only the
+    claims that vary, usually ``iat`` and ``exp``, are serialized per token.
+    The tokens use compact JSON, without any whitespace.
+
+    Encoders are immutable and thread-safe, provided the signer is.
+
+    Args:
+        signer (google.auth.crypt.Signer): The signer used to sign the JWTs.
+        claims (Mapping[str, Any]): The claims that are in every JWT.
+        header (Mapping[str, str]): Additional JWT header payload.
+        key_id (str): The key id to add to the JWT header. If the
+            signer has a key id it will be used as the default. If this is
+            specified it will override the signer's key id.
+    """
+
+    def __init__(self, signer, claims=None, header=None, key_id=None):
+        self._signer = signer
+
+        header = dict(header or {})
+        if key_id is None:
+            key_id = signer.key_id
+        header.update({'typ': 'JWT', 'alg': 'RS256'})
+        if key_id is not None:
+            header['kid'] = key_id
+        self._header_segment = base64.urlsafe_b64encode(_json.dumps(header))
+
+        self._claims = dict(claims or {})
+        # The serialized claims without the enclosing braces, ready to be
+        # appended to the serialized per-token claims.
+        self._claims_members = _json.dumps(self._claims)[1:-1]
+
+    def _serialize_payload(self, claims):
+        """Serializes the payload of a JWT.
+
+        Args:
+            claims (Mapping[str, Any]): The per-token claims.
+
+        Returns:
+            bytes: The JSON payload.
+        """
+        if not claims:
+            return b'{' + self._claims_members + b'}'
+
+        if any(name in self._claims for name in claims):
+            payload = self._claims.copy()
+            payload.update(claims)
+            return _json.dumps(payload)
+
+        serialized = _json.dumps(claims)
+        if not self._claims_members:
+            return serialized
+        return serialized[:-1] + b',' + self._claims_members + b'}'
+
+    def encode(self, claims=None):
+        """Makes a signed JWT.
+
+        Args:
+            claims (Mapping[str, Any]): The claims for this JWT only, in
+                addition to the encoder's claims. If a claim is in both, this
+                value is used.
+
+        Returns:
+            bytes: The encoded JWT.
+        """
+        signing_input = b'.'.join((
+            self._header_segment,
+            base64.urlsafe_b64encode(self._serialize_payload(claims))))
+        signature = self._signer.sign(signing_input)
+        return signing_input + b'.' + base64.urlsafe_b64encode(signature)
+
+
 def _decode_jwt_segment(encoded_section):
     """Decodes a single JWT segment."""
     section_bytes = _helpers.padded_urlsafe_b64decode(encoded_section)
     try:
-        return json.loads(section_bytes.decode('utf-8'))
+        return _json.loads(section_bytes)
     except ValueError:
         raise ValueError('Can\'t parse segment: {0}'.format(section_bytes))
 
 
+class _ParsedToken(object):
+    """A JWT split into its segments, which are only decoded when needed.
+
+    The segments are located by index rather than by splitting the token,
+    and each one is only sliced out, which copies it, and decoded the first
+    time it is used. So a token that is rejected because of its header or
+    signature never has its payload copied or parsed.
+
+    Args:
+        token (Union[str, bytes]): The encoded JWT.
+
+    Raises:
+        ValueError: if there are an incorrect amount of segments in the token.
+    """
+    __slots__ = ('_token', '_header_end', '_payload_end', '_header',
+                 '_payload')
+
+    def __init__(self, token):
+        token = _helpers.to_bytes(token)
+        header_end = token.find(b'.')
+        payload_end = token.find(b'.', header_end + 1)
+
+        if (header_end == -1 or payload_end == -1 or
+                token.find(b'.', payload_end + 1) != -1):
+            raise ValueError(
+                'Wrong number of segments in token: {0}'.format(token))
+
+        self._token = token
+        self._header_end = header_end
+        self._payload_end = payload_end
+        self._header = None
+        self._payload = None
+
+    @property
+    def header(self):
+        """Mapping[str, Any]: The decoded header.
+
+        Raises:
+            ValueError: if the header isn't a JSON object or its key ID isn't
+                a string.
+        """
+        if self._header is None:
+            header = _decode_jwt_segment(self._token[:self._header_end])
+            if not isinstance(header, collections.Mapping):
+                raise ValueError(
+                    'Token header is not a JSON object: {!r}'.format(header))
+            key_id = header.get('kid')
+            if key_id is not None and not isinstance(
+                    key_id, six.string_types):
+                raise ValueError('Invalid key ID: {!r}'.format(key_id))
+            self._header = header
+        return self._header
+
+    @property
+    def payload(self):
+        """Mapping[str, Any]: The decoded payload.
+
+        Raises:
+            ValueError: if the payload isn't a JSON object.
+        """
+        if self._payload is None:
+            payload = _decode_jwt_segment(
+                self._token[self._header_end + 1:self._payload_end])
+            if not isinstance(payload, collections.Mapping):
+                raise ValueError(
+                    'Token payload is not a JSON object: {!r}'.format(
+                        payload))
+            self._payload = payload
+        return self._payload
+
+    @property
+    def signed_section(self):
+        """bytes: The encoded header and payload that the signature is for."""
+        return self._token[:self._payload_end]
+
+    @property
+    def signature(self):
+        """bytes: The decoded signature."""
+        return _helpers.padded_urlsafe_b64decode(
+            self._token[self._payload_end + 1:])
+
+
 def _unverified_decode(token):
     """Decodes a token and does no verification.
 
@@ -114,21 +312,9 @@ def _unverified_decode(token):
     Raises:
         ValueError: if there are an incorrect amount of segments in the token.
     """
-    token = _helpers.to_bytes(token)
-
-    if token.count(b'.') != 2:
-        raise ValueError(
-            'Wrong number of segments in token: {0}'.format(token))
-
-    encoded_header, encoded_payload, signature = token.split(b'.')
-    signed_section = encoded_header + b'.' + encoded_payload
-    signature = _helpers.padded_urlsafe_b64decode(signature)
-
-    # Parse segments
-    header = _decode_jwt_segment(encoded_header)
-    payload = _decode_jwt_segment(encoded_payload)
-
-    return header, payload, signed_section, signature
+    parsed = _ParsedToken(token)
+    return (parsed.header, parsed.payload, parsed.signed_section,
+            parsed.signature)
 
 
 def decode_header(token):
@@ -144,8 +330,7 @@ def decode_header(token):
     Returns:
         Mapping: The decoded JWT header.
     """
-    header, _, _, _ = _unverified_decode(token)
-    return header
+    return _ParsedToken(token).header
 
 
 def _verify_iat_and_exp(payload):
@@ -179,33 +364,21 @@ def _verify_iat_and_exp(payload):
         raise ValueError('Token expired, {} < {}'.format(latest, now))
 
 
-def decode(token, certs=None, verify=True, audience=None):
-    """Decode and verify a JWT.
+def _get_certs_to_check(header, certs):
+    """Selects the certificates to verify a token's signature with.
 
     Args:
-        token (str): The encoded JWT.
+        header (Mapping[str, str]): The token's header.
         certs (Union[str, bytes, Mapping[str, Union[str, bytes]]]): The
-            certificate used to validate the JWT signatyre. If bytes or string,
-            it must the the public key certificate in PEM format. If a mapping,
-            it must be a mapping of key IDs to public key certificates in PEM
-            format. The mapping must contain the same key ID that's specified
-            in the token's header.
-        verify (bool): Whether to perform signature and claim validation.
-            Verification is done by default.
-        audience (str): The audience claim, 'aud', that this JWT should
-            contain. If None then the JWT's 'aud' parameter is not verified.
+            certificates, see :func:`decode`.
 
     Returns:
-        Mapping[str, str]: The deserialized JSON payload in the JWT.
+        Union[str, bytes, Sequence[Union[str, bytes]]]: The certificates.
 
     Raises:
-        ValueError: if any verification checks failed.
+        ValueError: If ``certs`` is a mapping that doesn't contain the key ID
+            specified in the header.
     """
-    header, payload, signed_section, signature = _unverified_decode(token)
-
-    if not verify:
-        return payload
-
     # If certs is specified as a dictionary of key IDs to certificates, then
     # use the certificate identified by the key ID in the token header.
     if isinstance(certs, collections.Mapping):
@@ -214,17 +387,24 @@ def decode(token, certs=None, verify=True, audience=None):
             if key_id not in certs:
                 raise ValueError(
                     'Certificate for key id {} not found.'.format(key_id))
-            certs_to_check = [certs[key_id]]
+            return [certs[key_id]]
         # If there's no key id in the header, check against all of the certs.
         else:
-            certs_to_check = certs.values()
+            return certs.values()
     else:
-        certs_to_check = certs
+        return certs
 
-    # Verify that the signature matches the message.
-    if not crypt.verify_signature(signed_section, signature, certs_to_check):
-        raise ValueError('Could not verify token signature.')
 
+def _verify_claims(payload, audience):
+    """Verifies the time and audience claims of a token.
+
+    Args:
+        payload (Mapping[str, str]): The JWT payload.
+        audience (str): The expected audience, or None to skip the check.
+
+    Raises:
+        ValueError: if any checks failed.
+    """
     # Verify the issued at and created times in the payload.
     _verify_iat_and_exp(payload)
 
@@ -236,9 +416,435 @@ def decode(token, certs=None, verify=True, audience=None):
                 'Token has wrong audience {}, expected {}'.format(
                     claim_audience, audience))
 
+
+class VerifiedTokenCache(object):
+    """A cache of the tokens that :func:`decode` has verified.
+
+    A cached token is returned without checking its signature again, as long
+    as the certificate that verified it is still one of the certificates
+    passed to :func:`decode`. Its ``iat`` and ``exp`` claims are checked on
+    every lookup, and it is dropped from the cache once it expires. Tokens are
+    cached by their SHA-256 hash and the expected audience.
+
+    The cache is thread-safe. Its entries are shared with the callers, so the
+    returned claims must not be modified.
+
+    Args:
+        maxsize (int): The maximum number of tokens to cache. When the cache
+            is full, the least recently used token is evicted.
+    """
+
+    def __init__(self, maxsize=_DEFAULT_VERIFIED_TOKEN_CACHE_SIZE):
+        self._cache = _cache.LRUCache(maxsize)
+
+    @staticmethod
+    def _make_key(token, audience):
+        return hashlib.sha256(_helpers.to_bytes(token)).digest(), audience
+
+    def get(self, token, certs, audience):
+        """Looks up a verified token.
+
+        Args:
+            token (Union[str, bytes]): The encoded JWT.
+            certs (Union[str, bytes, Mapping[str, Union[str, bytes]]]): The
+                certificates the token must be verified with, see
+                :func:`decode`.
+            audience (str): The expected audience.
+
+        Returns:
+            Optional[Mapping[str, str]]: The token's payload, or None if the
+                token isn't cached or was verified with a certificate that
+                is no longer in ``certs``.
+
+        Raises:
+            ValueError: If the cached token has expired.
+        """
+        entry = self._cache.get(self._make_key(token, audience))
+        if entry is None:
+            return None
+
+        payload, key_id, cert = entry
+        certs_to_check = _get_certs_to_check({'kid': key_id}, certs)
+        if isinstance(certs_to_check, (six.text_type, six.binary_type)):
+            certs_to_check = [certs_to_check]
+        if not any(_helpers.to_bytes(cert_to_check) == cert
+                   for cert_to_check in certs_to_check):
+            return None
+
+        _verify_iat_and_exp(payload)
+        return payload
+
+    def set(self, token, audience, payload, key_id, cert):
+        """Stores a verified token.
+
+        Args:
+            token (Union[str, bytes]): The encoded JWT.
+            audience (str): The audience it was verified for.
+            payload (Mapping[str, str]): The token's payload.
+            key_id (Optional[str]): The key ID in the token's header.
+            cert (Union[str, bytes]): The certificate that verified the
+                token's signature.
+        """
+        self._cache.set(
+            self._make_key(token, audience),
+            (payload, key_id, _helpers.to_bytes(cert)),
+            expiry=payload['exp'] + _CLOCK_SKEW_SECS)
+
+    def info(self):
+        """Returns the cache's statistics.
+
+        Returns:
+            google.auth._cache.CacheInfo: The number of hits and misses and
+                the size of the cache.
+        """
+        return self._cache.info()
+
+    def clear(self):
+        """Removes all tokens from the cache."""
+        self._cache.clear()
+
+
+def decode(token, certs=None, verify=True, audience=None, cache=None):
+    """Decode and verify a JWT.
+
+    Args:
+        token (str): The encoded JWT.
+        certs (Union[str, bytes, Mapping[str, Union[str, bytes]]]): The
+            certificate used to validate the JWT signatyre. If bytes or string,
+            it must the the public key certificate in PEM format. If a mapping,
+            it must be a mapping of key IDs to public key certificates in PEM
+            format. The mapping must contain the same key ID that's specified
+            in the token's header.
+        verify (bool): Whether to perform signature and claim validation.
+            Verification is done by default.
+        audience (str): The audience claim, 'aud', that this JWT should
+            contain. If None then the JWT's 'aud' parameter is not verified.
+        cache (VerifiedTokenCache): A cache of verified tokens to look the
+            token up in and to add it to once it is verified. Only used if
+            ``verify`` is True.
+
+    Returns:
+        Mapping[str, str]: The deserialized JSON payload in the JWT.
+
+    Raises:
+        ValueError: if any verification checks failed.
+    """
+    if verify and cache is not None:
+        payload = cache.get(token, certs, audience)
+        if payload is not None:
+            return payload
+
+    parsed = _ParsedToken(token)
+
+    if not verify:
+        return parsed.payload
+
+    header = parsed.header
+    certs_to_check = _get_certs_to_check(header, certs)
+    signed_section = parsed.signed_section
+    signature = parsed.signature
+
+    if cache is None:
+        # Verify that the signature matches the message.
+        if not crypt.verify_signature(
+                signed_section, signature, certs_to_check):
+            raise ValueError('Could not verify token signature.')
+        # Only parse the payload of tokens with a valid signature.
+        payload = parsed.payload
+        _verify_claims(payload, audience)
+        return payload
+
+    # Find out which certificate verifies the signature, the cache only
+    # trusts that one.
+    if isinstance(certs_to_check, (six.text_type, six.binary_type)):
+        certs_to_check = [certs_to_check]
+    for cert in certs_to_check:
+        if crypt.verify_signature(signed_section, signature, cert):
+            break
+    else:
+        raise ValueError('Could not verify token signature.')
+
+    payload = parsed.payload
+    _verify_claims(payload, audience)
+    cache.set(token, audience, payload, header.get('kid'), cert)
     return payload
 
 
+DecodeResult = collections.namedtuple('DecodeResult', ['claims', 'error'])
+"""The result of decoding one of the tokens passed to :func:`decode_many`.
+
+Exactly one of ``claims``, the deserialized JSON payload, and ``error``, the
+:class:`ValueError` that :func:`decode` would have raised, is not None.
+"""
+
+
+def decode_many(tokens, certs=None, verify=True, audience=None):
+    """Decode and verify many JWTs.
+
+    This is equivalent to calling :func:`decode` for each token, but it is
+    faster: the verifiers for each key ID are only looked up once, and an
+    invalid token doesn't stop the others from being decoded.
+
+    Args:
+        tokens (Iterable[Union[str, bytes]]): The encoded JWTs.
+        certs (Union[str, bytes, Mapping[str, Union[str, bytes]]]): The
+            certificates used to validate the signatures, see :func:`decode`.
+        verify (bool): Whether to perform signature and claim validation.
+            Verification is done by default.
+        audience (str): The audience claim, 'aud', that the JWTs should
+            contain. If None then the JWTs' 'aud' parameter is not verified.
+
+    Returns:
+        List[DecodeResult]: The result for each token, in the same order as
+            ``tokens``.
+    """
+    # Tokens are signed by a handful of keys, so look up the verifiers once
+    # per key ID rather than once per token.
+    verifiers_by_key_id = {}
+
+    def load_verifier(cert):
+        try:
+            return crypt.RSAVerifier.from_string(cert)
+        except ValueError as exc:
+            # Like decode, only fail if the certificate is actually needed.
+            return exc
+
+    def verify_signature(header, signed_section, signature):
+        key_id = header.get('kid')
+        verifiers = verifiers_by_key_id.get(key_id)
+        if verifiers is None:
+            certs_to_check = _get_certs_to_check(header, certs)
+            if isinstance(certs_to_check, (six.text_type, six.binary_type)):
+                certs_to_check = [certs_to_check]
+            verifiers = [load_verifier(cert) for cert in certs_to_check]
+            verifiers_by_key_id[key_id] = verifiers
+
+        for verifier in verifiers:
+            if isinstance(verifier, ValueError):
+                raise verifier
+            if verifier.verify(signed_section, signature):
+                return True
+        return False
+
+    results = []
+    for token in tokens:
+        try:
+            parsed = _ParsedToken(token)
+
+            if verify:
+                if not verify_signature(
+                        parsed.header, parsed.signed_section,
+                        parsed.signature):
+                    raise ValueError('Could not verify token signature.')
+                payload = parsed.payload
+                _verify_claims(payload, audience)
+            else:
+                payload = parsed.payload
+
+        except ValueError as exc:
+            results.append(DecodeResult(None, exc))
+        else:
+            results.append(DecodeResult(payload, None))
+
+    return results
+
+
+# The certificates and audience of a decode_parallel worker process.
+_worker_certs = None
+_worker_audience = None
+
+
+def _init_decode_worker(certs, audience):
+    """Sets up a :func:`decode_parallel` worker process.
+
+    Args:
+        certs (Union[str, bytes, Mapping[str, Union[str, bytes]]]): The
+            certificates used to validate the signatures.
+        audience (str): The expected audience.
+    """
+    global _worker_certs, _worker_audience  # pylint: disable=global-statement
+    _worker_certs = certs
+    _worker_audience = audience
+
+    # An exception escaping the initializer would make the pool restart the
+    # worker forever. decode_many reports the errors for the tokens instead.
+    try:
+        # Parse the certificates once, up front, rather than while verifying.
+        if isinstance(certs, collections.Mapping):
+            certs = certs.values()
+        elif isinstance(certs, (six.text_type, six.binary_type)):
+            certs = [certs]
+        for cert in certs:
+            try:
+                crypt.RSAVerifier.from_string(cert)
+            except ValueError:
+                pass
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+def _decode_chunk(tokens):
+    """Decodes a chunk of tokens in a :func:`decode_parallel` worker.
+
+    Args:
+        tokens (Sequence[Union[str, bytes]]): The encoded JWTs.
+
+    Returns:
+        List[DecodeResult]: The result for each token.
+    """
+    return decode_many(
+        tokens, certs=_worker_certs, audience=_worker_audience)
+
+
+def _get_chunk_results(async_result, workers):
+    """Waits for a chunk submitted by :func:`decode_parallel`.
+
+    :class:`multiprocessing.Pool` never fails a task whose worker process
+    died, it starts another worker and the task's result never arrives. So
+    the workers are checked while waiting.
+
+    Args:
+        async_result (multiprocessing.pool.AsyncResult): The pending chunk.
+        workers (Sequence[multiprocessing.Process]): The pool's worker
+            processes.
+
+    Returns:
+        List[DecodeResult]: The result for each token in the chunk.
+
+    Raises:
+        RuntimeError: If a worker process exited.
+    """
+    while True:
+        try:
+            return async_result.get(_PARALLEL_WORKER_CHECK_INTERVAL)
+        except multiprocessing.TimeoutError:
+            if any(worker.exitcode is not None for worker in workers):
+                raise RuntimeError(
+                    'A decode_parallel worker process exited unexpectedly.')
+
+
+def _normalize_certs(certs):
+    """Checks the certificates passed to :func:`decode_parallel` and copies
+    them into a type that can be sent to the worker processes.
+
+    Args:
+        certs (Union[str, bytes, Mapping[str, Union[str, bytes]],
+            Iterable[Union[str, bytes]]]): The certificates.
+
+    Returns:
+        Union[str, bytes, Dict[str, Union[str, bytes]],
+            List[Union[str, bytes]]]: The certificates.
+
+    Raises:
+        ValueError: If ``certs`` isn't a certificate, a mapping of key IDs
+            to certificates or an iterable of certificates.
+    """
+    if isinstance(certs, (six.text_type, six.binary_type)):
+        return certs
+
+    if isinstance(certs, collections.Mapping):
+        normalized = dict(certs)
+        values = list(normalized.values())
+    else:
+        try:
+            normalized = values = list(certs)
+        except TypeError:
+            raise ValueError('Invalid certificates: {!r}'.format(certs))
+
+    for cert in values:
+        if not isinstance(cert, (six.text_type, six.binary_type)):
+            raise ValueError('Invalid certificate: {!r}'.format(cert))
+
+    return normalized
+
+
+def _chunks(iterable, size):
+    """Splits an iterable into lists of at most ``size`` items.
+
+    Args:
+        iterable (Iterable[Any]): The items.
+        size (int): The maximum size of a chunk.
+
+    Yields:
+        List[Any]: The chunks.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def decode_parallel(tokens, certs, audience=None, processes=None,
+                    chunksize=_DEFAULT_PARALLEL_CHUNKSIZE):
+    """Decode and verify many JWTs with a pool of processes.
+
+    RSA signature verification is CPU bound, and the pure-Python ``rsa``
+    backend holds the GIL while it runs, so threads can't verify tokens in
+    parallel. This spreads :func:`decode_many` over a pool of worker
+    processes instead. Each worker parses the certificates once when it
+    starts. The results are yielded in order as soon as they are ready,
+    while the workers carry on with the following tokens.
+
+    Only a few chunks per worker are read from ``tokens`` ahead of the
+    results that have been yielded, so ``tokens`` can be a stream of any
+    length. The pool is shut down once the generator is exhausted or
+    closed. On platforms that start processes by importing the main module,
+    such as Windows, this must only be called from code guarded by
+    ``if __name__ == '__main__':``.
+
+    Args:
+        tokens (Iterable[Union[str, bytes]]): The encoded JWTs.
+        certs (Union[str, bytes, Mapping[str, Union[str, bytes]]]): The
+            certificates used to validate the signatures, see :func:`decode`.
+        audience (str): The audience claim, 'aud', that the JWTs should
+            contain. If None then the JWTs' 'aud' parameter is not verified.
+        processes (int): The number of worker processes. Defaults to the
+            number of CPUs.
+        chunksize (int): How many tokens to send to a worker at a time.
+
+    Yields:
+        DecodeResult: The result for each token, in the same order as
+            ``tokens``.
+
+    Raises:
+        ValueError: If ``certs`` is invalid.
+        RuntimeError: If a worker process exited, for example because it ran
+            out of memory or was killed.
+    """
+    # Check the certificates here, where errors can be raised. The worker
+    # processes must not fail to start.
+    certs = _normalize_certs(certs)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    max_in_flight = processes * _PARALLEL_CHUNKS_IN_FLIGHT_PER_PROCESS
+
+    # multiprocessing.Pool rather than concurrent.futures, which isn't
+    # available on Python 2.7 without a backport and can't run an initializer
+    # before Python 3.7. Pool.imap would read all of the tokens up front, so
+    # the chunks are submitted one at a time.
+    pool = multiprocessing.Pool(
+        processes, initializer=_init_decode_worker,
+        initargs=(certs, audience))
+    # The pool replaces the workers that exit, keep the original ones.
+    workers = list(pool._pool)  # pylint: disable=protected-access
+    try:
+        in_flight = collections.deque()
+        for chunk in _chunks(tokens, chunksize):
+            in_flight.append(pool.apply_async(_decode_chunk, (chunk,)))
+            if len(in_flight) >= max_in_flight:
+                for result in _get_chunk_results(
+                        in_flight.popleft(), workers):
+                    yield result
+        while in_flight:
+            for result in _get_chunk_results(in_flight.popleft(), workers):
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 class Credentials(google.auth.credentials.Signing,
                   google.auth.credentials.Credentials):
     """Credentials that use a JWT as the bearer token.
@@ -317,6 +923,8 @@ class Credentials(google.auth.credentials.Signing,
         else:
             self._additional_claims = {}
 
+        self._encoder = None
+
     @classmethod
     def _from_signer_and_info(cls, signer, info, **kwargs):
         """Creates a Credentials instance from a signer and service account
@@ -440,21 +1048,25 @@ class Credentials(google.auth.credentials.Signing,
         Returns:
             Tuple[bytes, datetime]: The encoded JWT and the expiration.
         """
+        # Only the times change from one token to the next, so the rest is
+        # serialized once.
+        if self._encoder is None:
+            claims = {
+                'iss': self._issuer,
+                'sub': self._subject,
+                'aud': self._audience,
+            }
+            claims.update(self._additional_claims)
+            self._encoder = Encoder(self._signer, claims=claims)
+
         now = _helpers.utcnow()
         lifetime = datetime.timedelta(seconds=self._token_lifetime)
         expiry = now + lifetime
 
-        payload = {
-            'iss': self._issuer,
-            'sub': self._subject,
+        jwt = self._encoder.encode({
             'iat': _helpers.datetime_to_secs(now),
             'exp': _helpers.datetime_to_secs(expiry),
-            'aud': self._audience,
-        }
-
-        payload.update(self._additional_claims)
-
-        jwt = encode(self._signer, payload)
+        })
 
         return jwt, expiry
 
@@ -481,3 +1093,276 @@ class Credentials(google.auth.credentials.Signing,
     @_helpers.copy_docstring(google.auth.credentials.Signing)
     def signer(self):
         return self._signer
+
+
+class OnDemandCredentials(
+        google.auth.credentials.Signing,
+        google.auth.credentials.Credentials):
+    """On-demand JWT credentials.
+
+    Like :class:`Credentials`, this class uses a JWT as the bearer token for
+    authentication. However, this class does not require the audience at
+    construction time. Instead, it will generate a new token on-demand for
+    each request using the request URI as the audience. It caches tokens
+    so that multiple requests to the same URI do not incur the overhead
+    of generating a new token every time.
+
+    This behavior is especially useful for `gRPC`_ clients. A gRPC service may
+    have multiple audience and gRPC clients may not know all of the audiences
+    required for accessing a particular service. With these credentials,
+    no knowledge of the audiences is required ahead of time.
+
+    .. _grpc: http://www.grpc.io/
+    """
+
+    def __init__(self, signer, issuer, subject,
+                 additional_claims=None,
+                 token_lifetime=_DEFAULT_TOKEN_LIFETIME_SECS,
+                 max_cache_size=_DEFAULT_MAX_CACHE_SIZE):
+        """
+        Args:
+            signer (google.auth.crypt.Signer): The signer used to sign JWTs.
+            issuer (str): The `iss` claim.
+            subject (str): The `sub` claim.
+            additional_claims (Mapping[str, str]): Any additional claims for
+                the JWT payload.
+            token_lifetime (int): The amount of time in seconds for
+                which the token is valid. Defaults to 1 hour.
+            max_cache_size (int): The maximum number of JWT tokens to keep in
+                cache. Tokens are cached using :class:`google.auth._cache.
+                LRUCache`.
+        """
+        super(OnDemandCredentials, self).__init__()
+        self._signer = signer
+        self._issuer = issuer
+        self._subject = subject
+        self._token_lifetime = token_lifetime
+
+        if additional_claims is not None:
+            self._additional_claims = additional_claims
+        else:
+            self._additional_claims = {}
+
+        self._cache = _cache.LRUCache(max_cache_size)
+        self._encoder = None
+
+    @classmethod
+    def _from_signer_and_info(cls, signer, info, **kwargs):
+        """Creates an OnDemandCredentials instance from a signer and service
+        account info.
+
+        Args:
+            signer (google.auth.crypt.Signer): The signer used to sign JWTs.
+            info (Mapping[str, str]): The service account info.
+            kwargs: Additional arguments to pass to the constructor.
+
+        Returns:
+            google.auth.jwt.OnDemandCredentials: The constructed credentials.
+
+        Raises:
+            ValueError: If the info is not in the expected format.
+        """
+        kwargs.setdefault('subject', info['client_email'])
+        kwargs.setdefault('issuer', info['client_email'])
+        return cls(signer, **kwargs)
+
+    @classmethod
+    def from_service_account_info(cls, info, **kwargs):
+        """Creates an OnDemandCredentials instance from a dictionary.
+
+        Args:
+            info (Mapping[str, str]): The service account info in Google
+                format.
+            kwargs: Additional arguments to pass to the constructor.
+
+        Returns:
+            google.auth.jwt.OnDemandCredentials: The constructed credentials.
+
+        Raises:
+            ValueError: If the info is not in the expected format.
+        """
+        signer = _service_account_info.from_dict(
+            info, require=['client_email'])
+        return cls._from_signer_and_info(signer, info, **kwargs)
+
+    @classmethod
+    def from_service_account_file(cls, filename, **kwargs):
+        """Creates an OnDemandCredentials instance from a service account .json
+        file in Google format.
+
+        Args:
+            filename (str): The path to the service account .json file.
+            kwargs: Additional arguments to pass to the constructor.
+
+        Returns:
+            google.auth.jwt.OnDemandCredentials: The constructed credentials.
+        """
+        info, signer = _service_account_info.from_filename(
+            filename, require=['client_email'])
+        return cls._from_signer_and_info(signer, info, **kwargs)
+
+    @classmethod
+    def from_signing_credentials(cls, credentials, **kwargs):
+        """Creates a new :class:`google.auth.jwt.OnDemandCredentials` instance
+        from an existing :class:`google.auth.credentials.Signing` instance.
+
+        The new instance will use the same signer as the existing instance and
+        will use the existing instance's signer email as the issuer and
+        subject by default.
+
+        Example::
+
+            svc_creds = service_account.Credentials.from_service_account_file(
+                'service_account.json')
+            jwt_creds = jwt.OnDemandCredentials.from_signing_credentials(
+                svc_creds)
+
+        Args:
+            credentials (google.auth.credentials.Signing): The credentials to
+                use to construct the new credentials.
+            kwargs: Additional arguments to pass to the constructor.
+
+        Returns:
+            google.auth.jwt.OnDemandCredentials: A new credentials instance.
+        """
+        kwargs.setdefault('issuer', credentials.signer_email)
+        kwargs.setdefault('subject', credentials.signer_email)
+        return cls(credentials.signer, **kwargs)
+
+    def with_claims(self, issuer=None, subject=None, additional_claims=None):
+        """Returns a copy of these credentials with modified claims.
+
+        Args:
+            issuer (str): The `iss` claim. If unspecified the current issuer
+                claim will be used.
+            subject (str): The `sub` claim. If unspecified the current subject
+                claim will be used.
+            additional_claims (Mapping[str, str]): Any additional claims for
+                the JWT payload. This will be merged with the current
+                additional claims.
+
+        Returns:
+            google.auth.jwt.OnDemandCredentials: A new credentials instance.
+        """
+        new_additional_claims = self._additional_claims.copy()
+        new_additional_claims.update(additional_claims or {})
+
+        return OnDemandCredentials(
+            self._signer,
+            issuer=issuer if issuer is not None else self._issuer,
+            subject=subject if subject is not None else self._subject,
+            additional_claims=new_additional_claims,
+            token_lifetime=self._token_lifetime,
+            max_cache_size=self._cache.maxsize)
+
+    @property
+    def valid(self):
+        """Checks the validity of the credentials.
+
+        These credentials are always valid because it generates tokens on
+        demand.
+        """
+        return True
+
+    def _make_jwt_for_audience(self, audience):
+        """Make a new JWT for the given audience.
+
+        Args:
+            audience (str): The intended audience.
+
+        Returns:
+            Tuple[bytes, datetime]: The encoded JWT and the expiration.
+        """
+        if self._encoder is None:
+            claims = {
+                'iss': self._issuer,
+                'sub': self._subject,
+            }
+            claims.update(self._additional_claims)
+            self._encoder = Encoder(self._signer, claims=claims)
+
+        now = _helpers.utcnow()
+        lifetime = datetime.timedelta(seconds=self._token_lifetime)
+        expiry = now + lifetime
+
+        jwt = self._encoder.encode({
+            'iat': _helpers.datetime_to_secs(now),
+            'exp': _helpers.datetime_to_secs(expiry),
+            'aud': audience,
+        })
+
+        return jwt, expiry
+
+    def _get_jwt_for_audience(self, audience):
+        """Get a JWT For a given audience.
+
+        If there is already an existing, non-expired token in the cache for
+        the audience, that token is used. Otherwise, a new token will be
+        created and cached until shortly before it expires.
+
+        Args:
+            audience (str): The intended audience.
+
+        Returns:
+            bytes: The encoded JWT.
+        """
+        token = self._cache.get(audience)
+
+        if token is None:
+            token, expiry = self._make_jwt_for_audience(audience)
+            # Stop using the token a little early, like Credentials.expired,
+            # so that an expired token is never sent.
+            self._cache.set(
+                audience, token,
+                expiry=_helpers.datetime_to_secs(expiry) -
+                _helpers.CLOCK_SKEW_SECS)
+
+        return token
+
+    def refresh(self, request):
+        """Forgets the cached tokens, so that new ones are made for the
+        following requests.
+
+        Transports call this when a request was rejected with the token,
+        before they retry it.
+
+        Args:
+            request (Any): Unused.
+        """
+        # pylint: disable=unused-argument
+        # (pylint doesn't correctly recognize overridden methods.)
+        self._cache.clear()
+
+    def before_request(self, request, method, url, headers):
+        """Performs credential-specific before request logic.
+
+        Args:
+            request (Any): Unused. JWT credentials do not need to make an
+                HTTP request to refresh.
+            method (str): The request's HTTP method.
+            url (str): The request's URI. This is used as the audience claim
+                when generating the JWT.
+            headers (Mapping): The request's headers.
+        """
+        # pylint: disable=unused-argument
+        # (pylint doesn't correctly recognize overridden methods.)
+        parts = urllib.parse.urlsplit(url)
+        # Strip query string and fragment
+        audience = urllib.parse.urlunsplit(
+            (parts.scheme, parts.netloc, parts.path, None, None))
+        token = self._get_jwt_for_audience(audience)
+        self.apply(headers, token=token)
+
+    @_helpers.copy_docstring(google.auth.credentials.Signing)
+    def sign_bytes(self, message):
+        return self._signer.sign(message)
+
+    @property
+    @_helpers.copy_docstring(google.auth.credentials.Signing)
+    def signer_email(self):
+        return self._issuer
+
+    @property
+    @_helpers.copy_docstring(google.auth.credentials.Signing)
+    def signer(self):
+        return self._signer
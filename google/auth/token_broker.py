@@ -0,0 +1,316 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local token broker.
+
+A token broker is a long-running process that holds a set of credentials,
+such as a service account private key or access to the Compute Engine
+metadata server, and hands out access tokens to other processes on the same
+host over a Unix domain socket. Only the broker signs assertions and talks to
+the token endpoint, no matter how many short-lived client processes there
+are, and the clients never need access to the private key.
+
+To run a broker for the application default credentials::
+
+    $ python -m google.auth.token_broker --socket /run/myapp/token.sock \\
+        --scopes https://www.googleapis.com/auth/cloud-platform
+
+Or, to run it from Python with any credentials::
+
+    broker = token_broker.TokenBroker(
+        '/run/myapp/token.sock', credentials, request)
+    broker.serve_forever()
+
+Clients use :class:`Credentials`, which work like any other credentials::
+
+    credentials = token_broker.Credentials('/run/myapp/token.sock')
+    authed_session = AuthorizedSession(credentials)
+
+This module requires Unix domain sockets and is not available on Windows.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import socket
+import stat
+import threading
+
+from six.moves import socketserver
+
+from google.auth import _helpers
+from google.auth import credentials
+from google.auth import exceptions
+
+_LOGGER = logging.getLogger(__name__)
+
+# The broker's responses are small, this is only a sanity limit.
+_MAX_MESSAGE_BYTES = 64 * 1024
+_DEFAULT_TIMEOUT_SECS = 30
+
+
+def _read_message(sock_file):
+    """Reads a newline-terminated JSON message.
+
+    Args:
+        sock_file (io.BufferedIOBase): The socket's file object.
+
+    Returns:
+        Mapping[str, Any]: The decoded message.
+
+    Raises:
+        ValueError: If the message could not be decoded.
+    """
+    line = sock_file.readline(_MAX_MESSAGE_BYTES)
+    if not line.endswith(b'\n'):
+        raise ValueError('Incomplete message.')
+    return json.loads(line.decode('utf-8'))
+
+
+def _write_message(sock_file, message):
+    """Writes a newline-terminated JSON message.
+
+    Args:
+        sock_file (io.BufferedIOBase): The socket's file object.
+        message (Mapping[str, Any]): The message to send.
+    """
+    sock_file.write(json.dumps(message).encode('utf-8') + b'\n')
+    sock_file.flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles a single token request."""
+
+    def handle(self):
+        try:
+            message = _read_message(self.rfile)
+            response = self.server.broker.get_token(
+                rejected_token=message.get('rejected_token'))
+        except exceptions.GoogleAuthError as exc:
+            _LOGGER.warning('Failed to obtain a token: %s', exc)
+            response = {'error': str(exc)}
+        except (ValueError, AttributeError) as exc:
+            response = {'error': 'Invalid request: {}'.format(exc)}
+
+        _write_message(self.wfile, response)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A threaded Unix domain socket server that knows its broker."""
+    daemon_threads = True
+
+    def __init__(self, socket_path, broker):
+        self.broker = broker
+        # The socket is bound but doesn't listen yet, see TokenBroker.
+        socketserver.UnixStreamServer.__init__(
+            self, socket_path, _RequestHandler, bind_and_activate=False)
+        try:
+            self.server_bind()
+        except Exception:
+            self.server_close()
+            raise
+
+
+class TokenBroker(object):
+    """Serves access tokens to local processes over a Unix domain socket.
+
+    Args:
+        socket_path (str): The path to create the socket at. An existing
+            socket at this path is replaced, but any other kind of file
+            isn't.
+        credentials (google.auth.credentials.Credentials): The credentials
+            used to obtain the access tokens.
+        request (google.auth.transport.Request): The object used to make
+            HTTP requests when refreshing the credentials.
+        socket_mode (int): The permissions of the socket. Anyone that can
+            connect to the socket can obtain access tokens, so by default only
+            the current user can.
+    """
+
+    def __init__(self, socket_path, credentials, request, socket_mode=0o600):
+        self._credentials = credentials
+        self._request = request
+        self._lock = threading.Lock()
+        self.socket_path = socket_path
+
+        try:
+            if stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                os.unlink(socket_path)
+        except OSError:
+            pass
+
+        # The socket is created with the permissions allowed by the umask.
+        # Nobody can connect to it until it listens, so its mode is changed
+        # in between. Changing the umask instead would affect the files that
+        # other threads create at the same time.
+        self._server = _Server(socket_path, self)
+        try:
+            os.chmod(socket_path, socket_mode)
+            self._server.server_activate()
+        except Exception:
+            self._server.server_close()
+            raise
+
+    def get_token(self, rejected_token=None):
+        """Returns a valid access token, refreshing the credentials if needed.
+
+        Args:
+            rejected_token (Optional[str]): A token that the client could not
+                use. If it is the current token, the credentials are refreshed
+                even if they appear to be valid.
+
+        Returns:
+            Mapping[str, Any]: The response for the client, containing the
+                ``access_token`` and its ``expiry`` in seconds since the
+                epoch.
+
+        Raises:
+            google.auth.exceptions.RefreshError: If the credentials could not
+                be refreshed.
+        """
+        with self._lock:
+            if (not self._credentials.valid or
+                    self._credentials.token == rejected_token):
+                self._credentials.refresh(self._request)
+            token = self._credentials.token
+            expiry = self._credentials.expiry
+
+        return {
+            'access_token': _helpers.from_bytes(token),
+            'expiry': (_helpers.datetime_to_secs(expiry)
+                       if expiry is not None else None),
+        }
+
+    def serve_forever(self, poll_interval=0.5):
+        """Handles requests until :meth:`shutdown` is called.
+
+        Args:
+            poll_interval (float): How often, in seconds, to check whether
+                :meth:`shutdown` was called.
+        """
+        self._server.serve_forever(poll_interval=poll_interval)
+
+    def shutdown(self):
+        """Stops :meth:`serve_forever`. Must be called from another thread."""
+        self._server.shutdown()
+
+    def close(self):
+        """Closes the socket and removes it from the file system."""
+        self._server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class Credentials(credentials.Credentials):
+    """Credentials that obtain access tokens from a :class:`TokenBroker`.
+
+    Args:
+        socket_path (str): The path of the broker's socket.
+        timeout (float): How many seconds to wait for the broker to respond.
+    """
+
+    def __init__(self, socket_path, timeout=_DEFAULT_TIMEOUT_SECS):
+        super(Credentials, self).__init__()
+        self._socket_path = socket_path
+        self._timeout = timeout
+
+    def _request_token(self):
+        """Asks the broker for an access token.
+
+        Returns:
+            Mapping[str, Any]: The broker's response.
+
+        Raises:
+            google.auth.exceptions.RefreshError: If the broker could not be
+                reached or returned an invalid response.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self._timeout)
+            sock.connect(self._socket_path)
+            sock_file = sock.makefile('rwb')
+            try:
+                _write_message(sock_file, {'rejected_token': self.token})
+                return _read_message(sock_file)
+            finally:
+                sock_file.close()
+        except (socket.error, ValueError) as exc:
+            raise exceptions.RefreshError(
+                'Could not obtain a token from the broker at {}: {}'.format(
+                    self._socket_path, exc))
+        finally:
+            sock.close()
+
+    def refresh(self, request):
+        """Refreshes the access token by asking the broker.
+
+        Args:
+            request (Any): Unused, the broker makes the HTTP requests.
+
+        Raises:
+            google.auth.exceptions.RefreshError: If the broker could not be
+                reached or could not obtain a token.
+        """
+        # pylint: disable=unused-argument
+        # (pylint doesn't correctly recognize overridden methods.)
+        response = self._request_token()
+
+        if 'error' in response:
+            raise exceptions.RefreshError(response['error'], response)
+
+        try:
+            token = response['access_token']
+            expiry_secs = response['expiry']
+        except KeyError:
+            raise exceptions.RefreshError(
+                'No access token in response.', response)
+
+        self.token = token
+        self.expiry = (datetime.datetime.utcfromtimestamp(expiry_secs)
+                       if expiry_secs is not None else None)
+
+
+def main(argv=None):
+    """Runs a token broker for the application default credentials.
+
+    Args:
+        argv (Sequence[str]): The command line arguments, defaults to
+            ``sys.argv``.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--socket', required=True, help='The path to create the socket at.')
+    parser.add_argument(
+        '--scopes', nargs='*', help='The scopes to request, if needed.')
+    args = parser.parse_args(argv)
+
+    # These are imported here so the client doesn't depend on them.
+    import google.auth
+    import google.auth.transport.requests
+
+    default_credentials, _ = google.auth.default(scopes=args.scopes)
+    broker = TokenBroker(
+        args.socket, default_credentials,
+        google.auth.transport.requests.Request())
+
+    try:
+        broker.serve_forever()
+    finally:
+        broker.close()
+
+
+if __name__ == '__main__':  # pragma: NO COVER
+    main()
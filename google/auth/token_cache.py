@@ -0,0 +1,254 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Caches for sharing access tokens between credentials.
+
+Credentials that support a token cache, such as
+:class:`google.oauth2.service_account.Credentials` and
+:class:`google.auth.compute_engine.Credentials`, look up a valid token in the
+cache before asking the token endpoint or metadata server for a new one, and
+store the tokens they obtain in it.
+
+:class:`MemoryTokenCache` keeps the most recently used tokens in memory.
+Service account credentials use one by default and share it with the
+credentials created by their ``with_scopes`` and ``with_subject`` methods, so
+that credentials for the same subject and scopes reuse each other's tokens::
+
+    credentials = service_account.Credentials.from_service_account_file(
+        'service-account.json', scopes=['email'])
+
+    for user in users:
+        # Only the first refresh for each user requests a token, later
+        # credentials for the same user reuse it until it expires.
+        send_report(credentials.with_subject(user), user)
+
+:class:`SQLiteTokenCache` stores tokens in a local file so that every process
+on a host can share them. This is useful for pre-fork servers such as
+gunicorn or uWSGI, where each worker would otherwise obtain its own tokens::
+
+    from google.auth import token_cache
+    from google.oauth2 import service_account
+
+    cache = token_cache.SQLiteTokenCache('/var/run/myapp/tokens.db')
+    credentials = service_account.Credentials.from_service_account_file(
+        'service-account.json', token_cache=cache)
+
+.. warning:: The cache file contains access tokens. Anyone who can read it
+    can act as the credentials' identity, so keep it in a directory that is
+    only accessible to the application.
+"""
+
+import abc
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+
+import six
+
+from google.auth import _cache
+from google.auth import _helpers
+
+# How long to wait for another process to release the database lock.
+_SQLITE_TIMEOUT_SECS = 5
+# Access tokens are small, this is enough for a worker that acts on behalf of
+# many users without using more than a few megabytes.
+_DEFAULT_MEMORY_CACHE_SIZE = 10000
+
+
+def make_key(*parts):
+    """Makes a cache key that identifies a token.
+
+    Args:
+        parts (Any): JSON-serializable values that identify the token, such
+            as the credentials' type, identity, scopes and subject.
+
+    Returns:
+        str: The cache key.
+    """
+    serialized = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def _is_usable(expiry):
+    """Checks if a token with the given expiry can still be used.
+
+    Args:
+        expiry (Optional[datetime]): The token's expiry.
+
+    Returns:
+        bool: True if the token doesn't expire or won't expire soon.
+    """
+    return (expiry is None or
+            expiry > _helpers.utcnow() + _helpers.CLOCK_SKEW)
+
+
+@six.add_metaclass(abc.ABCMeta)
+class TokenCache(object):
+    """Interface for access token caches."""
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Looks up a token.
+
+        Args:
+            key (str): The cache key, see :func:`make_key`.
+
+        Returns:
+            Optional[Tuple[str, Optional[datetime]]]: The token and its
+                expiry, or None if the cache has no usable token for the key.
+        """
+        # pylint: disable=missing-raises-doc,redundant-returns-doc
+        # (pylint doesn't recognize that this is abstract)
+        raise NotImplementedError('get must be implemented.')
+
+    @abc.abstractmethod
+    def set(self, key, token, expiry):
+        """Stores a token.
+
+        Args:
+            key (str): The cache key, see :func:`make_key`.
+            token (str): The access token.
+            expiry (Optional[datetime]): When the token expires.
+        """
+        # pylint: disable=missing-raises-doc
+        # (pylint doesn't recognize that this is abstract)
+        raise NotImplementedError('set must be implemented.')
+
+
+class MemoryTokenCache(TokenCache):
+    """A thread-safe, in-memory token cache.
+
+    When the cache is full the least recently used token is evicted. Tokens
+    are dropped once they are about to expire.
+
+    Args:
+        maxsize (int): The maximum number of tokens to keep.
+    """
+
+    def __init__(self, maxsize=_DEFAULT_MEMORY_CACHE_SIZE):
+        self._cache = _cache.LRUCache(maxsize)
+
+    def __len__(self):
+        return len(self._cache)
+
+    @_helpers.copy_docstring(TokenCache)
+    def get(self, key):
+        cached = self._cache.get(key)
+        if cached is None or not _is_usable(cached[1]):
+            return None
+        return cached
+
+    @_helpers.copy_docstring(TokenCache)
+    def set(self, key, token, expiry):
+        evict_at = (
+            _helpers.datetime_to_secs(expiry - _helpers.CLOCK_SKEW)
+            if expiry is not None else None)
+        self._cache.set(key, (token, expiry), expiry=evict_at)
+
+    def clear(self):
+        """Removes all tokens and resets the statistics."""
+        self._cache.clear()
+
+    def info(self):
+        """Returns the cache's statistics.
+
+        Returns:
+            google.auth._cache.CacheInfo: The number of hits and misses and
+                the size of the cache.
+        """
+        return self._cache.info()
+
+
+class SQLiteTokenCache(TokenCache):
+    """A token cache stored in a local SQLite database.
+
+    The database is safe to use from multiple threads and processes at the
+    same time, SQLite's file locking serializes the writes. A new connection
+    is opened for every operation so that instances can be shared with
+    forked child processes.
+
+    Args:
+        path (str): The path of the database file. It is created, readable
+            only by the current user, if it doesn't exist.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._initialized = False
+
+    def _connect(self):
+        """Opens a connection to the database, creating it if necessary.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        if not self._initialized:
+            # Create the file ourselves so that only the current user can
+            # read the tokens.
+            os.close(os.open(self._path, os.O_CREAT | os.O_RDWR, 0o600))
+
+        connection = sqlite3.connect(
+            self._path, timeout=_SQLITE_TIMEOUT_SECS)
+
+        if not self._initialized:
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS tokens ('
+                    'key TEXT PRIMARY KEY, token TEXT NOT NULL, '
+                    'expiry INTEGER)')
+            self._initialized = True
+
+        return connection
+
+    @_helpers.copy_docstring(TokenCache)
+    def get(self, key):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT token, expiry FROM tokens WHERE key = ?',
+                (key,)).fetchone()
+        finally:
+            connection.close()
+
+        if row is None:
+            return None
+
+        token, expiry_secs = row
+        expiry = (datetime.datetime.utcfromtimestamp(expiry_secs)
+                  if expiry_secs is not None else None)
+
+        if not _is_usable(expiry):
+            return None
+
+        return token, expiry
+
+    @_helpers.copy_docstring(TokenCache)
+    def set(self, key, token, expiry):
+        expiry_secs = (_helpers.datetime_to_secs(expiry)
+                       if expiry is not None else None)
+        now_secs = _helpers.datetime_to_secs(_helpers.utcnow())
+
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO tokens (key, token, expiry) '
+                    'VALUES (?, ?, ?)', (key, token, expiry_secs))
+                # Drop expired tokens so the file doesn't grow forever.
+                connection.execute(
+                    'DELETE FROM tokens WHERE expiry < ?', (now_secs,))
+        finally:
+            connection.close()
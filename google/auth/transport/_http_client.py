@@ -12,10 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Transport adapter for http.client, for internal use only."""
+"""Transport adapter for http.client, for internal use only.
 
+Connections are kept open and reused for later requests to the same host,
+which saves a TCP handshake per request. This matters for the Compute Engine
+metadata server, which :func:`google.auth.default` and the Compute Engine
+credentials query with this transport.
+"""
+
+import errno
 import logging
+import os
 import socket
+import threading
+import time
 
 from six.moves import http_client
 from six.moves import urllib
@@ -25,6 +35,177 @@ from google.auth import transport
 
 _LOGGER = logging.getLogger(__name__)
 
+_CONNECTION_CLASSES = {
+    'http': http_client.HTTPConnection,
+    'https': http_client.HTTPSConnection,
+}
+# Requests from a single process rarely overlap, a few idle connections per
+# host are enough.
+_DEFAULT_MAX_IDLE_PER_HOST = 4
+# Servers close idle keep-alive connections after a while, connections that
+# have been idle for longer are likely closed and are discarded.
+_DEFAULT_IDLE_TIMEOUT_SECS = 30
+# The errors raised when writing to or reading from a connection that the
+# server has already closed.
+_CLOSED_CONNECTION_ERRNOS = frozenset([errno.ECONNRESET, errno.EPIPE])
+
+
+def _set_timeout(connection, timeout):
+    """Sets the timeout of a new or reused connection.
+
+    Args:
+        connection (http.client.HTTPConnection): The connection.
+        timeout (Union[float, object]): The timeout in seconds, or
+            ``socket._GLOBAL_DEFAULT_TIMEOUT``.
+    """
+    if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+        timeout = socket.getdefaulttimeout()
+    connection.timeout = timeout
+    if connection.sock is not None:
+        connection.sock.settimeout(timeout)
+
+
+def _is_closed_connection_error(exc):
+    """Checks if a request failed because the server had closed the
+    connection before the request was sent.
+
+    Only these requests can safely be sent again. Others, such as requests
+    that timed out, may have reached the server.
+
+    Args:
+        exc (Union[http.client.HTTPException, socket.error]): The error.
+
+    Returns:
+        bool: True if the connection was closed by the server.
+    """
+    if isinstance(exc, socket.timeout):
+        return False
+    # Python 3 raises RemoteDisconnected, a subclass of BadStatusLine, when
+    # the server closes the connection without responding, Python 2 raises
+    # BadStatusLine.
+    if isinstance(exc, http_client.BadStatusLine):
+        return True
+    return getattr(exc, 'errno', None) in _CLOSED_CONNECTION_ERRNOS
+
+
+class ConnectionPool(object):
+    """A thread-safe cache of idle keep-alive connections for each host.
+
+    A connection is used by one request at a time. It is taken out of the
+    pool for the request and put back afterwards if the server didn't close
+    it. Connections that have been idle for too long are closed and the
+    pool is emptied in child processes after a fork, as the connections'
+    sockets are shared with the parent.
+
+    Args:
+        max_idle_per_host (int): The maximum number of idle connections to
+            keep for each host.
+        idle_timeout (float): How long, in seconds, to keep a connection
+            that isn't used.
+    """
+
+    def __init__(self, max_idle_per_host=_DEFAULT_MAX_IDLE_PER_HOST,
+                 idle_timeout=_DEFAULT_IDLE_TIMEOUT_SECS):
+        self._max_idle_per_host = max_idle_per_host
+        self._idle_timeout = idle_timeout
+        self._init_lock = threading.Lock()
+        self._pid = None
+        self._lock = None
+        # Maps (scheme, host) to a list of (connection, idle since) in the
+        # order they were released.
+        self._idle = None
+
+    def _reset_if_needed(self):
+        """(Re)initializes the pool in the current process."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._init_lock:
+            if self._pid == pid:
+                return
+            # The connections inherited from the parent are dropped rather
+            # than closed, closing them could affect the parent.
+            self._lock = threading.Lock()
+            self._idle = {}
+            self._pid = pid
+
+    def acquire(self, scheme, host, timeout):
+        """Takes an idle connection to a host or makes a new one.
+
+        Args:
+            scheme (str): ``http`` or ``https``.
+            host (str): The host and optional port.
+            timeout (Union[float, object]): The timeout in seconds for the
+                connection's operations, or
+                ``socket._GLOBAL_DEFAULT_TIMEOUT``.
+
+        Returns:
+            Tuple[http.client.HTTPConnection, bool]: The connection and
+                whether it was reused.
+        """
+        self._reset_if_needed()
+        key = (scheme, host)
+        now = time.time()
+        connection = None
+
+        with self._lock:
+            idle = self._idle.get(key, [])
+            # The list is ordered by idle time, so the expired connections
+            # are at the front.
+            expired_count = 0
+            while (expired_count < len(idle) and
+                   now - idle[expired_count][1] >= self._idle_timeout):
+                expired_count += 1
+            expired = [entry[0] for entry in idle[:expired_count]]
+            del idle[:expired_count]
+            if idle:
+                connection = idle.pop()[0]
+
+        for expired_connection in expired:
+            expired_connection.close()
+
+        if connection is None:
+            connection = _CONNECTION_CLASSES[scheme](host)
+            reused = False
+        else:
+            reused = True
+
+        _set_timeout(connection, timeout)
+        return connection, reused
+
+    def release(self, scheme, host, connection):
+        """Returns a connection to the pool after a complete response.
+
+        Args:
+            scheme (str): ``http`` or ``https``.
+            host (str): The host and optional port.
+            connection (http.client.HTTPConnection): The connection.
+        """
+        self._reset_if_needed()
+        evicted = []
+
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host), [])
+            idle.append((connection, time.time()))
+            while len(idle) > self._max_idle_per_host:
+                evicted.append(idle.pop(0)[0])
+
+        for evicted_connection in evicted:
+            evicted_connection.close()
+
+    def clear(self):
+        """Closes all idle connections."""
+        self._reset_if_needed()
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for entries in idle.values():
+            for connection, _ in entries:
+                connection.close()
+
+
+_DEFAULT_POOL = ConnectionPool()
+
 
 class Response(transport.Response):
     """http.client transport response adapter.
@@ -52,7 +233,15 @@ class Response(transport.Response):
 
 
 class Request(transport.Request):
-    """http.client transport request adapter."""
+    """http.client transport request adapter.
+
+    Args:
+        pool (ConnectionPool): The pool of keep-alive connections. By default
+            a pool shared by all requests in the process is used.
+    """
+
+    def __init__(self, pool=None):
+        self._pool = pool if pool is not None else _DEFAULT_POOL
 
     def __call__(self, url, method='GET', body=None, headers=None,
                  timeout=None, **kwargs):
@@ -89,23 +278,35 @@ class Request(transport.Request):
         path = urllib.parse.urlunsplit(
             ('', '', parts.path, parts.query, parts.fragment))
 
-        if parts.scheme != 'http':
+        if parts.scheme not in _CONNECTION_CLASSES:
             raise exceptions.TransportError(
-                'http.client transport only supports the http scheme, {}'
-                'was specified'.format(parts.scheme))
+                'http.client transport only supports the http and https '
+                'schemes, {} was specified'.format(parts.scheme))
+
+        _LOGGER.debug('Making request: %s %s', method, url)
 
-        connection = http_client.HTTPConnection(parts.netloc)
+        while True:
+            connection, reused = self._pool.acquire(
+                parts.scheme, parts.netloc, timeout)
 
-        try:
-            _LOGGER.debug('Making request: %s %s', method, url)
+            try:
+                connection.request(
+                    method, path, body=body, headers=headers, **kwargs)
+                raw_response = connection.getresponse()
+                response = Response(raw_response)
 
-            connection.request(
-                method, path, body=body, headers=headers, **kwargs)
-            response = connection.getresponse()
-            return Response(response)
+            except (http_client.HTTPException, socket.error) as exc:
+                connection.close()
+                # The server may have closed an idle connection just before
+                # it was reused, try again with another one.
+                if reused and _is_closed_connection_error(exc):
+                    _LOGGER.debug('Reused connection failed: %s', exc)
+                    continue
+                raise exceptions.TransportError(exc)
 
-        except (http_client.HTTPException, socket.error) as exc:
-            raise exceptions.TransportError(exc)
+            if raw_response.will_close:
+                connection.close()
+            else:
+                self._pool.release(parts.scheme, parts.netloc, connection)
 
-        finally:
-            connection.close()
+            return response
@@ -28,6 +28,7 @@ import requests.exceptions
 
 from google.auth import exceptions
 from google.auth import transport
+import google.auth.credentials
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -170,6 +171,8 @@ class AuthorizedSession(requests.Session):
 
         self.credentials.before_request(
             self._auth_request, method, url, request_headers)
+        # The token the request is sent with, in case it is rejected.
+        token = getattr(self.credentials, 'token', None)
 
         response = super(AuthorizedSession, self).request(
             method, url, data=data, headers=request_headers, **kwargs)
@@ -187,7 +190,15 @@ class AuthorizedSession(requests.Session):
                 response.status_code, _credential_refresh_attempt + 1,
                 self._max_refresh_attempts)
 
-            self.credentials.refresh(self._auth_request)
+            if isinstance(
+                    self.credentials, google.auth.credentials.Credentials):
+                # Only one of the threads whose requests were rejected with
+                # the same token refreshes the credentials.
+                # pylint: disable=protected-access
+                self.credentials._refresh_if_needed(
+                    self._auth_request, force=True, rejected_token=token)
+            else:
+                self.credentials.refresh(self._auth_request)
 
             # Recurse. Pass in the original headers, not our modified set.
             return self.request(
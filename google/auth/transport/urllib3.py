@@ -40,6 +40,7 @@ import urllib3.exceptions
 
 from google.auth import exceptions
 from google.auth import transport
+import google.auth.credentials
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -203,6 +204,8 @@ class AuthorizedHttp(urllib3.request.RequestMethods):
 
         self.credentials.before_request(
             self._request, method, url, request_headers)
+        # The token the request is sent with, in case it is rejected.
+        token = getattr(self.credentials, 'token', None)
 
         response = self.http.urlopen(
             method, url, body=body, headers=request_headers, **kwargs)
@@ -222,7 +225,15 @@ class AuthorizedHttp(urllib3.request.RequestMethods):
                 response.status, _credential_refresh_attempt + 1,
                 self._max_refresh_attempts)
 
-            self.credentials.refresh(self._request)
+            if isinstance(
+                    self.credentials, google.auth.credentials.Credentials):
+                # Only one of the threads whose requests were rejected with
+                # the same token refreshes the credentials.
+                # pylint: disable=protected-access
+                self.credentials._refresh_if_needed(
+                    self._request, force=True, rejected_token=token)
+            else:
+                self.credentials.refresh(self._request)
 
             # Recurse. Pass in the original headers, not our modified set.
             return self.urlopen(
@@ -24,12 +24,12 @@ For more information about the token endpoint, see
 """
 
 import datetime
-import json
 
 from six.moves import http_client
 from six.moves import urllib
 
 from google.auth import _helpers
+from google.auth import _json
 from google.auth import exceptions
 
 _URLENCODED_CONTENT_TYPE = 'application/x-www-form-urlencoded'
@@ -47,7 +47,7 @@ def _handle_error_response(response_body):
         google.auth.exceptions.RefreshError
     """
     try:
-        error_data = json.loads(response_body)
+        error_data = _json.loads(response_body)
         error_details = '{}: {}'.format(
             error_data['error'],
             error_data.get('error_description'))
@@ -108,7 +108,7 @@ def _token_endpoint_request(request, token_uri, body):
     if response.status != http_client.OK:
         _handle_error_response(response_body)
 
-    response_data = json.loads(response_body)
+    response_data = _json.loads(response_body)
 
     return response_data
 
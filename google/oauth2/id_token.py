@@ -12,15 +12,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Google ID Token helpers."""
+"""Google ID Token helpers.
 
-import json
+Verifying a token requires the issuer's public certificates. By default they
+are fetched again for every token. Applications that verify many tokens
+should share a :class:`CertificateStore`, which caches the certificates for
+as long as the certificate endpoint allows::
+
+    cert_store = id_token.CertificateStore(id_token.GOOGLE_OAUTH2_CERTS_URL)
+
+    def handle(token):
+        claims = id_token.verify_oauth2_token(
+            token, request, audience=CLIENT_ID, cert_store=cert_store)
+
+To keep certificate rotation off the verification path entirely, the store
+can refetch the certificates in the background before they expire::
+
+    cert_store.enable_background_refresh(request)
+"""
+
+import datetime
+import email.utils
+import logging
+import re
+import threading
 
 from six.moves import http_client
 
+from google.auth import _helpers
+from google.auth import _json
+from google.auth import _refresh_worker
+from google.auth import crypt
 from google.auth import exceptions
 from google.auth import jwt
 
+_LOGGER = logging.getLogger(__name__)
+
 # The URL that provides public certificates for verifying ID tokens issued
 # by Google's OAuth 2.0 authorization server.
 _GOOGLE_OAUTH2_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
@@ -31,6 +58,19 @@ _GOOGLE_APIS_CERTS_URL = (
     'https://www.googleapis.com/robot/v1/metadata/x509'
     '/securetoken@system.gserviceaccount.com')
 
+GOOGLE_OAUTH2_CERTS_URL = _GOOGLE_OAUTH2_CERTS_URL
+"""str: The URL of the certificates used by :func:`verify_oauth2_token`."""
+
+GOOGLE_APIS_CERTS_URL = _GOOGLE_APIS_CERTS_URL
+"""str: The URL of the certificates used by :func:`verify_firebase_token`."""
+
+_MAX_AGE_RE = re.compile(r'max-age\s*=\s*"?(\d+)"?')
+# Don't refetch the certificates more often than this because of tokens with
+# unknown key IDs, otherwise anyone could make us fetch them for every token.
+_MIN_REFETCH_INTERVAL = datetime.timedelta(seconds=60)
+_DEFAULT_BACKGROUND_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+_BACKGROUND_REFRESH_RETRY_DELAY = datetime.timedelta(seconds=30)
+
 
 def _fetch_certs(request, certs_url):
     """Fetches certificates.
@@ -47,17 +87,287 @@ def _fetch_certs(request, certs_url):
         Mapping[str, str]: A mapping of public key ID to x.509 certificate
             data.
     """
+    response = _request_certs(request, certs_url)
+    return _json.loads(response.data)
+
+
+def _request_certs(request, certs_url):
+    """Makes the certificate request.
+
+    Args:
+        request (google.auth.transport.Request): The object used to make
+            HTTP requests.
+        certs_url (str): The certificate endpoint URL.
+
+    Returns:
+        google.auth.transport.Response: The successful response.
+
+    Raises:
+        google.auth.exceptions.TransportError: If the request failed.
+    """
     response = request(certs_url, method='GET')
 
     if response.status != http_client.OK:
         raise exceptions.TransportError(
             'Could not fetch certificates at {}'.format(certs_url))
 
-    return json.loads(response.data.decode('utf-8'))
+    return response
+
+
+def _get_expiry(headers, now):
+    """Determines until when a response may be cached.
+
+    ``Cache-Control: max-age`` takes precedence over ``Expires``, as in
+    HTTP/1.1. The ``Age`` header is taken into account for ``max-age``.
+
+    Args:
+        headers (Mapping[str, str]): The response headers.
+        now (datetime.datetime): The time the response was received.
+
+    Returns:
+        datetime.datetime: When the response expires. If it must not be
+            cached, this is ``now``.
+    """
+    headers = {key.lower(): value for key, value in headers.items()}
+    cache_control = headers.get('cache-control', '').lower()
+
+    if 'no-cache' in cache_control or 'no-store' in cache_control:
+        return now
+
+    match = _MAX_AGE_RE.search(cache_control)
+    if match:
+        try:
+            age = int(headers.get('age', 0))
+        except ValueError:
+            age = 0
+        return now + datetime.timedelta(
+            seconds=max(int(match.group(1)) - age, 0))
+
+    expires = email.utils.parsedate_tz(headers.get('expires', ''))
+    if expires is not None:
+        expires_secs = email.utils.mktime_tz(expires)
+        # Use the server's clock, if it says what time it is, in case ours is
+        # off.
+        date = email.utils.parsedate_tz(headers.get('date', ''))
+        if date is not None:
+            date_secs = email.utils.mktime_tz(date)
+        else:
+            date_secs = _helpers.datetime_to_secs(now)
+        return now + datetime.timedelta(
+            seconds=max(expires_secs - date_secs, 0))
+
+    return now
+
+
+class CertificateStore(object):
+    """Caches the public certificates used to verify ID tokens.
+
+    The certificates are cached for as long as the certificate endpoint's
+    ``Cache-Control: max-age`` or ``Expires`` response headers allow. They
+    are fetched again when they expire and, at most once a minute, when a
+    token was signed with a key that isn't in the cached certificates, in
+    case the issuer rotated its keys. Concurrent callers share a single
+    fetch.
+
+    A store is thread-safe and should be shared by all the threads that
+    verify tokens from the same issuer.
+
+    Args:
+        certs_url (str): The URL that specifies the certificates. This URL
+            should return JSON in the format of
+            ``{'key id': 'x509 certificate'}``.
+
+    Attributes:
+        last_refresh (Optional[datetime.datetime]): When the certificates
+            were last fetched successfully.
+        failure_count (int): How many times fetching the certificates failed.
+    """
+
+    def __init__(self, certs_url=_GOOGLE_OAUTH2_CERTS_URL):
+        self.certs_url = certs_url
+        self.last_refresh = None
+        self.failure_count = 0
+        self._lock = threading.Lock()
+        self._certs = None
+        self._expiry = None
+        self._background_refresh = None
+
+    def _needs_fetch(self, key_id, now):
+        """Checks if the cached certificates can't be used.
+
+        Args:
+            key_id (Optional[str]): The key ID that is needed.
+            now (datetime.datetime): The current time.
+
+        Returns:
+            bool: True if the certificates must be fetched.
+        """
+        if self._certs is None or now >= self._expiry:
+            return True
+        return (key_id is not None and
+                key_id not in self._certs and
+                now >= self.last_refresh + _MIN_REFETCH_INTERVAL)
+
+    def _fetch(self, request, now):
+        """Fetches the certificates. Must be called with the lock held.
+
+        Args:
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests.
+            now (datetime.datetime): The current time.
+
+        Raises:
+            google.auth.exceptions.TransportError: If the certificates could
+                not be fetched.
+            ValueError: If the response is not valid JSON.
+        """
+        try:
+            response = _request_certs(request, self.certs_url)
+            certs = _json.loads(response.data)
+        except (exceptions.TransportError, ValueError):
+            self.failure_count += 1
+            raise
+
+        # The certificates are read without the lock, so they must be set
+        # last.
+        self._expiry = _get_expiry(response.headers, now)
+        self.last_refresh = now
+        self._certs = certs
+
+    def get_certs(self, request, key_id=None):
+        """Returns the certificates, fetching them if necessary.
+
+        Args:
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests.
+            key_id (Optional[str]): The ID of the key that is needed. If it
+                isn't in the cached certificates they are fetched again.
+
+        Returns:
+            Mapping[str, str]: A mapping of public key ID to x.509 certificate
+                data.
+
+        Raises:
+            google.auth.exceptions.TransportError: If the certificates could
+                not be fetched.
+        """
+        if not self._needs_fetch(key_id, _helpers.utcnow()):
+            return self._certs
+
+        with self._lock:
+            # Another thread may have fetched the certificates while we were
+            # waiting for the lock.
+            now = _helpers.utcnow()
+            if self._needs_fetch(key_id, now):
+                self._fetch(request, now)
+            return self._certs
+
+    def enable_background_refresh(
+            self, request, margin=_DEFAULT_BACKGROUND_REFRESH_MARGIN,
+            scheduler=None):
+        """Refetches the certificates in the background before they expire.
+
+        The certificates are fetched right away and then ``margin`` before
+        they expire, and each new certificate is parsed into a verifier
+        ahead of time (see :meth:`google.auth.crypt.RSAVerifier.from_string`),
+        so key rotation doesn't add any latency to verifying a token. Failed
+        fetches are retried every 30 seconds and counted in
+        :attr:`failure_count`.
+
+        Args:
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests in the background. It must be thread-safe.
+            margin (datetime.timedelta): How long before the expiry to
+                refetch.
+            scheduler (google.auth._refresh_worker.Scheduler): The scheduler
+                used to run the refresh. Defaults to the scheduler shared by
+                all credentials.
+        """
+        self.disable_background_refresh()
+        background_refresh = _BackgroundRefresh(
+            request, margin,
+            scheduler if scheduler is not None
+            else _refresh_worker.DEFAULT_SCHEDULER)
+        self._background_refresh = background_refresh
+        background_refresh.schedule(self, datetime.timedelta(0))
+
+    def disable_background_refresh(self):
+        """Stops refetching the certificates in the background."""
+        background_refresh = self._background_refresh
+        self._background_refresh = None
+        if background_refresh is not None:
+            background_refresh.cancel()
+
+    def _refresh_in_background(self, background_refresh):
+        """Fetches and parses the certificates and schedules the next fetch.
+
+        Args:
+            background_refresh (_BackgroundRefresh): The background refresh
+                that scheduled this call.
+        """
+        if self._background_refresh is not background_refresh:
+            return
+
+        with self._lock:
+            now = _helpers.utcnow()
+            try:
+                self._fetch(background_refresh.request, now)
+            except (exceptions.TransportError, ValueError):
+                _LOGGER.warning(
+                    'Fetching the certificates at %s failed, retrying in %s.',
+                    self.certs_url, _BACKGROUND_REFRESH_RETRY_DELAY,
+                    exc_info=True)
+                background_refresh.schedule(
+                    self, _BACKGROUND_REFRESH_RETRY_DELAY)
+                return
+            certs = self._certs
+            delay = max(
+                self._expiry - background_refresh.margin - now,
+                _MIN_REFETCH_INTERVAL)
+
+        for key_id, cert in certs.items():
+            try:
+                crypt.RSAVerifier.from_string(cert)
+            except ValueError:
+                _LOGGER.warning(
+                    'Could not parse the certificate for key %s.', key_id,
+                    exc_info=True)
+
+        background_refresh.schedule(self, delay)
+
+
+class _BackgroundRefresh(_refresh_worker.BackgroundRefresh):
+    """Keeps track of the next background refresh of a certificate store.
+
+    Args:
+        request (google.auth.transport.Request): The object used to make
+            HTTP requests.
+        margin (datetime.timedelta): How long before the expiry to refetch.
+        scheduler (google.auth._refresh_worker.Scheduler): The scheduler used
+            to run the refresh.
+    """
+
+    def __init__(self, request, margin, scheduler):
+        super(_BackgroundRefresh, self).__init__(scheduler)
+        self.request = request
+        self.margin = margin
+
+    # pylint: disable=arguments-differ
+    def schedule(self, cert_store, delay):
+        """Schedules a refresh, replacing any pending one.
+
+        Args:
+            cert_store (CertificateStore): The store to refresh.
+            delay (datetime.timedelta): How long to wait before refreshing.
+        """
+        # pylint: disable=protected-access
+        super(_BackgroundRefresh, self).schedule(
+            cert_store, delay,
+            lambda cert_store: cert_store._refresh_in_background(self))
 
 
 def verify_token(id_token, request, audience=None,
-                 certs_url=_GOOGLE_OAUTH2_CERTS_URL):
+                 certs_url=_GOOGLE_OAUTH2_CERTS_URL, cert_store=None):
     """Verifies an ID token and returns the decoded token.
 
     Args:
@@ -68,17 +378,90 @@ def verify_token(id_token, request, audience=None,
             then the audience is not verified.
         certs_url (str): The URL that specifies the certificates to use to
             verify the token. This URL should return JSON in the format of
-            ``{'key id': 'x509 certificate'}``.
+            ``{'key id': 'x509 certificate'}``. Ignored if ``cert_store``
+            is specified.
+        cert_store (CertificateStore): The store to get the certificates
+            from. If None, the certificates are fetched from ``certs_url``.
 
     Returns:
         Mapping[str, Any]: The decoded token.
     """
-    certs = _fetch_certs(request, certs_url)
+    if cert_store is not None:
+        key_id = jwt.decode_header(id_token).get('kid')
+        certs = cert_store.get_certs(request, key_id=key_id)
+    else:
+        certs = _fetch_certs(request, certs_url)
 
     return jwt.decode(id_token, certs=certs, audience=audience)
 
 
-def verify_oauth2_token(id_token, request, audience=None):
+def _get_key_ids(id_tokens):
+    """Collects the key IDs of tokens, skipping malformed tokens.
+
+    Args:
+        id_tokens (Sequence[Union[str, bytes]]): The encoded tokens.
+
+    Returns:
+        Set[str]: The key IDs specified in the tokens' headers.
+    """
+    key_ids = set()
+    for id_token in id_tokens:
+        try:
+            key_id = jwt.decode_header(id_token).get('kid')
+        except ValueError:
+            continue
+        if key_id is not None:
+            key_ids.add(key_id)
+    return key_ids
+
+
+def verify_tokens(id_tokens, request, audience=None,
+                  certs_url=_GOOGLE_OAUTH2_CERTS_URL, cert_store=None):
+    """Verifies many ID tokens.
+
+    The certificates are only fetched once for all of the tokens, and an
+    invalid token doesn't stop the others from being verified. See
+    :func:`google.auth.jwt.decode_many`.
+
+    Args:
+        id_tokens (Iterable[Union[str, bytes]]): The encoded tokens.
+        request (google.auth.transport.Request): The object used to make
+            HTTP requests.
+        audience (str): The audience that the tokens are intended for. If
+            None then the audience is not verified.
+        certs_url (str): The URL that specifies the certificates to use to
+            verify the tokens. This URL should return JSON in the format of
+            ``{'key id': 'x509 certificate'}``. Ignored if ``cert_store``
+            is specified.
+        cert_store (CertificateStore): The store to get the certificates
+            from. If None, the certificates are fetched from ``certs_url``.
+
+    Returns:
+        List[google.auth.jwt.DecodeResult]: The decoded token or the reason
+            it is invalid for each token, in the same order as
+            ``id_tokens``.
+
+    Raises:
+        google.auth.exceptions.TransportError: If the certificates could not
+            be fetched.
+    """
+    # The tokens are read twice when there is a store.
+    id_tokens = list(id_tokens)
+
+    if cert_store is not None:
+        certs = cert_store.get_certs(request)
+        # Give the store a chance to pick up rotated keys, it throttles the
+        # refetches itself.
+        for key_id in _get_key_ids(id_tokens):
+            if key_id not in certs:
+                certs = cert_store.get_certs(request, key_id=key_id)
+    else:
+        certs = _fetch_certs(request, certs_url)
+
+    return jwt.decode_many(id_tokens, certs=certs, audience=audience)
+
+
+def verify_oauth2_token(id_token, request, audience=None, cert_store=None):
     """Verifies an ID Token issued by Google's OAuth 2.0 authorization server.
 
     Args:
@@ -88,16 +471,20 @@ def verify_oauth2_token(id_token, request, audience=None):
         audience (str): The audience that this token is intended for. This is
             typically your application's OAuth 2.0 client ID. If None then the
             audience is not verified.
+        cert_store (CertificateStore): The store to get the certificates
+            from. It should use :data:`GOOGLE_OAUTH2_CERTS_URL`. If None, the
+            certificates are fetched for this token.
 
     Returns:
         Mapping[str, Any]: The decoded token.
     """
     return verify_token(
         id_token, request, audience=audience,
-        certs_url=_GOOGLE_OAUTH2_CERTS_URL)
+        certs_url=_GOOGLE_OAUTH2_CERTS_URL, cert_store=cert_store)
 
 
-def verify_firebase_token(id_token, request, audience=None):
+def verify_firebase_token(id_token, request, audience=None,
+                          cert_store=None):
     """Verifies an ID Token issued by Firebase Authentication.
 
     Args:
@@ -107,9 +494,13 @@ def verify_firebase_token(id_token, request, audience=None):
         audience (str): The audience that this token is intended for. This is
             typically your Firebase application ID. If None then the audience
             is not verified.
+        cert_store (CertificateStore): The store to get the certificates
+            from. It should use :data:`GOOGLE_APIS_CERTS_URL`. If None, the
+            certificates are fetched for this token.
 
     Returns:
         Mapping[str, Any]: The decoded token.
     """
     return verify_token(
-        id_token, request, audience=audience, certs_url=_GOOGLE_APIS_CERTS_URL)
+        id_token, request, audience=audience,
+        certs_url=_GOOGLE_APIS_CERTS_URL, cert_store=cert_store)
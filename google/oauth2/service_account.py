@@ -71,14 +71,77 @@ specific subject using :meth:`~Credentials.with_subject`.
 """
 
 import datetime
+import multiprocessing.pool
+
+from six.moves import urllib
 
 from google.auth import _helpers
 from google.auth import _service_account_info
 from google.auth import credentials
+from google.auth import exceptions
 from google.auth import jwt
+import google.auth.token_cache
 from google.oauth2 import _client
 
 _DEFAULT_TOKEN_LIFETIME_SECS = 3600  # 1 hour in sections
+# The same as the default connection pool size of requests and urllib3, so
+# that the workers don't wait for each other's connections.
+_DEFAULT_MAX_WORKERS = 10
+
+
+def _refresh_concurrently(request, credentials_by_key, max_workers):
+    """Refreshes credentials on a pool of threads.
+
+    Credentials that can't be refreshed don't stop the others from being
+    refreshed.
+
+    Args:
+        request (google.auth.transport.Request): The object used to make
+            HTTP requests. It is shared by the threads.
+        credentials_by_key (Mapping[Hashable, Credentials]): The credentials
+            to refresh.
+        max_workers (int): The maximum number of credentials to refresh at
+            the same time.
+
+    Raises:
+        google.auth.exceptions.PartialRefreshError: If any of the credentials
+            could not be refreshed.
+    """
+    if not credentials_by_key:
+        return
+
+    def refresh(item):
+        """Refreshes one set of credentials, returning the error if any."""
+        key, credentials_to_refresh = item
+        try:
+            credentials_to_refresh.refresh(request)
+        # A malformed token response raises ValueError or KeyError, which
+        # must not discard the other credentials either.
+        except Exception as exc:  # pylint: disable=broad-except
+            return key, exc
+        return key, None
+
+    # Signing with the cryptography backend and waiting for the token
+    # endpoint both release the GIL, so threads are enough to overlap them.
+    # multiprocessing.pool.ThreadPool rather than concurrent.futures, which
+    # isn't available on Python 2.7 without a backport.
+    pool = multiprocessing.pool.ThreadPool(
+        min(max_workers, len(credentials_by_key)))
+    try:
+        results = pool.map(
+            refresh, list(credentials_by_key.items()), chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    errors = {key: error for key, error in results if error is not None}
+    if errors:
+        refreshed = {key: value for key, value in credentials_by_key.items()
+                     if key not in errors}
+        raise exceptions.PartialRefreshError(
+            'Could not refresh {} of {} credentials.'.format(
+                len(errors), len(credentials_by_key)),
+            errors, refreshed)
 
 
 class Credentials(credentials.Signing,
@@ -113,10 +176,38 @@ class Credentials(credentials.Signing,
 
         scoped_credentials = credentials.with_scopes(['email'])
         delegated_credentials = credentials.with_subject(subject)
+
+    The credentials created by :meth:`with_scopes` and :meth:`with_subject`
+    share an in-memory token cache with the credentials they were created
+    from. Refreshing any of them reuses a valid access token that was already
+    obtained for the same scopes, subject and additional claims, which saves
+    a round trip to the token endpoint when the same delegated credentials
+    are created over and over.
+
+    Many Google APIs also accept a JWT signed with the service account's
+    private key instead of an OAuth 2.0 access token. With
+    ``self_signed_jwt=True`` the credentials sign such a token locally for
+    each API, which saves the round trip to the token endpoint::
+
+        credentials = service_account.Credentials.from_service_account_file(
+            'service-account.json', self_signed_jwt=True)
+
+    The tokens are cached for each audience, see
+    :class:`google.auth.jwt.OnDemandCredentials`. Credentials with scopes or
+    a subject still use the OAuth 2.0 authorization grant, as self-signed JWTs
+    can't request scopes or domain-wide delegation.
+
+    To share access tokens between processes as well, pass a
+    :class:`~google.auth.token_cache.TokenCache`::
+
+        cache = token_cache.SQLiteTokenCache('/var/run/myapp/tokens.db')
+        credentials = service_account.Credentials.from_service_account_file(
+            'service-account.json', token_cache=cache)
     """
 
     def __init__(self, signer, service_account_email, token_uri, scopes=None,
-                 subject=None, additional_claims=None):
+                 subject=None, additional_claims=None, token_cache=None,
+                 self_signed_jwt=False):
         """
         Args:
             signer (google.auth.crypt.Signer): The signer used to sign JWTs.
@@ -128,6 +219,14 @@ class Credentials(credentials.Signing,
                 user to for which to request delegated access.
             additional_claims (Mapping[str, str]): Any additional claims for
                 the JWT assertion used in the authorization grant.
+            token_cache (google.auth.token_cache.TokenCache): A cache
+                consulted before requesting a new access token, and used to
+                store the access tokens that are obtained. It is shared with
+                the credentials created by :meth:`with_scopes` and
+                :meth:`with_subject`. If not specified, a new
+                :class:`~google.auth.token_cache.MemoryTokenCache` is used.
+            self_signed_jwt (bool): Whether to sign JWTs locally instead of
+                requesting access tokens, if there are no scopes or subject.
 
         .. note:: Typically one of the helper constructors
             :meth:`from_service_account_file` or
@@ -142,11 +241,20 @@ class Credentials(credentials.Signing,
         self._subject = subject
         self._token_uri = token_uri
 
+        if token_cache is not None:
+            self._token_cache = token_cache
+        else:
+            self._token_cache = google.auth.token_cache.MemoryTokenCache()
+
         if additional_claims is not None:
             self._additional_claims = additional_claims
         else:
             self._additional_claims = {}
 
+        self._self_signed_jwt = self_signed_jwt
+        self._jwt_credentials = None
+        self._assertion_encoder = None
+
     @classmethod
     def _from_signer_and_info(cls, signer, info, **kwargs):
         """Creates a Credentials instance from a signer and service account
@@ -214,10 +322,31 @@ class Credentials(credentials.Signing,
         """Checks if the credentials requires scopes.
 
         Returns:
-            bool: True if there are no scopes set otherwise False.
+            bool: True if there are no scopes set and the credentials don't
+                use self-signed JWTs, otherwise False.
         """
+        if self._self_signed_jwt and not self._subject:
+            return False
         return True if not self._scopes else False
 
+    @property
+    def _uses_self_signed_jwt(self):
+        """bool: Whether requests are authorized with self-signed JWTs
+        rather than OAuth 2.0 access tokens."""
+        return (self._self_signed_jwt and
+                not self._scopes and not self._subject)
+
+    @property
+    def valid(self):
+        """Checks the validity of the credentials.
+
+        Credentials that use self-signed JWTs are always valid because the
+        tokens are made on demand.
+        """
+        if self._uses_self_signed_jwt:
+            return True
+        return super(Credentials, self).valid
+
     @_helpers.copy_docstring(credentials.Scoped)
     def with_scopes(self, scopes):
         return Credentials(
@@ -226,7 +355,9 @@ class Credentials(credentials.Signing,
             scopes=scopes,
             token_uri=self._token_uri,
             subject=self._subject,
-            additional_claims=self._additional_claims.copy())
+            additional_claims=self._additional_claims.copy(),
+            token_cache=self._token_cache,
+            self_signed_jwt=self._self_signed_jwt)
 
     def with_subject(self, subject):
         """Create a copy of these credentials with the specified subject.
@@ -244,7 +375,104 @@ class Credentials(credentials.Signing,
             scopes=self._scopes,
             token_uri=self._token_uri,
             subject=subject,
-            additional_claims=self._additional_claims.copy())
+            additional_claims=self._additional_claims.copy(),
+            token_cache=self._token_cache,
+            self_signed_jwt=self._self_signed_jwt)
+
+    def with_self_signed_jwt(self, self_signed_jwt=True):
+        """Create a copy of these credentials that uses self-signed JWTs.
+
+        Args:
+            self_signed_jwt (bool): Whether to sign JWTs locally instead of
+                requesting access tokens, if there are no scopes or subject.
+
+        Returns:
+            google.auth.service_account.Credentials: A new credentials
+                instance.
+        """
+        return Credentials(
+            self._signer,
+            service_account_email=self._service_account_email,
+            scopes=self._scopes,
+            token_uri=self._token_uri,
+            subject=self._subject,
+            additional_claims=self._additional_claims.copy(),
+            token_cache=self._token_cache,
+            self_signed_jwt=self_signed_jwt)
+
+    def with_subjects(self, subjects, request,
+                      max_workers=_DEFAULT_MAX_WORKERS):
+        """Create and refresh credentials for many subjects concurrently.
+
+        This is much faster than calling :meth:`with_subject` and
+        refreshing the credentials one at a time when, for example, a job
+        needs to act on behalf of every user in a domain::
+
+            delegated = credentials.with_subjects(users, request)
+            for user, user_credentials in delegated.items():
+                ...
+
+        The access tokens are stored in the token cache shared with these
+        credentials, so credentials created later with :meth:`with_subject`
+        reuse them.
+
+        Args:
+            subjects (Iterable[str]): The subject claims.
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests. It is used from several threads at once, so it
+                must be thread-safe, for example a
+                :class:`google.auth.transport.urllib3.Request`.
+            max_workers (int): The maximum number of tokens to request at the
+                same time.
+
+        Returns:
+            Mapping[str, google.auth.service_account.Credentials]: Refreshed
+                credentials for each subject.
+
+        Raises:
+            google.auth.exceptions.PartialRefreshError: If any of the
+                credentials could not be refreshed. The others are still
+                refreshed, and the exception has the errors and the refreshed
+                credentials, both keyed by subject::
+
+                    try:
+                        delegated = credentials.with_subjects(users, request)
+                    except exceptions.PartialRefreshError as exc:
+                        delegated = exc.credentials
+        """
+        delegated = {subject: self.with_subject(subject)
+                     for subject in subjects}
+        _refresh_concurrently(request, delegated, max_workers)
+        return delegated
+
+    def with_scope_sets(self, scope_sets, request,
+                        max_workers=_DEFAULT_MAX_WORKERS):
+        """Create and refresh credentials for many sets of scopes
+        concurrently.
+
+        Like :meth:`with_subjects`, but for credentials that differ in their
+        scopes rather than their subject.
+
+        Args:
+            scope_sets (Iterable[Sequence[str]]): The sets of scopes.
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests. It must be thread-safe.
+            max_workers (int): The maximum number of tokens to request at the
+                same time.
+
+        Returns:
+            Mapping[Tuple[str, ...], google.auth.service_account.Credentials]:
+                Refreshed credentials for each set of scopes, keyed by the
+                scopes as a tuple.
+
+        Raises:
+            google.auth.exceptions.PartialRefreshError: If any of the
+                credentials could not be refreshed, see :meth:`with_subjects`.
+        """
+        scoped = {tuple(scopes): self.with_scopes(list(scopes))
+                  for scopes in scope_sets}
+        _refresh_concurrently(request, scoped, max_workers)
+        return scoped
 
     def _make_authorization_grant_assertion(self):
         """Create the OAuth 2.0 assertion.
@@ -255,38 +483,118 @@ class Credentials(credentials.Signing,
         Returns:
             bytes: The authorization grant assertion.
         """
+        # Every assertion has the same claims apart from iat and exp.
+        if self._assertion_encoder is None:
+            claims = {
+                # The issuer must be the service account email.
+                'iss': self._service_account_email,
+                # The audience must be the auth token endpoint's URI
+                'aud': self._token_uri,
+                'scope': _helpers.scopes_to_string(self._scopes or ())
+            }
+
+            claims.update(self._additional_claims)
+
+            # The subject can be a user email for domain-wide delegation.
+            if self._subject:
+                claims.setdefault('sub', self._subject)
+
+            self._assertion_encoder = jwt.Encoder(self._signer, claims=claims)
+
         now = _helpers.utcnow()
         lifetime = datetime.timedelta(seconds=_DEFAULT_TOKEN_LIFETIME_SECS)
         expiry = now + lifetime
 
-        payload = {
+        token = self._assertion_encoder.encode({
             'iat': _helpers.datetime_to_secs(now),
             'exp': _helpers.datetime_to_secs(expiry),
-            # The issuer must be the service account email.
-            'iss': self._service_account_email,
-            # The audience must be the auth token endpoint's URI
-            'aud': self._token_uri,
-            'scope': _helpers.scopes_to_string(self._scopes or ())
-        }
+        })
 
-        payload.update(self._additional_claims)
+        return token
 
-        # The subject can be a user email for domain-wide delegation.
-        if self._subject:
-            payload.setdefault('sub', self._subject)
+    def _make_token_cache_key(self):
+        """Makes the key that identifies these credentials' access tokens in
+        the token cache.
 
-        token = jwt.encode(self._signer, payload)
+        Returns:
+            str: The cache key.
+        """
+        return google.auth.token_cache.make_key(
+            'service_account',
+            self._service_account_email,
+            self._token_uri,
+            sorted(self._scopes or ()),
+            self._subject,
+            self._additional_claims)
 
-        return token
+    def _get_jwt_credentials(self):
+        """Returns the credentials that make the self-signed JWTs.
+
+        Returns:
+            google.auth.jwt.OnDemandCredentials: The credentials.
+        """
+        if self._jwt_credentials is None:
+            self._jwt_credentials = jwt.OnDemandCredentials(
+                self._signer,
+                issuer=self._service_account_email,
+                subject=self._service_account_email)
+        return self._jwt_credentials
 
     @_helpers.copy_docstring(credentials.Credentials)
     def refresh(self, request):
+        if self._uses_self_signed_jwt:
+            # There is no token to refresh, but make sure that new JWTs are
+            # signed for the following requests.
+            if self._jwt_credentials is not None:
+                self._jwt_credentials.refresh(request)
+            return
+
+        cache_key = self._make_token_cache_key()
+        cached = self._token_cache.get(cache_key)
+        # A cached token that is the same as the current token is the one
+        # the caller wants to replace, for example because it was rejected by
+        # the server.
+        if cached is not None and cached[0] != self.token:
+            self.token, self.expiry = cached
+            return
+
         assertion = self._make_authorization_grant_assertion()
         access_token, expiry, _ = _client.jwt_grant(
             request, self._token_uri, assertion)
         self.token = access_token
         self.expiry = expiry
 
+        self._token_cache.set(cache_key, access_token, expiry)
+
+    def before_request(self, request, method, url, headers):
+        """Performs credential-specific before request logic.
+
+        Credentials that use self-signed JWTs add a JWT to the headers whose
+        audience is the root URL of the request's service, such as
+        ``https://pubsub.googleapis.com/``. Otherwise an access token is
+        requested if needed, see
+        :meth:`google.auth.credentials.Credentials.before_request`.
+
+        Args:
+            request (google.auth.transport.Request): The object used to make
+                HTTP requests.
+            method (str): The request's HTTP method or the RPC method being
+                invoked.
+            url (str): The request's URI or the RPC service's URI.
+            headers (Mapping): The request's headers.
+        """
+        if self._uses_self_signed_jwt:
+            # Google APIs expect the service's root URL as the audience. It
+            # also means one JWT per service rather than one per resource.
+            parts = urllib.parse.urlsplit(url)
+            audience = urllib.parse.urlunsplit(
+                (parts.scheme, parts.netloc, '/', '', ''))
+            self._get_jwt_credentials().before_request(
+                request, method, audience, headers)
+        else:
+            super(Credentials, self).before_request(
+                request, method, url, headers)
+
     @_helpers.copy_docstring(credentials.Signing)
     def sign_bytes(self, message):
         return self._signer.sign(message)
@@ -0,0 +1,93 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This program measures the throughput of the RSA crypt backends.
+
+It signs and verifies a JWT-sized message with each available backend using
+the test key pair and prints the number of operations per second::
+
+    $ python scripts/benchmark_crypt.py --seconds 2
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+
+from google.auth.crypt import _python_rsa
+
+try:
+    from google.auth.crypt import _cryptography_rsa
+except ImportError:  # pragma: NO COVER
+    _cryptography_rsa = None
+
+import timing
+
+HERE = os.path.dirname(__file__)
+DATA_DIR = os.path.abspath(os.path.join(HERE, '..', 'tests', 'data'))
+# About the size of a service account assertion.
+MESSAGE = b'x' * 600
+
+
+def _read(filename):
+    with open(os.path.join(DATA_DIR, filename), 'rb') as fh:
+        return fh.read()
+
+
+def benchmark(module, seconds):
+    """Measures one backend.
+
+    Args:
+        module (module): The backend module.
+        seconds (float): How long to measure each operation for.
+
+    Returns:
+        Tuple[float, float, float]: The key loads, signs and verifies per
+            second.
+    """
+    private_key = _read('privatekey.pem')
+    public_cert = _read('public_cert.pem')
+    signer = module.RSASigner.from_string(private_key)
+    verifier = module.RSAVerifier.from_string(public_cert)
+    signature = signer.sign(MESSAGE)
+
+    return (
+        timing.ops_per_second(
+            lambda: module.RSAVerifier.from_string(public_cert), seconds),
+        timing.ops_per_second(lambda: signer.sign(MESSAGE), seconds),
+        timing.ops_per_second(
+            lambda: verifier.verify(MESSAGE, signature), seconds),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--seconds', type=float, default=1.0,
+        help='How long to measure each operation for.')
+    args = parser.parse_args()
+
+    backends = [('rsa', _python_rsa)]
+    if _cryptography_rsa is not None:
+        backends.append(('cryptography', _cryptography_rsa))
+
+    print('{:<14}{:>14}{:>14}{:>14}'.format(
+        'backend', 'loads/s', 'signs/s', 'verifies/s'))
+    for name, module in backends:
+        print('{:<14}{:>14.0f}{:>14.0f}{:>14.0f}'.format(
+            name, *benchmark(module, args.seconds)))
+
+
+if __name__ == '__main__':
+    main()
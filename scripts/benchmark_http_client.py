@@ -0,0 +1,87 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This program measures the latency of the http.client transport.
+
+It starts a local HTTP/1.1 server that answers like the metadata server and
+compares requests that reuse a keep-alive connection with requests that open
+a new connection every time::
+
+    $ python scripts/benchmark_http_client.py --seconds 2
+"""
+
+from __future__ import print_function
+
+import argparse
+import threading
+
+from six.moves import BaseHTTPServer
+from six.moves import http_client
+
+from google.auth.transport import _http_client
+
+import timing
+
+BODY = b'{"access_token":"token","expires_in":3599,"token_type":"Bearer"}'
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers every GET with a small JSON document."""
+    protocol_version = 'HTTP/1.1'
+    # Send the headers and body without waiting for the client's delayed
+    # ACK, as a real server would.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(http_client.OK)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--seconds', type=float, default=1.0,
+        help='How long to measure each transport for.')
+    args = parser.parse_args()
+
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = 'http://127.0.0.1:{}/computeMetadata/v1/token'.format(
+        server.server_port)
+
+    try:
+        print('{:<24}{:>14}'.format('connections', 'us/request'))
+        for name, pool in (
+                ('new per request',
+                 _http_client.ConnectionPool(max_idle_per_host=0)),
+                ('keep-alive pool', _http_client.ConnectionPool())):
+            request = _http_client.Request(pool=pool)
+            usecs = timing.usecs_per_call(lambda: request(url), args.seconds)
+            print('{:<24}{:>14.1f}'.format(name, usecs))
+            pool.clear()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
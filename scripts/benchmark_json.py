@@ -0,0 +1,107 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This program compares the JSON codecs supported by google.auth.
+
+For each codec that is installed it measures making a token with
+:class:`google.auth.jwt.Encoder`, decoding a token without verifying its
+signature, and parsing a certificate endpoint response. The signer doesn't
+sign, so the times are mostly the JSON and base64 overhead::
+
+    $ pip install orjson ujson
+    $ python scripts/benchmark_json.py --seconds 2
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+
+from google.auth import _json
+from google.auth import crypt
+from google.auth import jwt
+
+import timing
+
+HERE = os.path.dirname(__file__)
+DATA_DIR = os.path.abspath(os.path.join(HERE, '..', 'tests', 'data'))
+CODECS = ('json', 'ujson', 'orjson')
+CLAIMS = {
+    'iss': 'service-account@example.iam.gserviceaccount.com',
+    'aud': 'https://accounts.google.com/o/oauth2/token',
+    'scope': 'https://www.googleapis.com/auth/cloud-platform',
+}
+TIMES = {'iat': 1485000000, 'exp': 1485003600}
+
+
+class NullSigner(crypt.Signer):
+    """A signer that returns a constant signature."""
+
+    @property
+    def key_id(self):
+        return 'key-id'
+
+    def sign(self, message):
+        return b'x' * 256
+
+
+def benchmark(certs_response, seconds):
+    """Measures the current codec.
+
+    Args:
+        certs_response (bytes): A certificate endpoint response.
+        seconds (float): How long to measure each operation for.
+
+    Returns:
+        Tuple[float, float, float]: The microseconds to encode a token, to
+            decode a token and to parse the certificates.
+    """
+    encoder = jwt.Encoder(NullSigner(), claims=CLAIMS)
+    token = encoder.encode(TIMES)
+
+    return (
+        timing.usecs_per_call(lambda: encoder.encode(TIMES), seconds),
+        timing.usecs_per_call(
+            lambda: jwt.decode(token, verify=False), seconds),
+        timing.usecs_per_call(lambda: _json.loads(certs_response), seconds),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--seconds', type=float, default=1.0,
+        help='How long to measure each operation for.')
+    args = parser.parse_args()
+
+    certs = {}
+    for index, name in enumerate(('public_cert.pem', 'other_cert.pem')):
+        with open(os.path.join(DATA_DIR, name), 'r') as fh:
+            certs['key-{}'.format(index)] = fh.read()
+    certs_response = _json.dumps(certs)
+
+    print('{:<10}{:>12}{:>12}{:>12}'.format(
+        'codec', 'encode us', 'decode us', 'certs us'))
+    for name in CODECS:
+        try:
+            _json.set_codec(name)
+        except ImportError:
+            print('{:<10}{:>12}'.format(name, 'not installed'))
+            continue
+        print('{:<10}{:>12.1f}{:>12.1f}{:>12.1f}'.format(
+            name, *benchmark(certs_response, args.seconds)))
+
+
+if __name__ == '__main__':
+    main()
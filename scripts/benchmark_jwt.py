@@ -0,0 +1,99 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This program measures the cost of making JWTs.
+
+It compares :func:`google.auth.jwt.encode` with
+:class:`google.auth.jwt.Encoder` for a typical service account assertion,
+with an RSA signer and with a signer that doesn't sign, which shows the
+per-token overhead outside of the signature::
+
+    $ python scripts/benchmark_jwt.py --seconds 2
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+
+from google.auth import crypt
+from google.auth import jwt
+
+import timing
+
+HERE = os.path.dirname(__file__)
+DATA_DIR = os.path.abspath(os.path.join(HERE, '..', 'tests', 'data'))
+CLAIMS = {
+    'iss': 'service-account@example.iam.gserviceaccount.com',
+    'aud': 'https://accounts.google.com/o/oauth2/token',
+    'scope': 'https://www.googleapis.com/auth/cloud-platform',
+}
+TIMES = {'iat': 1485000000, 'exp': 1485003600}
+
+
+class NullSigner(crypt.Signer):
+    """A signer that returns a constant signature."""
+
+    @property
+    def key_id(self):
+        return 'key-id'
+
+    def sign(self, message):
+        return b'x' * 256
+
+
+def benchmark(signer, seconds):
+    """Measures making a token with a signer.
+
+    Args:
+        signer (google.auth.crypt.Signer): The signer.
+        seconds (float): How long to measure each operation for.
+
+    Returns:
+        Tuple[float, float]: The microseconds per token with
+            :func:`google.auth.jwt.encode` and with an encoder.
+    """
+    def encode():
+        payload = dict(CLAIMS)
+        payload.update(TIMES)
+        jwt.encode(signer, payload)
+
+    encoder = jwt.Encoder(signer, claims=CLAIMS)
+
+    return (
+        timing.usecs_per_call(encode, seconds),
+        timing.usecs_per_call(lambda: encoder.encode(TIMES), seconds),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--seconds', type=float, default=1.0,
+        help='How long to measure each operation for.')
+    args = parser.parse_args()
+
+    with open(os.path.join(DATA_DIR, 'privatekey.pem'), 'rb') as fh:
+        rsa_signer = crypt.RSASigner.from_string(fh.read(), 'key-id')
+
+    print('{:<24}{:>14}{:>14}'.format('signer', 'encode us', 'Encoder us'))
+    for name, signer in (
+            ('none (overhead only)', NullSigner()),
+            ('{} RSA'.format(crypt.BACKEND), rsa_signer)):
+        print('{:<24}{:>14.1f}{:>14.1f}'.format(
+            name, *benchmark(signer, args.seconds)))
+
+
+if __name__ == '__main__':
+    main()
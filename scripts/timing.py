@@ -0,0 +1,50 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures how long operations take, for the benchmark scripts."""
+
+import timeit
+
+
+def _seconds_per_call(func, seconds):
+    """Runs func repeatedly for about the given time.
+
+    Args:
+        func (Callable[[], Any]): The operation to measure.
+        seconds (float): How long to run it for.
+
+    Returns:
+        float: How long a call took on average, in seconds.
+    """
+    timer = timeit.Timer(func)
+    # Calibrate the number of calls so the measurement is long enough.
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= 0.2:
+            break
+        number *= 10
+    number = max(int(number / elapsed * seconds), 1)
+    return timer.timeit(number) / number
+
+
+def usecs_per_call(func, seconds):
+    """Runs func repeatedly for about the given time and returns its cost
+    in microseconds."""
+    return _seconds_per_call(func, seconds) * 1e6
+
+
+def ops_per_second(func, seconds):
+    """Runs func repeatedly for about the given time and returns its rate."""
+    return 1 / _seconds_per_call(func, seconds)
@@ -27,6 +27,10 @@ EXTRA_OAUTHLIB_DEPENDENCIES = (
     'requests-oauthlib>=0.7.0',
 )
 
+EXTRA_CRYPTOGRAPHY_DEPENDENCIES = (
+    'cryptography>=1.4.0',
+)
+
 
 with open('README.rst', 'r') as fh:
     long_description = fh.read()
@@ -44,6 +48,7 @@ setup(
     install_requires=DEPENDENCIES,
     extras_require={
         'oauthlib': EXTRA_OAUTHLIB_DEPENDENCIES,
+        'cryptography': EXTRA_CRYPTOGRAPHY_DEPENDENCIES,
     },
     license='Apache 2.0',
     keywords='google auth oauth client',
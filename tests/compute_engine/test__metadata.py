@@ -19,7 +19,9 @@ import mock
 import pytest
 from six.moves import http_client
 
+from google.auth import _cache
 from google.auth import _helpers
+from google.auth import environment_vars
 from google.auth import exceptions
 from google.auth.compute_engine import _metadata
 
@@ -171,3 +173,109 @@ def test_get_service_account_info(mock_request):
         headers=_metadata._METADATA_HEADERS)
 
     assert info[key] == value
+
+
+def test_get_caches_immutable_path(mock_request):
+    request_mock = mock_request(
+        'example-project', headers={'content-type': 'text/plain'})
+
+    assert _metadata.get_project_id(request_mock) == 'example-project'
+    assert _metadata.get_project_id(request_mock) == 'example-project'
+
+    assert request_mock.call_count == 1
+    assert _metadata.cache_info() == _cache.CacheInfo(
+        hits=1, misses=1, maxsize=_metadata._CACHE_SIZE, currsize=1)
+
+
+def test_get_does_not_cache_other_paths(mock_request):
+    request_mock = mock_request(
+        json.dumps({'foo': 'bar'}),
+        headers={'content-type': 'application/json'})
+
+    _metadata.get_service_account_info(request_mock)
+    _metadata.get_service_account_info(request_mock)
+
+    assert request_mock.call_count == 2
+    assert _metadata.cache_info().currsize == 0
+
+
+def test_get_does_not_cache_errors(mock_request):
+    request_mock = mock_request(
+        'Metadata error', status=http_client.NOT_FOUND)
+
+    for _ in range(2):
+        with pytest.raises(exceptions.TransportError):
+            _metadata.get_project_id(request_mock)
+
+    assert request_mock.call_count == 2
+
+
+def test_get_does_not_cache_token(mock_request):
+    request_mock = mock_request(
+        json.dumps({'access_token': 'token', 'expires_in': 500}),
+        headers={'content-type': 'application/json'})
+
+    # The credentials ask for a token when theirs must be replaced, for
+    # example after it was rejected, so the same token must not be returned.
+    for _ in range(2):
+        _metadata.get_service_account_token(request_mock)
+
+    assert request_mock.call_count == 2
+    assert _metadata.cache_info().currsize == 0
+
+
+def test_clear_cache(mock_request):
+    request_mock = mock_request(
+        'example-project', headers={'content-type': 'text/plain'})
+    _metadata.get_project_id(request_mock)
+
+    _metadata.clear_cache()
+    _metadata.get_project_id(request_mock)
+
+    assert request_mock.call_count == 2
+
+
+@pytest.fixture
+def sysfs_root(tmpdir, monkeypatch):
+    monkeypatch.delenv(environment_vars.GCE_METADATA_HOST, raising=False)
+    monkeypatch.delenv(environment_vars.GCE_METADATA_IP, raising=False)
+    monkeypatch.setattr('sys.platform', 'linux')
+
+    def set_product_name(product_name):
+        product_name_file = tmpdir.join(_metadata._DMI_PRODUCT_NAME_PATH)
+        product_name_file.write(product_name, ensure=True)
+        return str(tmpdir)
+
+    return set_product_name
+
+
+def test_detect_gce_locally_gce(sysfs_root):
+    root = sysfs_root('Google Compute Engine\n')
+
+    assert _metadata.detect_gce_locally(root) is True
+
+
+def test_detect_gce_locally_other(sysfs_root):
+    root = sysfs_root('VirtualBox\n')
+
+    assert _metadata.detect_gce_locally(root) is False
+
+
+def test_detect_gce_locally_no_dmi(sysfs_root, tmpdir):
+    assert _metadata.detect_gce_locally(str(tmpdir)) is None
+
+
+def test_detect_gce_locally_not_linux(sysfs_root, monkeypatch):
+    root = sysfs_root('VirtualBox\n')
+    monkeypatch.setattr('sys.platform', 'win32')
+
+    assert _metadata.detect_gce_locally(root) is None
+
+
+@pytest.mark.parametrize('name', [
+    environment_vars.GCE_METADATA_HOST, environment_vars.GCE_METADATA_IP])
+def test_detect_gce_locally_metadata_override(name, sysfs_root, monkeypatch):
+    root = sysfs_root('VirtualBox\n')
+    monkeypatch.setenv(name, 'localhost:8080')
+
+    assert _metadata.detect_gce_locally(root) is None
@@ -18,6 +18,7 @@ import mock
 import pytest
 
 from google.auth import exceptions
+from google.auth import token_cache
 from google.auth.compute_engine import credentials
 
 
@@ -68,6 +69,72 @@ class TestCredentials(object):
         # expired)
         assert self.credentials.valid
 
+    @mock.patch('google.auth.compute_engine._metadata.get', autospec=True)
+    def test_refresh_retrieves_info_once(self, get_mock):
+        get_mock.side_effect = [{
+            'email': 'service-account@example.com',
+            'scopes': ['one', 'two']
+        }, {
+            'access_token': 'token',
+            'expires_in': 500
+        }, {
+            'access_token': 'token2',
+            'expires_in': 500
+        }]
+
+        self.credentials.refresh(None)
+        self.credentials.refresh(None)
+
+        assert self.credentials.token == 'token2'
+        assert get_mock.call_count == 3
+        # The second refresh only asked for the token, using the email.
+        assert get_mock.call_args[0][1] == (
+            'instance/service-accounts/service-account@example.com/token')
+
+    @mock.patch('google.auth.compute_engine._metadata.get', autospec=True)
+    def test_invalidate_service_account_info(self, get_mock):
+        get_mock.side_effect = [{
+            'email': 'service-account@example.com',
+            'scopes': ['one']
+        }, {
+            'access_token': 'token',
+            'expires_in': 500
+        }, {
+            'email': 'service-account@example.com',
+            'scopes': ['one', 'two']
+        }, {
+            'access_token': 'token2',
+            'expires_in': 500
+        }]
+        self.credentials.refresh(None)
+
+        self.credentials.invalidate_service_account_info()
+        self.credentials.refresh(None)
+
+        assert get_mock.call_count == 4
+        # The info is looked up for the account originally asked for.
+        assert get_mock.call_args_list[2][0][1] == (
+            'instance/service-accounts/default/')
+        assert self.credentials._scopes == ['one', 'two']
+
+    @mock.patch('google.auth.compute_engine._metadata.get', autospec=True)
+    def test_refresh_info_error_retried(self, get_mock):
+        get_mock.side_effect = [exceptions.TransportError('http error'), {
+            'email': 'service-account@example.com',
+            'scopes': ['one']
+        }, {
+            'access_token': 'token',
+            'expires_in': 500
+        }]
+
+        with pytest.raises(exceptions.RefreshError):
+            self.credentials.refresh(None)
+        self.credentials.refresh(None)
+
+        assert self.credentials.token == 'token'
+        assert (self.credentials.service_account_email ==
+                'service-account@example.com')
+
     @mock.patch('google.auth.compute_engine._metadata.get', autospec=True)
     def test_refresh_error(self, get_mock):
         get_mock.side_effect = exceptions.TransportError('http error')
@@ -105,3 +172,27 @@ class TestCredentials(object):
     def test_with_scopes(self):
         with pytest.raises(NotImplementedError):
             self.credentials.with_scopes(['one', 'two'])
+
+    @mock.patch('google.auth.compute_engine._metadata.get', autospec=True)
+    def test_refresh_token_cache(self, get_mock, tmpdir):
+        get_mock.side_effect = [{
+            'email': 'service-account@example.com',
+            'scopes': ['one', 'two']
+        }, {
+            'access_token': 'token',
+            'expires_in': 500
+        }]
+        cache = token_cache.SQLiteTokenCache(str(tmpdir.join('tokens.db')))
+        self.credentials = credentials.Credentials(token_cache=cache)
+
+        self.credentials.refresh(None)
+        assert get_mock.call_count == 2
+
+        # A different instance (for example in another process) doesn't need
+        # to talk to the metadata server.
+        other_credentials = credentials.Credentials(token_cache=cache)
+        other_credentials.refresh(None)
+
+        assert get_mock.call_count == 2
+        assert other_credentials.token == 'token'
+        assert other_credentials.valid
@@ -0,0 +1,94 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from google.auth import crypt
+from google.auth.crypt import _cryptography_rsa
+from google.auth.crypt import _python_rsa
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+with open(os.path.join(DATA_DIR, 'privatekey.pem'), 'rb') as fh:
+    PRIVATE_KEY_BYTES = fh.read()
+
+with open(os.path.join(DATA_DIR, 'public_cert.pem'), 'rb') as fh:
+    PUBLIC_CERT_BYTES = fh.read()
+
+with open(os.path.join(DATA_DIR, 'other_cert.pem'), 'rb') as fh:
+    OTHER_CERT_BYTES = fh.read()
+
+
+def test_backend_prefers_cryptography():
+    assert crypt.BACKEND == 'cryptography'
+    assert crypt.RSASigner is _cryptography_rsa.RSASigner
+    assert crypt.RSAVerifier is _cryptography_rsa.RSAVerifier
+
+
+def test_verify_signature():
+    to_sign = b'foo'
+    signer = crypt.RSASigner.from_string(PRIVATE_KEY_BYTES)
+    signature = signer.sign(to_sign)
+
+    assert crypt.verify_signature(
+        to_sign, signature, PUBLIC_CERT_BYTES)
+
+    # List of certs
+    assert crypt.verify_signature(
+        to_sign, signature, [OTHER_CERT_BYTES, PUBLIC_CERT_BYTES])
+
+
+def test_verify_signature_failure():
+    to_sign = b'foo'
+    signer = crypt.RSASigner.from_string(PRIVATE_KEY_BYTES)
+    signature = signer.sign(to_sign)
+
+    assert not crypt.verify_signature(
+        to_sign, signature, OTHER_CERT_BYTES)
+
+
+def test_verify_signature_parses_each_cert_once():
+    signer = crypt.RSASigner.from_string(PRIVATE_KEY_BYTES)
+    messages = [b'foo', b'bar', b'baz']
+
+    for message in messages:
+        assert crypt.verify_signature(
+            message, signer.sign(message),
+            [OTHER_CERT_BYTES, PUBLIC_CERT_BYTES])
+
+    info = crypt.verifier_cache_info()
+    assert info.misses == 2
+    assert info.hits == 4
+    assert info.currsize == 2
+
+
+def test_verifier_from_string_cached():
+    verifier = crypt.RSAVerifier.from_string(PUBLIC_CERT_BYTES)
+    # The cache is keyed by the bytes, no matter how they are passed in.
+    assert crypt.RSAVerifier.from_string(
+        PUBLIC_CERT_BYTES.decode('utf-8')) is verifier
+
+    crypt.clear_verifier_cache()
+
+    assert crypt.RSAVerifier.from_string(PUBLIC_CERT_BYTES) is not verifier
+    assert crypt.verifier_cache_info().misses == 1
+
+
+def test_verifier_cache_keyed_by_class():
+    python_verifier = _python_rsa.RSAVerifier.from_string(PUBLIC_CERT_BYTES)
+    verifier = _cryptography_rsa.RSAVerifier.from_string(PUBLIC_CERT_BYTES)
+
+    assert isinstance(python_verifier, _python_rsa.RSAVerifier)
+    assert isinstance(verifier, _cryptography_rsa.RSAVerifier)
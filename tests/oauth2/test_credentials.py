@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import datetime
+import pickle
 
 import mock
 import pytest
@@ -83,3 +85,13 @@ class TestCredentials(object):
         # Check that the credentials are valid (have a token and are not
         # expired)
         assert self.credentials.valid
+
+    def test_pickle_and_copy(self):
+        self.credentials.token = 'token'
+
+        for copied in (
+                pickle.loads(pickle.dumps(self.credentials)),
+                copy.deepcopy(self.credentials)):
+            assert copied.token == 'token'
+            assert copied.refresh_token == self.REFRESH_TOKEN
+            assert copied._refresh_lock is not self.credentials._refresh_lock
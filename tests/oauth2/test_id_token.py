@@ -12,19 +12,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import datetime
+import gc
 import json
+import os
+import threading
 
 import mock
 import pytest
 
+from google.auth import _refresh_worker
+from google.auth import crypt
 from google.auth import exceptions
 import google.auth.transport
 from google.oauth2 import id_token
 
 
-def make_request(status, data=None):
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+with open(os.path.join(DATA_DIR, 'public_cert.pem'), 'rb') as fh:
+    PUBLIC_CERT_BYTES = fh.read()
+
+
+def make_request(status, data=None, headers=None):
     response = mock.Mock()
     response.status = status
+    response.headers = headers or {}
 
     if data is not None:
         response.data = json.dumps(data).encode('utf-8')
@@ -95,7 +109,8 @@ def test_verify_oauth2_token(verify_token):
         mock.sentinel.token,
         mock.sentinel.request,
         audience=mock.sentinel.audience,
-        certs_url=id_token._GOOGLE_OAUTH2_CERTS_URL)
+        certs_url=id_token._GOOGLE_OAUTH2_CERTS_URL,
+        cert_store=None)
 
 
 @mock.patch('google.oauth2.id_token.verify_token', autospec=True)
@@ -110,4 +125,389 @@ def test_verify_firebase_token(verify_token):
         mock.sentinel.token,
         mock.sentinel.request,
         audience=mock.sentinel.audience,
-        certs_url=id_token._GOOGLE_APIS_CERTS_URL)
+        certs_url=id_token._GOOGLE_APIS_CERTS_URL,
+        cert_store=None)
+
+
+@mock.patch('google.oauth2.id_token.verify_token', autospec=True)
+def test_verify_oauth2_token_cert_store(verify_token):
+    id_token.verify_oauth2_token(
+        mock.sentinel.token,
+        mock.sentinel.request,
+        cert_store=mock.sentinel.cert_store)
+
+    verify_token.assert_called_once_with(
+        mock.sentinel.token,
+        mock.sentinel.request,
+        audience=None,
+        certs_url=id_token._GOOGLE_OAUTH2_CERTS_URL,
+        cert_store=mock.sentinel.cert_store)
+
+
+@mock.patch('google.oauth2.id_token.verify_token', autospec=True)
+def test_verify_firebase_token_cert_store(verify_token):
+    id_token.verify_firebase_token(
+        mock.sentinel.token,
+        mock.sentinel.request,
+        cert_store=mock.sentinel.cert_store)
+
+    verify_token.assert_called_once_with(
+        mock.sentinel.token,
+        mock.sentinel.request,
+        audience=None,
+        certs_url=id_token._GOOGLE_APIS_CERTS_URL,
+        cert_store=mock.sentinel.cert_store)
+
+
+@mock.patch('google.auth.jwt.decode', autospec=True)
+@mock.patch('google.auth.jwt.decode_header', autospec=True)
+def test_verify_token_cert_store(decode_header, decode):
+    decode_header.return_value = {'kid': '1'}
+    cert_store = mock.create_autospec(id_token.CertificateStore)
+
+    result = id_token.verify_token(
+        mock.sentinel.token, mock.sentinel.request, cert_store=cert_store)
+
+    assert result == decode.return_value
+    cert_store.get_certs.assert_called_once_with(
+        mock.sentinel.request, key_id='1')
+    decode.assert_called_once_with(
+        mock.sentinel.token,
+        certs=cert_store.get_certs.return_value,
+        audience=None)
+
+
+@mock.patch('google.auth.jwt.decode_many', autospec=True)
+@mock.patch('google.oauth2.id_token._fetch_certs', autospec=True)
+def test_verify_tokens(_fetch_certs, decode_many):
+    tokens = [mock.sentinel.token1, mock.sentinel.token2]
+
+    result = id_token.verify_tokens(
+        tokens, mock.sentinel.request, audience=mock.sentinel.audience)
+
+    assert result == decode_many.return_value
+    _fetch_certs.assert_called_once_with(
+        mock.sentinel.request, id_token._GOOGLE_OAUTH2_CERTS_URL)
+    decode_many.assert_called_once_with(
+        tokens,
+        certs=_fetch_certs.return_value,
+        audience=mock.sentinel.audience)
+
+
+@mock.patch('google.auth.jwt.decode_many', autospec=True)
+@mock.patch('google.auth.jwt.decode_header', autospec=True)
+def test_verify_tokens_cert_store(decode_header, decode_many):
+    certs = {'1': 'cert1'}
+    new_certs = {'1': 'cert1', '2': 'cert2'}
+    decode_header.side_effect = [
+        {'kid': '1'}, {'kid': '2'}, {}, ValueError()]
+    cert_store = mock.create_autospec(id_token.CertificateStore)
+    cert_store.get_certs.side_effect = [certs, new_certs]
+    tokens = [mock.sentinel.token1, mock.sentinel.token2,
+              mock.sentinel.token3, mock.sentinel.token4]
+
+    id_token.verify_tokens(
+        tokens, mock.sentinel.request, cert_store=cert_store)
+
+    # The certificates are refetched once, for the unknown key ID.
+    assert cert_store.get_certs.call_args_list == [
+        mock.call(mock.sentinel.request),
+        mock.call(mock.sentinel.request, key_id='2')]
+    decode_many.assert_called_once_with(
+        tokens, certs=new_certs, audience=None)
+
+
+@mock.patch('google.auth.jwt.decode_many', autospec=True)
+def test_verify_tokens_cert_store_generator(decode_many):
+    cert_store = mock.create_autospec(id_token.CertificateStore)
+    cert_store.get_certs.return_value = {}
+    tokens = [
+        # Malformed headers are left for decode_many to report.
+        b'.'.join([
+            base64.urlsafe_b64encode(b'["kid"]'), b'e30', b'signature']),
+        b'.'.join([
+            base64.urlsafe_b64encode(b'{"kid": ["1"]}'), b'e30',
+            b'signature']),
+    ]
+
+    id_token.verify_tokens(
+        (token for token in tokens), mock.sentinel.request,
+        cert_store=cert_store)
+
+    cert_store.get_certs.assert_called_once_with(mock.sentinel.request)
+    decode_many.assert_called_once_with(
+        tokens, certs={}, audience=None)
+
+
+NOW = datetime.datetime(2017, 1, 1, 12, 0, 0)
+
+
+class TestGetExpiry(object):
+    def test_max_age(self):
+        headers = {'Cache-Control': 'public, max-age=19845, must-revalidate'}
+
+        assert id_token._get_expiry(headers, NOW) == (
+            NOW + datetime.timedelta(seconds=19845))
+
+    def test_max_age_minus_age(self):
+        headers = {'cache-control': 'max-age=100', 'age': '40'}
+
+        assert id_token._get_expiry(headers, NOW) == (
+            NOW + datetime.timedelta(seconds=60))
+
+    def test_max_age_invalid_age(self):
+        headers = {'cache-control': 'max-age=100', 'age': 'bogus'}
+
+        assert id_token._get_expiry(headers, NOW) == (
+            NOW + datetime.timedelta(seconds=100))
+
+    def test_max_age_over_expires(self):
+        headers = {
+            'cache-control': 'max-age=100',
+            'expires': 'Sun, 01 Jan 2017 18:00:00 GMT'}
+
+        assert id_token._get_expiry(headers, NOW) == (
+            NOW + datetime.timedelta(seconds=100))
+
+    @pytest.mark.parametrize('cache_control', ['no-cache', 'no-store'])
+    def test_no_cache(self, cache_control):
+        headers = {'cache-control': cache_control + ', max-age=100'}
+
+        assert id_token._get_expiry(headers, NOW) == NOW
+
+    def test_expires_relative_to_date(self):
+        # The server's clock is an hour behind ours.
+        headers = {
+            'expires': 'Sun, 01 Jan 2017 11:30:00 GMT',
+            'date': 'Sun, 01 Jan 2017 11:00:00 GMT'}
+
+        assert id_token._get_expiry(headers, NOW) == (
+            NOW + datetime.timedelta(minutes=30))
+
+    def test_expires_without_date(self):
+        headers = {'expires': 'Sun, 01 Jan 2017 12:30:00 GMT'}
+
+        assert id_token._get_expiry(headers, NOW) == (
+            NOW + datetime.timedelta(minutes=30))
+
+    def test_expires_in_past(self):
+        headers = {'expires': 'Sun, 01 Jan 2017 11:30:00 GMT'}
+
+        assert id_token._get_expiry(headers, NOW) == NOW
+
+    def test_no_headers(self):
+        assert id_token._get_expiry({}, NOW) == NOW
+
+
+class TestCertificateStore(object):
+    CERTS = {'1': 'cert1', '2': 'cert2'}
+    HEADERS = {'cache-control': 'max-age=3600'}
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_get_certs(self, utcnow):
+        request = make_request(200, self.CERTS, self.HEADERS)
+        cert_store = id_token.CertificateStore(mock.sentinel.certs_url)
+
+        assert cert_store.get_certs(request) == self.CERTS
+        assert cert_store.get_certs(request, key_id='1') == self.CERTS
+
+        request.assert_called_once_with(mock.sentinel.certs_url, method='GET')
+
+    def test_default_url(self):
+        cert_store = id_token.CertificateStore()
+        assert cert_store.certs_url == id_token.GOOGLE_OAUTH2_CERTS_URL
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_get_certs_expired(self, utcnow):
+        request = make_request(200, self.CERTS, self.HEADERS)
+        cert_store = id_token.CertificateStore(mock.sentinel.certs_url)
+        cert_store.get_certs(request)
+
+        utcnow.return_value = NOW + datetime.timedelta(hours=1)
+        cert_store.get_certs(request)
+
+        assert request.call_count == 2
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_get_certs_not_cacheable(self, utcnow):
+        request = make_request(200, self.CERTS)
+        cert_store = id_token.CertificateStore(mock.sentinel.certs_url)
+
+        cert_store.get_certs(request)
+        cert_store.get_certs(request)
+
+        assert request.call_count == 2
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_get_certs_unknown_key_id(self, utcnow):
+        request = make_request(200, self.CERTS, self.HEADERS)
+        cert_store = id_token.CertificateStore(mock.sentinel.certs_url)
+        cert_store.get_certs(request)
+
+        # Refetching right away is throttled.
+        cert_store.get_certs(request, key_id='3')
+        assert request.call_count == 1
+
+        utcnow.return_value = NOW + id_token._MIN_REFETCH_INTERVAL
+        cert_store.get_certs(request, key_id='3')
+        assert request.call_count == 2
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_get_certs_failure(self, utcnow):
+        request = make_request(404)
+        cert_store = id_token.CertificateStore(mock.sentinel.certs_url)
+
+        with pytest.raises(exceptions.TransportError):
+            cert_store.get_certs(request)
+
+    def test_get_certs_single_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+        response = make_request(200, self.CERTS, self.HEADERS).return_value
+
+        def slow_request(url, method):
+            started.set()
+            release.wait()
+            return response
+
+        request = mock.Mock(side_effect=slow_request)
+        cert_store = id_token.CertificateStore(mock.sentinel.certs_url)
+        results = []
+
+        def get_certs():
+            results.append(cert_store.get_certs(request))
+
+        threads = [threading.Thread(target=get_certs) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        started.wait()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == [self.CERTS] * 5
+        request.assert_called_once_with(mock.sentinel.certs_url, method='GET')
+
+
+class TestCertificateStoreBackgroundRefresh(object):
+    CERTS = {'1': PUBLIC_CERT_BYTES.decode('utf-8')}
+    HEADERS = {'cache-control': 'max-age=3600'}
+
+    def make_store(self):
+        scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+        request = make_request(200, self.CERTS, self.HEADERS)
+        cert_store = id_token.CertificateStore(mock.sentinel.certs_url)
+        cert_store.enable_background_refresh(request, scheduler=scheduler)
+        return cert_store, request, scheduler
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_refresh(self, utcnow):
+        crypt.clear_verifier_cache()
+        cert_store, request, scheduler = self.make_store()
+
+        # The certificates are fetched right away.
+        delay, callback = scheduler.schedule.call_args[0]
+        assert delay == 0
+        assert not request.called
+
+        callback()
+
+        request.assert_called_once_with(mock.sentinel.certs_url, method='GET')
+        assert cert_store.last_refresh == NOW
+        assert cert_store.failure_count == 0
+        # The certificate was parsed ahead of time.
+        assert crypt.verifier_cache_info().currsize == 1
+        # And the next refresh is scheduled before they expire.
+        delay, _ = scheduler.schedule.call_args[0]
+        assert delay == 3600 - 300
+
+        # Verifying doesn't need to fetch the certificates.
+        assert cert_store.get_certs(request, key_id='1') == self.CERTS
+        assert request.call_count == 1
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_refresh_invalid_certificate(self, utcnow):
+        cert_store, request, scheduler = self.make_store()
+        certs = {'1': 'not a certificate'}
+        request.return_value.data = json.dumps(certs).encode('utf-8')
+        _, callback = scheduler.schedule.call_args[0]
+
+        # A certificate that can't be parsed is logged and otherwise ignored.
+        callback()
+
+        assert cert_store.get_certs(request, key_id='1') == certs
+        assert cert_store.failure_count == 0
+        assert scheduler.schedule.call_count == 2
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_refresh_short_max_age(self, utcnow):
+        cert_store, request, scheduler = self.make_store()
+        request.return_value.headers = {'cache-control': 'max-age=0'}
+        _, callback = scheduler.schedule.call_args[0]
+
+        callback()
+
+        delay, _ = scheduler.schedule.call_args[0]
+        assert delay == id_token._MIN_REFETCH_INTERVAL.total_seconds()
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_refresh_failure(self, utcnow):
+        cert_store, request, scheduler = self.make_store()
+        request.return_value.status = 500
+        _, callback = scheduler.schedule.call_args[0]
+
+        callback()
+
+        assert cert_store.failure_count == 1
+        assert cert_store.last_refresh is None
+        delay, callback = scheduler.schedule.call_args[0]
+        assert delay == (
+            id_token._BACKGROUND_REFRESH_RETRY_DELAY.total_seconds())
+
+        request.return_value.status = 200
+        callback()
+
+        assert cert_store.failure_count == 1
+        assert cert_store.last_refresh == NOW
+
+    @mock.patch('google.auth._helpers.utcnow', return_value=NOW)
+    def test_failure_count_foreground(self, utcnow):
+        request = make_request(404)
+        cert_store = id_token.CertificateStore(mock.sentinel.certs_url)
+
+        with pytest.raises(exceptions.TransportError):
+            cert_store.get_certs(request)
+
+        assert cert_store.failure_count == 1
+
+    def test_disable(self):
+        cert_store, request, scheduler = self.make_store()
+        job = scheduler.schedule.return_value
+        _, callback = scheduler.schedule.call_args[0]
+
+        cert_store.disable_background_refresh()
+
+        job.cancel.assert_called_once_with()
+        # A refresh that was already running when it was disabled does
+        # nothing.
+        callback()
+        assert not request.called
+
+    def test_enable_replaces(self):
+        cert_store, _, scheduler = self.make_store()
+        job = scheduler.schedule.return_value
+
+        cert_store.enable_background_refresh(
+            mock.sentinel.request, scheduler=scheduler)
+
+        job.cancel.assert_called_once_with()
+
+    def test_does_not_keep_store_alive(self):
+        cert_store, request, scheduler = self.make_store()
+        _, callback = scheduler.schedule.call_args[0]
+
+        del cert_store
+        gc.collect()
+        callback()
+
+        assert not request.called
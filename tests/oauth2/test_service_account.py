@@ -12,16 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import datetime
 import json
 import os
+import pickle
 
 import mock
 import pytest
 
 from google.auth import _helpers
 from google.auth import crypt
+from google.auth import exceptions
 from google.auth import jwt
+from google.auth import token_cache
 from google.oauth2 import service_account
 
 
@@ -199,3 +203,265 @@ class TestCredentials(object):
 
         # Credentials should now be valid.
         assert self.credentials.valid
+
+    def test_default_token_cache(self):
+        assert isinstance(
+            self.credentials._token_cache, token_cache.MemoryTokenCache)
+
+        other_credentials = service_account.Credentials(
+            self.credentials.signer, self.SERVICE_ACCOUNT_EMAIL,
+            self.TOKEN_URI)
+
+        # Credentials created independently don't share tokens.
+        assert other_credentials._token_cache is not (
+            self.credentials._token_cache)
+
+    def test_pickle_and_copy(self):
+        credentials = service_account.Credentials.from_service_account_info(
+            SERVICE_ACCOUNT_INFO)
+        credentials._token_cache.set('key', 'token', None)
+
+        for copied in (
+                pickle.loads(pickle.dumps(credentials)),
+                copy.deepcopy(credentials)):
+            assert copied.service_account_email == (
+                credentials.service_account_email)
+            assert copied.signer.sign(b'foo') == (
+                credentials.signer.sign(b'foo'))
+            # The copies start with an empty token cache.
+            assert isinstance(
+                copied._token_cache, token_cache.MemoryTokenCache)
+            assert len(copied._token_cache) == 0
+
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_refresh_default_token_cache_shared(self, jwt_grant_mock):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=500)
+        jwt_grant_mock.return_value = ('token', expiry, None)
+        credentials = self.credentials.with_scopes(['email'])
+
+        credentials.with_subject('user@example.com').refresh(None)
+        # Fresh credentials for the same subject and scopes reuse the token.
+        delegated = credentials.with_subject('user@example.com')
+        delegated.refresh(None)
+
+        assert jwt_grant_mock.call_count == 1
+        assert delegated.token == 'token'
+        assert delegated.valid
+
+        credentials.with_subject('other@example.com').refresh(None)
+        credentials.with_scopes(['profile']).with_subject(
+            'user@example.com').refresh(None)
+
+        assert jwt_grant_mock.call_count == 3
+
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_self_signed_jwt(self, jwt_grant_mock):
+        credentials = self.credentials.with_self_signed_jwt()
+        headers = {}
+
+        assert credentials.valid
+        assert not credentials.requires_scopes
+
+        credentials.before_request(
+            None, 'GET', 'https://example.com/api/1?a=b', headers)
+
+        assert not jwt_grant_mock.called
+        token = headers['authorization'].split(' ')[1].encode('utf-8')
+        payload = jwt.decode(token, PUBLIC_CERT_BYTES)
+        assert payload['iss'] == self.SERVICE_ACCOUNT_EMAIL
+        assert payload['sub'] == self.SERVICE_ACCOUNT_EMAIL
+        assert payload['aud'] == 'https://example.com/'
+
+        # The JWT is cached for the service, whatever the resource.
+        for url in ('https://example.com/api/1', 'https://example.com/api/2',
+                    'https://example.com/other/resource?x=y'):
+            other_headers = {}
+            credentials.before_request(None, 'GET', url, other_headers)
+            assert other_headers == headers
+
+        # Other services get their own JWT.
+        other_headers = {}
+        credentials.before_request(
+            None, 'GET', 'https://other.example.com/api/1', other_headers)
+        token = other_headers['authorization'].split(' ')[1].encode('utf-8')
+        payload = jwt.decode(token, PUBLIC_CERT_BYTES)
+        assert payload['aud'] == 'https://other.example.com/'
+
+    def test_self_signed_jwt_refresh(self):
+        credentials = service_account.Credentials(
+            self.credentials.signer, self.SERVICE_ACCOUNT_EMAIL,
+            self.TOKEN_URI, self_signed_jwt=True)
+        credentials.refresh(None)
+        headers = {}
+        credentials.before_request(None, 'GET', 'https://example.com', headers)
+
+        with mock.patch(
+                'google.auth._helpers.utcnow',
+                return_value=_helpers.utcnow() + datetime.timedelta(
+                    seconds=1)):
+            credentials.refresh(None)
+            new_headers = {}
+            credentials.before_request(
+                None, 'GET', 'https://example.com', new_headers)
+
+        # A new JWT is signed after a refresh, for example after a 401.
+        assert new_headers != headers
+
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_self_signed_jwt_falls_back(self, jwt_grant_mock):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=500)
+        jwt_grant_mock.return_value = ('token', expiry, None)
+        credentials = self.credentials.with_self_signed_jwt()
+
+        for derived in (credentials.with_scopes(['email']),
+                        credentials.with_subject('user@example.com')):
+            headers = {}
+            assert not derived.valid
+            derived.before_request(None, 'GET', 'https://example.com', headers)
+            assert headers['authorization'] == 'Bearer token'
+
+        assert jwt_grant_mock.call_count == 2
+        assert credentials.with_subject('user@example.com').requires_scopes
+
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_with_subjects(self, jwt_grant_mock):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=500)
+
+        def jwt_grant(request, token_uri, assertion):
+            payload = jwt.decode(assertion, PUBLIC_CERT_BYTES)
+            return 'token-' + payload['sub'], expiry, None
+
+        jwt_grant_mock.side_effect = jwt_grant
+        subjects = ['user{}@example.com'.format(n) for n in range(20)]
+
+        delegated = self.credentials.with_subjects(
+            subjects + subjects[:5], mock.sentinel.request, max_workers=4)
+
+        assert sorted(delegated) == sorted(subjects)
+        for subject, credentials in delegated.items():
+            assert credentials._subject == subject
+            assert credentials.token == 'token-' + subject
+            assert credentials.valid
+        assert jwt_grant_mock.call_count == len(subjects)
+        for call in jwt_grant_mock.call_args_list:
+            assert call[0][0] is mock.sentinel.request
+
+        # The tokens are in the shared cache.
+        credentials = self.credentials.with_subject(subjects[0])
+        credentials.refresh(None)
+        assert credentials.token == 'token-' + subjects[0]
+        assert jwt_grant_mock.call_count == len(subjects)
+
+    def test_with_subjects_empty(self):
+        assert self.credentials.with_subjects([], None) == {}
+
+    @pytest.mark.parametrize('error', [
+        exceptions.RefreshError('suspended'),
+        # A malformed token response.
+        ValueError('bad response')])
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_with_subjects_error(self, jwt_grant_mock, error):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=500)
+
+        def jwt_grant(request, token_uri, assertion):
+            subject = jwt.decode(assertion, PUBLIC_CERT_BYTES)['sub']
+            if subject == 'b':
+                raise error
+            return 'token-' + subject, expiry, None
+
+        jwt_grant_mock.side_effect = jwt_grant
+
+        with pytest.raises(exceptions.PartialRefreshError) as excinfo:
+            self.credentials.with_subjects(['a', 'b', 'c'], None)
+
+        # One failure doesn't stop the other subjects from being refreshed.
+        assert excinfo.match('Could not refresh 1 of 3 credentials')
+        assert isinstance(excinfo.value, exceptions.RefreshError)
+        assert excinfo.value.errors == {'b': error}
+        delegated = excinfo.value.credentials
+        assert sorted(delegated) == ['a', 'c']
+        assert delegated['c'].token == 'token-c'
+        assert jwt_grant_mock.call_count == 3
+
+    def test_partial_refresh_error_pickle(self):
+        error = exceptions.PartialRefreshError(
+            'message', {'b': 'error'}, {'a': 'credentials'})
+
+        copied = pickle.loads(pickle.dumps(error))
+
+        assert copied.errors == {'b': 'error'}
+        assert copied.credentials == {'a': 'credentials'}
+
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_with_scope_sets(self, jwt_grant_mock):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=500)
+
+        def jwt_grant(request, token_uri, assertion):
+            payload = jwt.decode(assertion, PUBLIC_CERT_BYTES)
+            return 'token-' + payload['scope'], expiry, None
+
+        jwt_grant_mock.side_effect = jwt_grant
+
+        scoped = self.credentials.with_scope_sets(
+            [['email'], ['email', 'profile']], None)
+
+        assert scoped[('email',)].token == 'token-email'
+        assert scoped[('email', 'profile')].token == 'token-email profile'
+        assert scoped[('email', 'profile')]._scopes == ['email', 'profile']
+
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_refresh_token_cache(self, jwt_grant_mock, tmpdir):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=500)
+        jwt_grant_mock.return_value = ('token', expiry, None)
+        cache = token_cache.SQLiteTokenCache(str(tmpdir.join('tokens.db')))
+        credentials = service_account.Credentials(
+            self.credentials.signer, self.SERVICE_ACCOUNT_EMAIL,
+            self.TOKEN_URI, scopes=['email'], token_cache=cache)
+
+        credentials.refresh(None)
+        assert jwt_grant_mock.call_count == 1
+
+        # A different instance with the same identity uses the cached token.
+        other_credentials = service_account.Credentials(
+            self.credentials.signer, self.SERVICE_ACCOUNT_EMAIL,
+            self.TOKEN_URI, scopes=['email'], token_cache=cache)
+        other_credentials.refresh(None)
+
+        assert jwt_grant_mock.call_count == 1
+        assert other_credentials.token == 'token'
+        assert other_credentials.valid
+
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_refresh_token_cache_key(self, jwt_grant_mock, tmpdir):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=500)
+        jwt_grant_mock.return_value = ('token', expiry, None)
+        cache = token_cache.SQLiteTokenCache(str(tmpdir.join('tokens.db')))
+        credentials = service_account.Credentials(
+            self.credentials.signer, self.SERVICE_ACCOUNT_EMAIL,
+            self.TOKEN_URI, scopes=['email'], token_cache=cache)
+        credentials.refresh(None)
+
+        # Different scopes or subjects need their own tokens.
+        credentials.with_scopes(['profile']).refresh(None)
+        credentials.with_subject('user@example.com').refresh(None)
+
+        assert jwt_grant_mock.call_count == 3
+
+    @mock.patch('google.oauth2._client.jwt_grant', autospec=True)
+    def test_refresh_token_cache_replaces_current_token(
+            self, jwt_grant_mock, tmpdir):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=500)
+        jwt_grant_mock.side_effect = [
+            ('token', expiry, None), ('token2', expiry, None)]
+        cache = token_cache.SQLiteTokenCache(str(tmpdir.join('tokens.db')))
+        credentials = service_account.Credentials(
+            self.credentials.signer, self.SERVICE_ACCOUNT_EMAIL,
+            self.TOKEN_URI, token_cache=cache)
+
+        credentials.refresh(None)
+        # Refreshing again, for example after a 401 response, must not
+        # return the same token from the cache.
+        credentials.refresh(None)
+
+        assert credentials.token == 'token2'
+        assert cache.get(credentials._make_token_cache_key())[0] == 'token2'
@@ -0,0 +1,121 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import pickle
+
+import mock
+import pytest
+
+from google.auth import _cache
+
+
+def test_get_missing():
+    cache = _cache.LRUCache(2)
+
+    assert cache.get('a') is None
+    assert cache.get('a', default=1) == 1
+    assert cache.info() == _cache.CacheInfo(
+        hits=0, misses=2, maxsize=2, currsize=0)
+
+
+def test_set_and_get():
+    cache = _cache.LRUCache(2)
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert len(cache) == 1
+    assert cache.info() == _cache.CacheInfo(
+        hits=1, misses=0, maxsize=2, currsize=1)
+
+
+def test_evicts_least_recently_used():
+    cache = _cache.LRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    # Using 'a' makes 'b' the least recently used entry.
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_set_replaces():
+    cache = _cache.LRUCache(2)
+    cache.set('a', 1)
+    cache.set('a', 2)
+
+    assert cache.get('a') == 2
+    assert len(cache) == 1
+
+
+def test_get_or_create():
+    cache = _cache.LRUCache(2)
+    factory = mock.Mock(return_value=1)
+
+    assert cache.get_or_create('a', factory) == 1
+    assert cache.get_or_create('a', factory) == 1
+    factory.assert_called_once_with()
+
+
+def test_get_or_create_error_not_cached():
+    cache = _cache.LRUCache(2)
+    factory = mock.Mock(side_effect=[ValueError(), 1])
+
+    with pytest.raises(ValueError):
+        cache.get_or_create('a', factory)
+
+    assert cache.get_or_create('a', factory) == 1
+    assert factory.call_count == 2
+
+
+def test_clear():
+    cache = _cache.LRUCache(2)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.clear()
+
+    assert cache.get('a') is None
+    assert cache.info() == _cache.CacheInfo(
+        hits=0, misses=1, maxsize=2, currsize=0)
+
+
+def test_expiry():
+    cache = _cache.LRUCache(2)
+    cache.set('a', 1, expiry=100)
+    cache.set('b', 2)
+
+    with mock.patch('time.time', return_value=99):
+        assert cache.get('a') == 1
+    with mock.patch('time.time', return_value=100):
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+
+    assert len(cache) == 1
+
+
+def test_pickle_and_copy():
+    cache = _cache.LRUCache(2)
+    cache.set('a', 1)
+    cache.get('a')
+
+    for copied in (pickle.loads(pickle.dumps(cache)), copy.deepcopy(cache)):
+        # Only the maximum size is kept.
+        assert copied.info() == _cache.CacheInfo(
+            hits=0, misses=0, maxsize=2, currsize=0)
+        copied.set('b', 2)
+        assert copied.get('b') == 2
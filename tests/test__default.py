@@ -14,6 +14,7 @@
 
 import json
 import os
+import threading
 
 import mock
 import pytest
@@ -45,6 +46,12 @@ LOAD_FILE_PATCH = mock.patch(
     'google.auth._default._load_credentials_from_file', return_value=(
         mock.sentinel.credentials, mock.sentinel.project_id), autospec=True)
 
+# The tests of the metadata server checks must not depend on the machine
+# they run on.
+DETECT_GCE_PATCH = mock.patch(
+    'google.auth.compute_engine._metadata.detect_gce_locally',
+    return_value=None, autospec=True)
+
 
 def test__load_credentials_from_file_invalid_json(tmpdir):
     jsonfile = tmpdir.join('invalid.json')
@@ -215,50 +222,81 @@ def test__get_gae_credentials_no_apis():
     assert _default._get_gae_credentials() == (None, None)
 
 
+@DETECT_GCE_PATCH
 @mock.patch(
     'google.auth.compute_engine._metadata.ping', return_value=True,
     autospec=True)
 @mock.patch(
     'google.auth.compute_engine._metadata.get_project_id',
     return_value='example-project', autospec=True)
-def test__get_gce_credentials(get_mock, ping_mock):
+def test__get_gce_credentials(get_mock, ping_mock, detect_mock):
     credentials, project_id = _default._get_gce_credentials()
 
     assert isinstance(credentials, compute_engine.Credentials)
     assert project_id == 'example-project'
 
 
+@DETECT_GCE_PATCH
 @mock.patch(
     'google.auth.compute_engine._metadata.ping', return_value=False,
     autospec=True)
-def test__get_gce_credentials_no_ping(ping_mock):
+def test__get_gce_credentials_no_ping(ping_mock, detect_mock):
     credentials, project_id = _default._get_gce_credentials()
 
     assert credentials is None
     assert project_id is None
 
 
+@DETECT_GCE_PATCH
 @mock.patch(
     'google.auth.compute_engine._metadata.ping', return_value=True,
     autospec=True)
 @mock.patch(
     'google.auth.compute_engine._metadata.get_project_id',
     side_effect=exceptions.TransportError(), autospec=True)
-def test__get_gce_credentials_no_project_id(get_mock, ping_mock):
+def test__get_gce_credentials_no_project_id(
+        get_mock, ping_mock, detect_mock):
     credentials, project_id = _default._get_gce_credentials()
 
     assert isinstance(credentials, compute_engine.Credentials)
     assert project_id is None
 
 
+@DETECT_GCE_PATCH
 @mock.patch(
     'google.auth.compute_engine._metadata.ping', return_value=False,
     autospec=True)
-def test__get_gce_credentials_explicit_request(ping_mock):
+def test__get_gce_credentials_explicit_request(ping_mock, detect_mock):
     _default._get_gce_credentials(mock.sentinel.request)
     ping_mock.assert_called_with(request=mock.sentinel.request)
 
 
+@mock.patch(
+    'google.auth.compute_engine._metadata.detect_gce_locally',
+    return_value=False, autospec=True)
+@mock.patch('google.auth.compute_engine._metadata.ping', autospec=True)
+def test__get_gce_credentials_not_gce(ping_mock, detect_mock):
+    assert _default._get_gce_credentials() == (None, None)
+
+    assert not ping_mock.called
+
+
+@mock.patch(
+    'google.auth.compute_engine._metadata.detect_gce_locally',
+    return_value=True, autospec=True)
+@mock.patch(
+    'google.auth.compute_engine._metadata.ping', return_value=True,
+    autospec=True)
+@mock.patch(
+    'google.auth.compute_engine._metadata.get_project_id',
+    return_value='example-project', autospec=True)
+def test__get_gce_credentials_detected_gce(get_mock, ping_mock, detect_mock):
+    credentials, _ = _default._get_gce_credentials()
+
+    assert isinstance(credentials, compute_engine.Credentials)
+    assert ping_mock.called
+
+
 @mock.patch(
     'google.auth._default._get_explicit_environ_credentials',
     return_value=(mock.sentinel.credentials, mock.sentinel.project_id),
@@ -320,3 +358,278 @@ def test_default_scoped(with_scopes_mock, get_mock):
     assert project_id == mock.sentinel.project_id
     with_scopes_mock.assert_called_once_with(
         mock.sentinel.credentials, scopes)
+
+
+@pytest.fixture
+def default_cache():
+    _default.enable_default_cache()
+    yield
+    _default.enable_default_cache(False)
+
+
+@pytest.fixture
+def credentials_file(tmpdir, monkeypatch):
+    filename = tmpdir.join('credentials.json')
+    filename.write(json.dumps(SERVICE_ACCOUNT_FILE_DATA))
+    monkeypatch.setenv(environment_vars.CREDENTIALS, str(filename))
+    monkeypatch.setenv(environment_vars.CLOUD_SDK_CONFIG_DIR, str(tmpdir))
+    return filename
+
+
+@mock.patch(
+    'google.auth._default._get_explicit_environ_credentials',
+    return_value=(mock.sentinel.credentials, mock.sentinel.project_id),
+    autospec=True)
+def test_default_not_cached_by_default(get_mock):
+    _default.default()
+    _default.default()
+
+    assert get_mock.call_count == 2
+
+
+def test_default_cache(default_cache, credentials_file):
+    credentials, project_id = _default.default()
+
+    assert _default.default() == (credentials, project_id)
+    assert isinstance(credentials, service_account.Credentials)
+
+
+def test_default_cache_scopes(default_cache, credentials_file):
+    credentials, _ = _default.default(scopes=['one'])
+    other_credentials, _ = _default.default(scopes=['two'])
+
+    assert other_credentials is not credentials
+    assert other_credentials._scopes == ['two']
+    assert _default.default(scopes=['one'])[0] is credentials
+
+
+def test_default_cache_environment_changed(
+        default_cache, credentials_file, monkeypatch):
+    credentials, _ = _default.default()
+
+    monkeypatch.setenv(environment_vars.PROJECT, 'explicit-env')
+    other_credentials, project_id = _default.default()
+
+    assert other_credentials is not credentials
+    assert project_id == 'explicit-env'
+
+
+@pytest.mark.parametrize('name', [
+    environment_vars.GCE_METADATA_HOST, environment_vars.GCE_METADATA_IP])
+def test_default_cache_metadata_server_changed(
+        default_cache, credentials_file, monkeypatch, name):
+    credentials, _ = _default.default()
+
+    monkeypatch.setenv(name, 'localhost:8080')
+
+    assert _default.default()[0] is not credentials
+
+
+def test_default_cache_file_changed(default_cache, credentials_file):
+    credentials, _ = _default.default()
+
+    mtime = os.stat(str(credentials_file)).st_mtime
+    os.utime(str(credentials_file), (mtime + 10, mtime + 10))
+
+    assert _default.default()[0] is not credentials
+
+
+def test_default_cache_clear(default_cache, credentials_file):
+    credentials, _ = _default.default()
+
+    _default.clear_default_cache()
+
+    assert _default.default()[0] is not credentials
+
+
+@mock.patch(
+    'google.auth._default._find_default',
+    side_effect=exceptions.DefaultCredentialsError(), autospec=True)
+def test_default_cache_errors_not_cached(find_mock, default_cache):
+    for _ in range(2):
+        with pytest.raises(exceptions.DefaultCredentialsError):
+            _default.default()
+
+    assert find_mock.call_count == 2
+
+
+def test_enable_default_cache_keeps_cache(default_cache, credentials_file):
+    credentials, _ = _default.default()
+
+    # Enabling the cache again doesn't empty it.
+    _default.enable_default_cache()
+
+    assert _default.default()[0] is credentials
+
+
+def test_disable_default_cache(credentials_file):
+    _default.enable_default_cache()
+    credentials, _ = _default.default()
+
+    _default.enable_default_cache(False)
+    _default.clear_default_cache()
+
+    assert _default.default()[0] is not credentials
+
+
+@mock.patch(
+    'google.auth._default._get_explicit_environ_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gcloud_sdk_credentials',
+    return_value=(mock.sentinel.credentials, mock.sentinel.project_id),
+    autospec=True)
+@mock.patch(
+    'google.auth._default._get_gce_credentials',
+    return_value=(mock.sentinel.gce_credentials, None), autospec=True)
+def test_default_concurrent_priority(gce_mock, sdk_mock, explicit_mock):
+    # The Cloud SDK credentials take precedence, even though Compute Engine
+    # was checked as well.
+    assert _default.default(
+        request=mock.sentinel.request, concurrent=True) == (
+            mock.sentinel.credentials, mock.sentinel.project_id)
+
+
+@mock.patch(
+    'google.auth._default._get_explicit_environ_credentials',
+    return_value=(mock.sentinel.credentials, mock.sentinel.project_id),
+    autospec=True)
+@mock.patch('google.auth._default._BackgroundCall', autospec=True)
+@mock.patch(
+    'google.auth._default._import_compute_engine',
+    wraps=_default._import_compute_engine)
+def test_default_concurrent_imports_before_thread(
+        import_mock, background_call_mock, explicit_mock):
+    def background_call(func):
+        # The modules were imported by the calling thread.
+        assert import_mock.call_count == 1
+        return mock.DEFAULT
+
+    background_call_mock.side_effect = background_call
+
+    _default.default(concurrent=True)
+
+    assert background_call_mock.call_count == 1
+
+
+@mock.patch(
+    'google.auth._default._get_explicit_environ_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gcloud_sdk_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gae_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gce_credentials',
+    return_value=(mock.sentinel.credentials, mock.sentinel.project_id),
+    autospec=True)
+@mock.patch('google.auth._default._BackgroundCall', autospec=True)
+@mock.patch(
+    'google.auth._default._import_lock_held', return_value=True,
+    autospec=True)
+def test_default_concurrent_while_importing(
+        lock_held_mock, background_call_mock, gce_mock, unused_gae_mock,
+        unused_sdk_mock, unused_explicit_mock):
+    assert _default.default(concurrent=True) == (
+        mock.sentinel.credentials, mock.sentinel.project_id)
+
+    background_call_mock.assert_not_called()
+    gce_mock.assert_called_once_with(None)
+
+
+def test_import_lock_held_python3():
+    with mock.patch('six.PY2', False):
+        assert not _default._import_lock_held()
+
+
+@pytest.mark.parametrize('lock_held', [True, False])
+def test_import_lock_held_python2(lock_held):
+    imp_mock = mock.Mock(spec=['lock_held'])
+    imp_mock.lock_held.return_value = lock_held
+
+    with mock.patch('six.PY2', True):
+        with mock.patch.dict('sys.modules', {'imp': imp_mock}):
+            assert _default._import_lock_held() is lock_held
+
+
+def test_import_compute_engine():
+    from google.auth import compute_engine
+    from google.auth.compute_engine import _metadata
+
+    modules = _default._import_compute_engine()
+
+    assert modules == (compute_engine, _metadata)
+    assert _default._import_compute_engine() is modules
+
+
+@mock.patch(
+    'google.auth._default._get_explicit_environ_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gcloud_sdk_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gae_credentials',
+    return_value=(None, None), autospec=True)
+def test_default_concurrent_overlaps_gce_check(
+        gae_mock, sdk_mock, explicit_mock):
+    gce_started = threading.Event()
+
+    def get_gce_credentials(request):
+        gce_started.set()
+        return mock.sentinel.credentials, mock.sentinel.project_id
+
+    def get_explicit_environ_credentials():
+        # The Compute Engine check runs before the other checks finish.
+        assert gce_started.wait(5)
+        return None, None
+
+    explicit_mock.side_effect = get_explicit_environ_credentials
+
+    with mock.patch(
+            'google.auth._default._get_gce_credentials',
+            side_effect=get_gce_credentials) as gce_mock:
+        assert _default.default(
+            request=mock.sentinel.request, concurrent=True) == (
+                mock.sentinel.credentials, mock.sentinel.project_id)
+
+    gce_mock.assert_called_once_with(mock.sentinel.request)
+
+
+@mock.patch(
+    'google.auth._default._get_explicit_environ_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gcloud_sdk_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gae_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gce_credentials',
+    side_effect=exceptions.TransportError('boom'), autospec=True)
+def test_default_concurrent_gce_error(
+        gce_mock, gae_mock, sdk_mock, explicit_mock):
+    with pytest.raises(exceptions.TransportError) as excinfo:
+        _default.default(concurrent=True)
+
+    assert excinfo.match('boom')
+
+
+@mock.patch(
+    'google.auth._default._get_explicit_environ_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gcloud_sdk_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gae_credentials',
+    return_value=(None, None), autospec=True)
+@mock.patch(
+    'google.auth._default._get_gce_credentials',
+    return_value=(None, None), autospec=True)
+def test_default_concurrent_fail(gce_mock, gae_mock, sdk_mock, explicit_mock):
+    with pytest.raises(exceptions.DefaultCredentialsError):
+        _default.default(concurrent=True)
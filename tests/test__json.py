@@ -0,0 +1,109 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import pytest
+
+import google.auth
+from google.auth import _json
+
+VALUE = {
+    'aud': 'https://example.com/a/b', 'exp': 1485003600, 'name': u'\u2603'}
+
+
+@pytest.fixture(autouse=True)
+def restore_codec():
+    codec = _json.get_codec()
+    yield
+    _json._codec = codec
+
+
+def test_default_is_json():
+    assert _json.get_codec().name == 'json'
+
+
+def test_set_json_codec_is_exported():
+    assert google.auth.set_json_codec is _json.set_codec
+
+
+@pytest.mark.parametrize('name', ['json', 'orjson', 'ujson'])
+def test_round_trip(name):
+    if name != 'json':
+        pytest.importorskip(name)
+    assert _json.set_codec(name) == name
+
+    encoded = _json.dumps(VALUE)
+
+    assert isinstance(encoded, bytes)
+    assert b' ' not in encoded
+    assert b'\\/' not in encoded
+    assert _json.loads(encoded) == VALUE
+    assert _json.loads(encoded.decode('utf-8')) == VALUE
+
+
+@pytest.mark.parametrize('name', ['json', 'orjson', 'ujson'])
+def test_loads_invalid(name):
+    if name != 'json':
+        pytest.importorskip(name)
+    _json.set_codec(name)
+
+    with pytest.raises(ValueError):
+        _json.loads(b'{not json')
+
+
+def test_set_codec_unknown():
+    with pytest.raises(ValueError) as excinfo:
+        _json.set_codec('simplejson')
+
+    assert excinfo.match(r'Unknown JSON codec')
+    assert _json.get_codec().name == 'json'
+
+
+def test_set_codec_not_installed():
+    with mock.patch.dict('sys.modules', {'orjson': None}):
+        with pytest.raises(ImportError):
+            _json.set_codec('orjson')
+
+    assert _json.get_codec().name == 'json'
+
+
+def test_set_codec_auto_falls_back():
+    with mock.patch.dict('sys.modules', {'orjson': None, 'ujson': None}):
+        assert _json.set_codec('auto') == 'json'
+
+
+def test_set_codec_auto_prefers_orjson():
+    orjson = mock.Mock()
+    with mock.patch.dict('sys.modules', {'orjson': orjson}):
+        assert _json.set_codec('auto') == 'orjson'
+
+    _json.loads(b'{}')
+
+    orjson.loads.assert_called_once_with(b'{}')
+
+
+def test_ujson_codec():
+    ujson = mock.Mock()
+    ujson.dumps.return_value = u'{"aud":"https://example.com/a/b"}'
+    with mock.patch.dict('sys.modules', {'ujson': ujson}):
+        assert _json.set_codec('ujson') == 'ujson'
+
+    encoded = _json.dumps({'aud': 'https://example.com/a/b'})
+    _json.loads(encoded)
+
+    assert encoded == b'{"aud":"https://example.com/a/b"}'
+    # Forward slashes are not escaped, like the other codecs.
+    ujson.dumps.assert_called_once_with(
+        {'aud': 'https://example.com/a/b'}, escape_forward_slashes=False)
+    ujson.loads.assert_called_once_with(encoded)
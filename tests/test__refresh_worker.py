@@ -0,0 +1,192 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import gc
+import os
+import threading
+
+import mock
+
+from google.auth import _refresh_worker
+
+
+def test_job_run():
+    callback = mock.Mock()
+    job = _refresh_worker.Job(callback)
+
+    job.run()
+
+    callback.assert_called_once_with()
+
+
+def test_job_run_cancelled():
+    callback = mock.Mock()
+    job = _refresh_worker.Job(callback)
+
+    job.cancel()
+    job.run()
+
+    assert not callback.called
+
+
+def test_job_run_error():
+    job = _refresh_worker.Job(mock.Mock(side_effect=ValueError()))
+
+    # Errors are logged, not raised.
+    job.run()
+
+
+def test_scheduler_runs_jobs_in_order():
+    scheduler = _refresh_worker.Scheduler()
+    results = []
+    done = threading.Event()
+
+    def make_callback(value):
+        def callback():
+            results.append(value)
+            if len(results) == 2:
+                done.set()
+        return callback
+
+    scheduler.schedule(0.2, make_callback('second'))
+    scheduler.schedule(0, make_callback('first'))
+
+    assert done.wait(5)
+    assert results == ['first', 'second']
+
+
+def test_scheduler_cancel():
+    scheduler = _refresh_worker.Scheduler()
+    cancelled = mock.Mock()
+    done = threading.Event()
+
+    job = scheduler.schedule(0, cancelled)
+    job.cancel()
+    scheduler.schedule(0.1, done.set)
+
+    assert done.wait(5)
+    assert not cancelled.called
+
+
+def test_scheduler_restarts_after_fork():
+    scheduler = _refresh_worker.Scheduler()
+    scheduler.schedule(60, mock.Mock())
+    parent_queue = scheduler._queue
+
+    with mock.patch('os.getpid', return_value=-1):
+        done = threading.Event()
+        scheduler.schedule(0, done.set)
+
+    assert scheduler._queue is not parent_queue
+    assert done.wait(5)
+
+
+class Target(object):
+    pass
+
+
+def test_background_refresh_schedule():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    background_refresh = _refresh_worker.BackgroundRefresh(scheduler)
+    target = Target()
+    refresh = mock.Mock()
+
+    background_refresh.schedule(
+        target, datetime.timedelta(seconds=10), refresh)
+
+    assert background_refresh.pending
+    delay, callback = scheduler.schedule.call_args[0]
+    assert delay == 10
+
+    callback()
+
+    refresh.assert_called_once_with(target)
+    assert not background_refresh.pending
+
+
+def test_background_refresh_schedule_replaces_pending():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    first_job, second_job = mock.Mock(), mock.Mock()
+    scheduler.schedule.side_effect = [first_job, second_job]
+    background_refresh = _refresh_worker.BackgroundRefresh(scheduler)
+    target = Target()
+
+    background_refresh.schedule(
+        target, datetime.timedelta(seconds=10), mock.Mock())
+    first_callback = scheduler.schedule.call_args[0][1]
+    background_refresh.schedule(
+        target, datetime.timedelta(seconds=20), mock.Mock())
+
+    first_job.cancel.assert_called_once_with()
+    # A replaced job that runs anyway doesn't clear the pending one.
+    first_callback()
+    assert background_refresh.pending
+
+
+def test_background_refresh_cancel():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    background_refresh = _refresh_worker.BackgroundRefresh(scheduler)
+    background_refresh.schedule(
+        Target(), datetime.timedelta(seconds=10), mock.Mock())
+    job = scheduler.schedule.return_value
+
+    background_refresh.cancel()
+
+    job.cancel.assert_called_once_with()
+    assert not background_refresh.pending
+
+
+def test_background_refresh_cancel_not_pending():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    background_refresh = _refresh_worker.BackgroundRefresh(scheduler)
+
+    background_refresh.cancel()
+
+    assert not background_refresh.pending
+
+
+def test_background_refresh_does_not_keep_target_alive():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    background_refresh = _refresh_worker.BackgroundRefresh(scheduler)
+    target = Target()
+    refresh = mock.Mock()
+    background_refresh.schedule(
+        target, datetime.timedelta(seconds=10), refresh)
+    _, callback = scheduler.schedule.call_args[0]
+
+    del target
+    gc.collect()
+    callback()
+
+    assert not refresh.called
+
+
+def test_scheduler_started_by_another_thread():
+    scheduler = _refresh_worker.Scheduler()
+
+    class InitLock(object):
+        def __enter__(self):
+            # Another thread initialized the scheduler while this one was
+            # waiting for the lock.
+            scheduler._pid = os.getpid()
+
+        def __exit__(self, *args):
+            pass
+
+    scheduler._init_lock = InitLock()
+
+    scheduler._reset_if_needed()
+
+    assert scheduler._queue is None
@@ -12,9 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import datetime
+import gc
+import pickle
+import threading
 
+import mock
+
+from google.auth import _helpers
+from google.auth import _refresh_worker
 from google.auth import credentials
+from google.auth import exceptions
 
 
 class CredentialsImpl(credentials.Credentials):
@@ -44,6 +53,18 @@ def test_expired_and_valid():
     assert credentials.expired
 
 
+def test_expired_within_clock_skew():
+    credentials = CredentialsImpl()
+    credentials.token = 'token'
+    credentials.expiry = (
+        datetime.datetime.utcnow() + _helpers.CLOCK_SKEW -
+        datetime.timedelta(seconds=1))
+
+    assert credentials.expired
+    assert credentials.stale
+    assert not credentials.valid
+
+
 def test_before_request():
     credentials = CredentialsImpl()
     request = 'token'
@@ -123,3 +144,443 @@ def test_create_scoped_if_required_not_scopes():
         unscoped_credentials, ['one', 'two'])
 
     assert scoped_credentials is unscoped_credentials
+
+
+class SlowCredentialsImpl(credentials.Credentials):
+    def __init__(self, error=None):
+        super(SlowCredentialsImpl, self).__init__()
+        self.refresh_count = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self._error = error
+
+    def refresh(self, request):
+        self.refresh_count += 1
+        self.started.set()
+        self.release.wait()
+        if self._error is not None:
+            raise self._error
+        self.token = request
+
+
+def _before_request(slow_credentials):
+    headers = {}
+    slow_credentials.before_request(
+        'token', 'GET', 'http://example.com', headers)
+    return headers['authorization']
+
+
+def _before_request_in_threads(
+        slow_credentials, count, call=_before_request):
+    results = []
+
+    def target():
+        try:
+            results.append(call(slow_credentials))
+        except exceptions.RefreshError as exc:
+            results.append(exc)
+
+    waiting = []
+    all_waiting = threading.Event()
+    original_wait = credentials._RefreshFlight.wait
+
+    def wait(flight):
+        waiting.append(flight)
+        if len(waiting) == count - 1:
+            all_waiting.set()
+        original_wait(flight)
+
+    threads = [threading.Thread(target=target) for _ in range(count)]
+
+    with mock.patch.object(credentials._RefreshFlight, 'wait', wait):
+        for thread in threads:
+            thread.start()
+
+        # Let every other thread block on the in-flight refresh before
+        # allowing it to finish.
+        slow_credentials.started.wait()
+        all_waiting.wait()
+        slow_credentials.release.set()
+
+        for thread in threads:
+            thread.join()
+
+    return results
+
+
+def test_before_request_single_flight():
+    credentials = SlowCredentialsImpl()
+
+    results = _before_request_in_threads(credentials, 5)
+
+    assert credentials.refresh_count == 1
+    assert results == ['Bearer token'] * 5
+    assert credentials._refresh_flight is None
+
+
+def test_before_request_single_flight_error():
+    error = exceptions.RefreshError('refresh failed')
+    credentials = SlowCredentialsImpl(error=error)
+
+    results = _before_request_in_threads(credentials, 5)
+
+    assert credentials.refresh_count == 1
+    assert results == [error] * 5
+    assert credentials._refresh_flight is None
+
+
+def test_before_request_single_flight_rechecks_validity():
+    credentials = SlowCredentialsImpl()
+    credentials.release.set()
+
+    # Another thread finished refreshing between the unlocked validity
+    # check in before_request and acquiring the lock.
+    credentials.token = 'token'
+    credentials._refresh_if_needed('other')
+
+    assert credentials.refresh_count == 0
+    assert credentials._refresh_flight is None
+
+
+def test_refresh_if_needed_force_single_flight():
+    credentials = SlowCredentialsImpl()
+    credentials.token = 'rejected'
+
+    def refresh_rejected(slow_credentials):
+        slow_credentials._refresh_if_needed(
+            'token', force=True, rejected_token='rejected')
+        return slow_credentials.token
+
+    # The credentials are valid, but every thread's request was rejected.
+    results = _before_request_in_threads(credentials, 5, refresh_rejected)
+
+    assert credentials.refresh_count == 1
+    assert results == ['token'] * 5
+    assert credentials._refresh_flight is None
+
+
+def test_refresh_if_needed_force_token_replaced():
+    credentials = SlowCredentialsImpl()
+    credentials.release.set()
+    credentials.token = 'token'
+
+    # Another thread already replaced the rejected token.
+    credentials._refresh_if_needed(
+        'other', force=True, rejected_token='rejected')
+
+    assert credentials.refresh_count == 0
+    assert credentials.token == 'token'
+
+
+def test_pickle_and_copy():
+    creds = CredentialsImpl()
+    creds.token = 'token'
+    creds._refresh_flight = credentials._RefreshFlight()
+
+    for copied in (pickle.loads(pickle.dumps(creds)), copy.deepcopy(creds)):
+        assert copied.token == 'token'
+        assert copied._refresh_flight is None
+        assert copied._refresh_lock is not creds._refresh_lock
+        # The original is unaffected.
+        assert creds._refresh_flight is not None
+
+
+class NoInitCredentialsImpl(credentials.Credentials):
+    def __init__(self):  # pylint: disable=super-init-not-called
+        self.token = None
+        self.expiry = None
+
+    def refresh(self, request):
+        self.token = request
+
+
+def test_before_request_without_base_init():
+    creds = NoInitCredentialsImpl()
+    headers = {}
+
+    creds.before_request('token', 'GET', 'http://example.com', headers)
+
+    assert headers['authorization'] == 'Bearer token'
+    assert creds._refresh_lock is creds._refresh_lock
+
+
+def test_unpickle_state_without_refresh_attributes():
+    # The state of credentials pickled before the refresh state existed.
+    creds = CredentialsImpl.__new__(CredentialsImpl)
+    creds.__dict__.update({'token': 'token', 'expiry': None})
+    creds.enable_stale_while_revalidate()
+    headers = {}
+
+    creds.before_request('other', 'GET', 'http://example.com', headers)
+
+    assert headers['authorization'] == 'Bearer token'
+
+
+class ExpiringCredentialsImpl(credentials.Credentials):
+    def __init__(self, lifetime=datetime.timedelta(hours=1)):
+        super(ExpiringCredentialsImpl, self).__init__()
+        self.lifetime = lifetime
+        self.refresh_count = 0
+
+    def refresh(self, request):
+        self.refresh_count += 1
+        self.token = '{}-{}'.format(request, self.refresh_count)
+        self.expiry = datetime.datetime.utcnow() + self.lifetime
+
+
+def test_background_refresh_scheduled_before_expiry():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = ExpiringCredentialsImpl()
+    credentials.enable_background_refresh(
+        margin=datetime.timedelta(minutes=5),
+        jitter=datetime.timedelta(seconds=30),
+        scheduler=scheduler)
+
+    credentials.before_request('token', 'GET', 'http://example.com', {})
+
+    assert scheduler.schedule.call_count == 1
+    delay, callback = scheduler.schedule.call_args[0]
+    # One hour lifetime minus the margin and up to 30 seconds of jitter.
+    assert 3600 - 300 - 31 < delay <= 3600 - 300
+
+    # Running the job refreshes the credentials and schedules the next one.
+    callback()
+    assert credentials.refresh_count == 2
+    assert credentials.token == 'token-2'
+    assert scheduler.schedule.call_count == 2
+
+
+def test_background_refresh_lifetime_shorter_than_margin():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = ExpiringCredentialsImpl(
+        lifetime=datetime.timedelta(minutes=4))
+    credentials.enable_background_refresh(
+        margin=datetime.timedelta(minutes=5), scheduler=scheduler)
+
+    credentials.before_request('token', 'GET', 'http://example.com', {})
+
+    # Halfway through the token's lifetime rather than right away.
+    delay, _ = scheduler.schedule.call_args[0]
+    assert 119 < delay <= 120
+
+
+def test_background_refresh_minimum_delay():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    creds = ExpiringCredentialsImpl(lifetime=datetime.timedelta(seconds=10))
+    creds.enable_background_refresh(scheduler=scheduler)
+
+    creds.before_request('token', 'GET', 'http://example.com', {})
+
+    delay, _ = scheduler.schedule.call_args[0]
+    assert delay == (
+        credentials._BACKGROUND_REFRESH_RETRY_DELAY.total_seconds())
+
+
+def test_background_refresh_not_rescheduled_while_pending():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = ExpiringCredentialsImpl()
+    credentials.enable_background_refresh(scheduler=scheduler)
+
+    for _ in range(3):
+        credentials.before_request('token', 'GET', 'http://example.com', {})
+
+    assert credentials.refresh_count == 1
+    assert scheduler.schedule.call_count == 1
+
+
+def test_background_refresh_scheduled_for_valid_credentials():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = ExpiringCredentialsImpl()
+    credentials.refresh('token')
+    credentials.enable_background_refresh(scheduler=scheduler)
+
+    credentials.before_request('token', 'GET', 'http://example.com', {})
+
+    assert credentials.refresh_count == 1
+    assert scheduler.schedule.call_count == 1
+
+
+def test_background_refresh_no_expiry():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = CredentialsImpl()
+    credentials.enable_background_refresh(scheduler=scheduler)
+
+    credentials.before_request('token', 'GET', 'http://example.com', {})
+
+    assert not scheduler.schedule.called
+
+
+def test_background_refresh_retries_on_error():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    creds = ExpiringCredentialsImpl()
+    creds.enable_background_refresh(scheduler=scheduler)
+    creds.before_request('token', 'GET', 'http://example.com', {})
+    _, callback = scheduler.schedule.call_args[0]
+
+    with mock.patch.object(
+            creds, 'refresh',
+            side_effect=exceptions.RefreshError('failed')):
+        callback()
+
+    assert scheduler.schedule.call_count == 2
+    delay, _ = scheduler.schedule.call_args[0]
+    assert delay == (
+        credentials._BACKGROUND_REFRESH_RETRY_DELAY.total_seconds())
+    # The current token is still used.
+    assert creds.token == 'token-1'
+
+
+def test_background_refresh_error_after_disable():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    creds = ExpiringCredentialsImpl()
+    creds.enable_background_refresh(scheduler=scheduler)
+    creds.disable_background_refresh()
+
+    with mock.patch.object(
+            creds, 'refresh',
+            side_effect=exceptions.RefreshError('failed')):
+        creds._refresh_in_background('token')
+
+    # Background refresh is no longer enabled, so there's no retry.
+    assert not scheduler.schedule.called
+    assert creds._refresh_flight is None
+
+
+def test_background_refresh_skipped_while_refresh_in_flight():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    creds = ExpiringCredentialsImpl()
+    creds.enable_background_refresh(scheduler=scheduler)
+    creds._refresh_flight = credentials._RefreshFlight()
+
+    creds._refresh_in_background('token')
+
+    assert creds.refresh_count == 0
+
+
+def test_disable_background_refresh():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = ExpiringCredentialsImpl()
+    credentials.enable_background_refresh(scheduler=scheduler)
+    credentials.before_request('token', 'GET', 'http://example.com', {})
+    job = scheduler.schedule.return_value
+
+    credentials.disable_background_refresh()
+
+    job.cancel.assert_called_once_with()
+    assert credentials._background_refresh is None
+
+
+def test_background_refresh_does_not_keep_credentials_alive():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = ExpiringCredentialsImpl()
+    credentials.enable_background_refresh(scheduler=scheduler)
+    credentials.before_request('token', 'GET', 'http://example.com', {})
+    _, callback = scheduler.schedule.call_args[0]
+
+    del credentials
+    gc.collect()
+
+    # Nothing left to refresh.
+    callback()
+    assert scheduler.schedule.call_count == 1
+
+
+def test_stale_defaults_to_expired():
+    credentials = ExpiringCredentialsImpl()
+    credentials.token = 'token'
+    credentials.expiry = (
+        datetime.datetime.utcnow() + datetime.timedelta(minutes=1))
+
+    assert not credentials.stale
+    assert not credentials.expired
+
+
+def test_stale_no_expiry():
+    credentials = ExpiringCredentialsImpl()
+    credentials.enable_stale_while_revalidate()
+    credentials.token = 'token'
+
+    assert not credentials.stale
+
+
+def test_stale_while_revalidate_serves_stale_token():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = ExpiringCredentialsImpl()
+    credentials.enable_stale_while_revalidate(
+        stale_margin=datetime.timedelta(minutes=5), scheduler=scheduler)
+    credentials.token = 'stale'
+    credentials.expiry = (
+        datetime.datetime.utcnow() + datetime.timedelta(minutes=1))
+    assert credentials.stale
+    assert credentials.valid
+
+    headers = {}
+    credentials.before_request('token', 'GET', 'http://example.com', headers)
+
+    # The stale token is used and the refresh was handed to the scheduler.
+    assert headers['authorization'] == 'Bearer stale'
+    assert credentials.refresh_count == 0
+    assert scheduler.schedule.call_count == 1
+    delay, callback = scheduler.schedule.call_args[0]
+    assert delay == 0
+
+    # Only one asynchronous refresh is started at a time.
+    credentials.before_request('token', 'GET', 'http://example.com', {})
+    assert scheduler.schedule.call_count == 1
+
+    callback()
+
+    assert credentials.refresh_count == 1
+    assert credentials.token == 'token-1'
+    assert not credentials.stale
+    assert credentials._refresh_flight is None
+
+
+def test_stale_while_revalidate_refresh_error():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    creds = ExpiringCredentialsImpl()
+    creds.enable_stale_while_revalidate(
+        stale_margin=datetime.timedelta(minutes=5), scheduler=scheduler)
+    creds.token = 'stale'
+    creds.expiry = datetime.datetime.utcnow() + datetime.timedelta(minutes=1)
+    creds.before_request('token', 'GET', 'http://example.com', {})
+    _, callback = scheduler.schedule.call_args[0]
+
+    with mock.patch.object(
+            creds, 'refresh', side_effect=exceptions.RefreshError('failed')):
+        # Errors are logged, not raised.
+        callback()
+
+    assert creds.token == 'stale'
+    assert creds._refresh_flight is None
+
+    # The failed refresh isn't retried right away.
+    creds.before_request('token', 'GET', 'http://example.com', {})
+    assert scheduler.schedule.call_count == 1
+
+    # But it is once the retry delay has passed.
+    retry_at = creds._stale_retry_at
+    with mock.patch(
+            'google.auth._helpers.utcnow',
+            return_value=retry_at + datetime.timedelta(seconds=1)):
+        creds.before_request('token', 'GET', 'http://example.com', {})
+    assert scheduler.schedule.call_count == 2
+
+    _, callback = scheduler.schedule.call_args[0]
+    callback()
+    assert creds.token == 'token-1'
+    assert creds._stale_retry_at is None
+
+
+def test_stale_while_revalidate_blocks_when_expired():
+    scheduler = mock.Mock(spec=_refresh_worker.Scheduler)
+    credentials = ExpiringCredentialsImpl()
+    credentials.enable_stale_while_revalidate(scheduler=scheduler)
+    credentials.token = 'expired'
+    credentials.expiry = datetime.datetime.utcnow()
+
+    headers = {}
+    credentials.before_request('token', 'GET', 'http://example.com', headers)
+
+    assert headers['authorization'] == 'Bearer token-1'
+    assert not scheduler.schedule.called
@@ -15,6 +15,7 @@
 import base64
 import datetime
 import json
+import multiprocessing
 import os
 
 import mock
@@ -62,6 +63,67 @@ def test_encode_extra_headers(signer):
         'typ': 'JWT', 'alg': 'RS256', 'kid': signer.key_id, 'extra': 'value'}
 
 
+class TestEncoder(object):
+    def test_encode(self, signer):
+        encoder = jwt.Encoder(signer, claims={'iss': 'issuer', 'aud': 'aud'})
+
+        token = encoder.encode({'iat': 1, 'exp': 2})
+
+        header, payload, signed_section, signature = (
+            jwt._unverified_decode(token))
+        assert header == {'typ': 'JWT', 'alg': 'RS256', 'kid': signer.key_id}
+        assert payload == {'iss': 'issuer', 'aud': 'aud', 'iat': 1, 'exp': 2}
+        assert crypt.verify_signature(
+            signed_section, signature, PUBLIC_CERT_BYTES)
+
+    def test_encode_no_claims(self, signer):
+        encoder = jwt.Encoder(signer, claims={'iss': 'issuer'})
+
+        _, payload, _, _ = jwt._unverified_decode(encoder.encode())
+
+        assert payload == {'iss': 'issuer'}
+
+    def test_encode_no_static_claims(self, signer):
+        encoder = jwt.Encoder(signer)
+
+        _, payload, _, _ = jwt._unverified_decode(encoder.encode({'a': 1}))
+
+        assert payload == {'a': 1}
+
+    def test_encode_overrides_claims(self, signer):
+        encoder = jwt.Encoder(signer, claims={'iss': 'issuer', 'aud': 'aud'})
+
+        _, payload, _, _ = jwt._unverified_decode(
+            encoder.encode({'aud': 'other'}))
+
+        assert payload == {'iss': 'issuer', 'aud': 'other'}
+
+    def test_encode_compact(self, signer):
+        encoder = jwt.Encoder(signer, claims={'iss': 'issuer'})
+        token = encoder.encode({'iat': 1})
+
+        payload_segment = token.split(b'.')[1]
+        assert (_helpers.padded_urlsafe_b64decode(payload_segment) ==
+                b'{"iat":1,"iss":"issuer"}')
+
+    def test_encode_header(self, signer):
+        encoder = jwt.Encoder(
+            signer, header={'extra': 'value'}, key_id='other')
+
+        header, _, _, _ = jwt._unverified_decode(encoder.encode())
+
+        assert header == {
+            'typ': 'JWT', 'alg': 'RS256', 'kid': 'other', 'extra': 'value'}
+
+    def test_encode_no_key_id(self, signer):
+        signer._key_id = None
+        encoder = jwt.Encoder(signer)
+
+        header, _, _, _ = jwt._unverified_decode(encoder.encode())
+
+        assert header == {'typ': 'JWT', 'alg': 'RS256'}
+
+
 @pytest.fixture
 def token_factory(signer):
     def factory(claims=None, key_id=None):
@@ -127,6 +189,95 @@ def test_decode_bad_token_not_json():
     assert excinfo.match(r'Can\'t parse segment')
 
 
+def test_decode_bad_token_too_many_segments():
+    with pytest.raises(ValueError) as excinfo:
+        jwt.decode('1.2.3.4', PUBLIC_CERT_BYTES)
+    assert excinfo.match(r'Wrong number of segments')
+
+
+def test_decode_wrong_cert_payload_not_parsed(token_factory):
+    token = token_factory()
+
+    with mock.patch(
+            'google.auth.jwt._decode_jwt_segment',
+            wraps=jwt._decode_jwt_segment) as decode_segment:
+        with pytest.raises(ValueError):
+            jwt.decode(token, OTHER_CERT_BYTES)
+
+    # Only the header was parsed.
+    decode_segment.assert_called_once_with(token.split(b'.')[0])
+
+
+def test_decode_unknown_key_id_only_parses_header(token_factory):
+    token = token_factory()
+
+    with mock.patch(
+            'google.auth._helpers.padded_urlsafe_b64decode',
+            wraps=_helpers.padded_urlsafe_b64decode) as b64decode:
+        with pytest.raises(ValueError) as excinfo:
+            jwt.decode(token, {'2': PUBLIC_CERT_BYTES})
+
+    assert excinfo.match(r'Certificate for key id 1 not found')
+    # Neither the payload nor the signature were decoded.
+    b64decode.assert_called_once_with(token.split(b'.')[0])
+
+
+def test__parsed_token(token_factory):
+    token = token_factory()
+    encoded_header, encoded_payload, _ = token.split(b'.')
+
+    parsed = jwt._ParsedToken(token.decode('utf-8'))
+
+    assert parsed.header['kid'] == '1'
+    assert parsed.payload['user'] == 'billy bob'
+    assert parsed.signed_section == encoded_header + b'.' + encoded_payload
+    assert crypt.verify_signature(
+        parsed.signed_section, parsed.signature, PUBLIC_CERT_BYTES)
+
+
+def test__parsed_token_decodes_segments_once(token_factory):
+    parsed = jwt._ParsedToken(token_factory())
+
+    with mock.patch(
+            'google.auth.jwt._decode_jwt_segment',
+            wraps=jwt._decode_jwt_segment) as decode_segment:
+        for _ in range(2):
+            assert parsed.header['kid'] == '1'
+            assert parsed.payload['user'] == 'billy bob'
+
+    assert decode_segment.call_count == 2
+
+
+def _make_token(header, payload):
+    return b'.'.join([
+        base64.urlsafe_b64encode(json.dumps(header).encode('utf-8')),
+        base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')),
+        b'signature'])
+
+
+@pytest.mark.parametrize('header, message', [
+    (['kid', '1'], 'Token header is not a JSON object'),
+    ({'kid': ['1']}, 'Invalid key ID'),
+    ({'kid': 1}, 'Invalid key ID'),
+])
+def test__parsed_token_invalid_header(header, message):
+    parsed = jwt._ParsedToken(_make_token(header, {}))
+
+    with pytest.raises(ValueError) as excinfo:
+        parsed.header
+
+    assert excinfo.match(message)
+
+
+def test__parsed_token_invalid_payload():
+    parsed = jwt._ParsedToken(_make_token({'kid': '1'}, ['user']))
+
+    with pytest.raises(ValueError) as excinfo:
+        parsed.payload
+
+    assert excinfo.match('Token payload is not a JSON object')
+
+
 def test_decode_bad_token_no_iat_or_exp(signer):
     token = jwt.encode(signer, {'test': 'value'})
     with pytest.raises(ValueError) as excinfo:
@@ -196,6 +347,338 @@ def test_roundtrip_explicit_key_id(token_factory):
     assert payload['user'] == 'billy bob'
 
 
+class TestVerifiedTokenCache(object):
+    def test_decode_cached(self, token_factory):
+        cache = jwt.VerifiedTokenCache()
+        token = token_factory()
+
+        payload = jwt.decode(token, certs=PUBLIC_CERT_BYTES, cache=cache)
+
+        with mock.patch('google.auth.crypt.verify_signature') as verify:
+            assert jwt.decode(
+                token, certs=PUBLIC_CERT_BYTES, cache=cache) == payload
+            assert not verify.called
+
+        assert cache.info().hits == 1
+
+    def test_keyed_by_audience(self, token_factory):
+        cache = jwt.VerifiedTokenCache()
+        token = token_factory()
+        jwt.decode(token, certs=PUBLIC_CERT_BYTES, cache=cache)
+
+        with pytest.raises(ValueError) as excinfo:
+            jwt.decode(
+                token, certs=PUBLIC_CERT_BYTES, cache=cache,
+                audience='other@example.com')
+        assert excinfo.match(r'Token has wrong audience')
+
+    def test_other_certs(self, token_factory):
+        cache = jwt.VerifiedTokenCache()
+        token = token_factory()
+        jwt.decode(token, certs={'1': PUBLIC_CERT_BYTES}, cache=cache)
+
+        # The token must not be trusted when it's decoded with other
+        # certificates.
+        with pytest.raises(ValueError) as excinfo:
+            jwt.decode(token, certs={'1': OTHER_CERT_BYTES}, cache=cache)
+        assert excinfo.match(r'Could not verify token signature')
+
+    def test_multiple_certs(self, token_factory):
+        cache = jwt.VerifiedTokenCache()
+        token = token_factory(key_id=False)
+        certs = [OTHER_CERT_BYTES, PUBLIC_CERT_BYTES]
+        jwt.decode(token, certs=certs, cache=cache)
+
+        assert jwt.decode(token, certs=certs, cache=cache)
+        assert cache.info().hits == 1
+
+        with pytest.raises(ValueError):
+            jwt.decode(token, certs=[OTHER_CERT_BYTES], cache=cache)
+
+    def test_rechecks_exp(self, token_factory):
+        cache = jwt.VerifiedTokenCache()
+        token = token_factory()
+        jwt.decode(token, certs=PUBLIC_CERT_BYTES, cache=cache)
+
+        later = _helpers.utcnow() + datetime.timedelta(hours=1)
+        with mock.patch('google.auth._helpers.utcnow', return_value=later):
+            with pytest.raises(ValueError) as excinfo:
+                jwt.decode(token, certs=PUBLIC_CERT_BYTES, cache=cache)
+
+        assert excinfo.match(r'Token expired')
+
+    def test_expires_with_token(self, token_factory):
+        cache = jwt.VerifiedTokenCache()
+        token = token_factory()
+        payload = jwt.decode(token, certs=PUBLIC_CERT_BYTES, cache=cache)
+
+        expiry = payload['exp'] + jwt._CLOCK_SKEW_SECS
+        with mock.patch('time.time', return_value=expiry):
+            assert cache.get(token, PUBLIC_CERT_BYTES, None) is None
+
+        assert cache.info().currsize == 0
+
+    def test_not_cached_when_invalid(self, token_factory):
+        cache = jwt.VerifiedTokenCache()
+
+        with pytest.raises(ValueError):
+            jwt.decode(token_factory(), certs=OTHER_CERT_BYTES, cache=cache)
+
+        assert cache.info().currsize == 0
+
+    def test_unverified_not_cached(self, token_factory):
+        cache = jwt.VerifiedTokenCache()
+
+        jwt.decode(token_factory(), verify=False, cache=cache)
+
+        assert cache.info().currsize == 0
+
+    def test_clear(self, token_factory):
+        cache = jwt.VerifiedTokenCache(maxsize=1)
+        jwt.decode(token_factory(), certs=PUBLIC_CERT_BYTES, cache=cache)
+
+        cache.clear()
+
+        assert cache.info() == (0, 0, 1, 0)
+
+
+def test_decode_many(token_factory):
+    tokens = [
+        token_factory(),
+        token_factory(claims={'user': 'alice'}),
+        b'not-a-token',
+        token_factory(claims={'aud': 'other@example.com'}),
+        token_factory(key_id='3'),
+    ]
+    certs = {'1': PUBLIC_CERT_BYTES, '2': OTHER_CERT_BYTES}
+
+    results = jwt.decode_many(
+        tokens, certs=certs, audience='audience@example.com')
+
+    assert len(results) == 5
+    assert results[0].claims['user'] == 'billy bob'
+    assert results[0].error is None
+    assert results[1].claims['user'] == 'alice'
+    for result, message in zip(results[2:], (
+            'Wrong number of segments',
+            'Token has wrong audience',
+            'Certificate for key id 3 not found')):
+        assert result.claims is None
+        assert isinstance(result.error, ValueError)
+        assert result.error.args[0].startswith(message)
+
+
+@pytest.mark.parametrize('certs', [
+    PUBLIC_CERT_BYTES, {'1': PUBLIC_CERT_BYTES}])
+def test_decode_many_invalid_header(token_factory, certs):
+    tokens = [
+        _make_token(['kid', '1'], {}),
+        _make_token({'kid': ['1']}, {}),
+        token_factory(),
+    ]
+
+    results = jwt.decode_many(tokens, certs=certs)
+
+    for result in results[:2]:
+        assert result.claims is None
+        assert isinstance(result.error, ValueError)
+    assert results[2].claims['user'] == 'billy bob'
+
+
+def test_decode_many_parses_certs_once(token_factory):
+    tokens = [token_factory() for _ in range(3)]
+    certs = {'1': PUBLIC_CERT_BYTES}
+
+    with mock.patch(
+            'google.auth.crypt.RSAVerifier.from_string',
+            wraps=crypt.RSAVerifier.from_string) as from_string:
+        results = jwt.decode_many(tokens, certs=certs)
+
+    assert all(result.error is None for result in results)
+    from_string.assert_called_once_with(PUBLIC_CERT_BYTES)
+
+
+def test_decode_many_wrong_cert(token_factory):
+    results = jwt.decode_many(
+        [token_factory(), token_factory(key_id=False)],
+        certs=OTHER_CERT_BYTES)
+
+    for result in results:
+        assert result.claims is None
+        assert result.error.args[0] == 'Could not verify token signature.'
+
+
+def test_decode_many_multiple_certs(token_factory):
+    results = jwt.decode_many(
+        [token_factory(key_id=False)],
+        certs=[OTHER_CERT_BYTES, PUBLIC_CERT_BYTES])
+
+    assert results[0].claims['user'] == 'billy bob'
+
+
+def test_decode_many_expired(token_factory):
+    token = token_factory(claims={
+        'iat': _helpers.datetime_to_secs(
+            _helpers.utcnow() - datetime.timedelta(hours=2)),
+        'exp': _helpers.datetime_to_secs(
+            _helpers.utcnow() - datetime.timedelta(hours=1))
+    })
+
+    result, = jwt.decode_many([token], certs=PUBLIC_CERT_BYTES)
+
+    assert result.error.args[0].startswith('Token expired')
+
+
+def test_decode_many_invalid_cert(token_factory):
+    results = jwt.decode_many(
+        [token_factory(), token_factory(key_id='2'), token_factory()],
+        certs={'1': b'bogus', '2': PUBLIC_CERT_BYTES})
+
+    # Only the tokens that need the invalid certificate fail.
+    assert isinstance(results[0].error, ValueError)
+    assert results[1].claims['user'] == 'billy bob'
+    assert results[2].error is results[0].error
+
+
+def test_decode_many_unverified(token_factory):
+    result, = jwt.decode_many(
+        [token_factory()], certs=OTHER_CERT_BYTES, verify=False)
+
+    assert result == jwt.DecodeResult(result.claims, None)
+    assert result.claims['user'] == 'billy bob'
+
+
+def test_decode_parallel(token_factory):
+    tokens = [
+        token_factory(claims={'user': str(index)}) for index in range(5)]
+    tokens.insert(2, b'not-a-token')
+
+    results = list(jwt.decode_parallel(
+        tokens, {'1': PUBLIC_CERT_BYTES}, audience='audience@example.com',
+        processes=2, chunksize=2))
+
+    assert [result.claims['user'] for result in results if result.claims] == [
+        '0', '1', '2', '3', '4']
+    assert results[2].claims is None
+    assert isinstance(results[2].error, ValueError)
+
+
+def test_decode_parallel_reads_tokens_lazily(token_factory):
+    token = token_factory()
+    read = []
+
+    def tokens():
+        for index in range(100):
+            read.append(index)
+            yield token
+
+    results = jwt.decode_parallel(
+        tokens(), PUBLIC_CERT_BYTES, processes=1, chunksize=1)
+    first = next(results)
+
+    assert first.claims['user'] == 'billy bob'
+    assert len(read) <= jwt._PARALLEL_CHUNKS_IN_FLIGHT_PER_PROCESS + 1
+
+    rest = list(results)
+
+    assert len(rest) == 99
+    assert all(result.claims is not None for result in rest)
+
+
+def test_decode_parallel_invalid_header(token_factory):
+    tokens = [_make_token({'kid': ['1']}, {}), token_factory()]
+
+    results = list(jwt.decode_parallel(
+        tokens, {'1': PUBLIC_CERT_BYTES}, processes=1, chunksize=1))
+
+    assert isinstance(results[0].error, ValueError)
+    assert results[1].claims['user'] == 'billy bob'
+
+
+def _exit_worker(tokens):  # pragma: NO COVER
+    # Runs in the worker process.
+    os._exit(1)
+
+
+@mock.patch('google.auth.jwt._PARALLEL_WORKER_CHECK_INTERVAL', 0.01)
+@mock.patch('google.auth.jwt._decode_chunk', _exit_worker)
+def test_decode_parallel_worker_exited(token_factory):
+    results = jwt.decode_parallel(
+        [token_factory()], PUBLIC_CERT_BYTES, processes=1)
+
+    with pytest.raises(RuntimeError):
+        next(results)
+
+
+def test__get_chunk_results():
+    async_result = mock.Mock(spec=['get'])
+    async_result.get.side_effect = [
+        multiprocessing.TimeoutError(), mock.sentinel.results]
+    worker = mock.Mock(spec=['exitcode'], exitcode=None)
+
+    assert jwt._get_chunk_results(async_result, [worker]) == (
+        mock.sentinel.results)
+    async_result.get.assert_called_with(jwt._PARALLEL_WORKER_CHECK_INTERVAL)
+
+
+@mock.patch('multiprocessing.cpu_count', return_value=1)
+def test_decode_parallel_default_processes(cpu_count, token_factory):
+    result, = jwt.decode_parallel([token_factory()], PUBLIC_CERT_BYTES)
+
+    assert result.claims['user'] == 'billy bob'
+    cpu_count.assert_called_once_with()
+
+
+@pytest.mark.parametrize('certs', [None, 1, [PUBLIC_CERT_BYTES, None]])
+@mock.patch('multiprocessing.Pool', autospec=True)
+def test_decode_parallel_invalid_certs(pool, certs):
+    with pytest.raises(ValueError):
+        next(jwt.decode_parallel([b'a.b.c'], certs, processes=1))
+
+    # The certificates are checked before starting any workers.
+    assert not pool.called
+
+
+def test__normalize_certs():
+    certs = {'1': PUBLIC_CERT_BYTES}
+    assert jwt._normalize_certs(certs) == certs
+    assert jwt._normalize_certs(PUBLIC_CERT_BYTES) == PUBLIC_CERT_BYTES
+    assert jwt._normalize_certs(iter([PUBLIC_CERT_BYTES])) == [
+        PUBLIC_CERT_BYTES]
+
+
+def test__chunks():
+    assert list(jwt._chunks(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(jwt._chunks([], 2)) == []
+
+
+@mock.patch('google.auth.jwt._worker_audience', None)
+@mock.patch('google.auth.jwt._worker_certs', None)
+@pytest.mark.parametrize('certs', [
+    PUBLIC_CERT_BYTES,
+    [PUBLIC_CERT_BYTES, b'bogus'],
+    {'1': PUBLIC_CERT_BYTES}])
+def test_decode_worker(token_factory, certs):
+    jwt._init_decode_worker(certs, 'audience@example.com')
+
+    result, = jwt._decode_chunk([token_factory()])
+
+    assert result.claims['user'] == 'billy bob'
+
+
+@mock.patch('google.auth.jwt._worker_audience', None)
+@mock.patch('google.auth.jwt._worker_certs', None)
+def test_decode_worker_unexpected_error():
+    with mock.patch(
+            'google.auth.crypt.RSAVerifier.from_string',
+            side_effect=TypeError()):
+        # Errors must not escape the initializer, or the pool would restart
+        # the worker forever.
+        jwt._init_decode_worker(PUBLIC_CERT_BYTES, None)
+
+    assert jwt._worker_certs == PUBLIC_CERT_BYTES
+
+
 class TestCredentials:
     SERVICE_ACCOUNT_EMAIL = 'service-account@example.com'
     SUBJECT = 'subject'
@@ -311,6 +794,15 @@ class TestCredentials:
         assert self.credentials.valid
         assert not self.credentials.expired
 
+    def test_refresh_reuses_encoder(self):
+        self.credentials.refresh(None)
+        encoder = self.credentials._encoder
+
+        self.credentials.refresh(None)
+
+        assert self.credentials._encoder is encoder
+        self._verify_token(self.credentials.token)
+
     def test_expired(self):
         assert not self.credentials.expired
 
@@ -343,3 +835,143 @@ class TestCredentials:
         self.credentials.before_request(
             None, 'GET', 'http://example.com?a=1#3', {})
         assert self.credentials.valid
+
+
+class TestOnDemandCredentials(object):
+    SERVICE_ACCOUNT_EMAIL = 'service-account@example.com'
+    SUBJECT = 'subject'
+    ADDITIONAL_CLAIMS = {'meta': 'data'}
+    credentials = None
+
+    @pytest.fixture(autouse=True)
+    def credentials_fixture(self, signer):
+        self.credentials = jwt.OnDemandCredentials(
+            signer, self.SERVICE_ACCOUNT_EMAIL, self.SERVICE_ACCOUNT_EMAIL,
+            max_cache_size=2)
+
+    def test_from_service_account_info(self):
+        credentials = jwt.OnDemandCredentials.from_service_account_info(
+            SERVICE_ACCOUNT_INFO)
+
+        assert credentials._signer.key_id == (
+            SERVICE_ACCOUNT_INFO['private_key_id'])
+        assert credentials._issuer == SERVICE_ACCOUNT_INFO['client_email']
+        assert credentials._subject == SERVICE_ACCOUNT_INFO['client_email']
+
+    def test_from_service_account_info_args(self):
+        credentials = jwt.OnDemandCredentials.from_service_account_info(
+            SERVICE_ACCOUNT_INFO, subject=self.SUBJECT,
+            additional_claims=self.ADDITIONAL_CLAIMS)
+
+        assert credentials._subject == self.SUBJECT
+        assert credentials._additional_claims == self.ADDITIONAL_CLAIMS
+
+    def test_from_service_account_file(self):
+        credentials = jwt.OnDemandCredentials.from_service_account_file(
+            SERVICE_ACCOUNT_JSON_FILE)
+
+        assert credentials._signer.key_id == (
+            SERVICE_ACCOUNT_INFO['private_key_id'])
+        assert credentials._issuer == SERVICE_ACCOUNT_INFO['client_email']
+        assert credentials._subject == SERVICE_ACCOUNT_INFO['client_email']
+
+    def test_from_signing_credentials(self):
+        jwt_from_signing = jwt.OnDemandCredentials.from_signing_credentials(
+            self.credentials)
+
+        assert isinstance(jwt_from_signing, jwt.OnDemandCredentials)
+        assert jwt_from_signing._signer == self.credentials._signer
+        assert jwt_from_signing._issuer == self.SERVICE_ACCOUNT_EMAIL
+        assert jwt_from_signing._subject == self.SERVICE_ACCOUNT_EMAIL
+
+    def test_default_state(self):
+        # Tokens are generated on demand, so these are always valid.
+        assert self.credentials.valid
+        assert not self.credentials.expired
+
+    def test_with_claims(self):
+        new_credentials = self.credentials.with_claims(
+            subject=self.SUBJECT, additional_claims=self.ADDITIONAL_CLAIMS)
+
+        assert new_credentials._signer == self.credentials._signer
+        assert new_credentials._issuer == self.credentials._issuer
+        assert new_credentials._subject == self.SUBJECT
+        assert new_credentials._additional_claims == self.ADDITIONAL_CLAIMS
+        assert new_credentials._cache.maxsize == 2
+
+    def test_sign_bytes(self):
+        to_sign = b'123'
+        signature = self.credentials.sign_bytes(to_sign)
+        assert crypt.verify_signature(to_sign, signature, PUBLIC_CERT_BYTES)
+
+    def test_signer(self):
+        assert isinstance(self.credentials.signer, crypt.RSASigner)
+
+    def test_signer_email(self):
+        assert (self.credentials.signer_email ==
+                SERVICE_ACCOUNT_INFO['client_email'])
+
+    def _get_token(self, url):
+        headers = {}
+        self.credentials.before_request(None, 'GET', url, headers)
+        _, token = headers['authorization'].split(' ')
+        return token
+
+    def test_before_request(self):
+        token = self._get_token('http://example.com/path?a=1#3')
+
+        payload = jwt.decode(token, PUBLIC_CERT_BYTES)
+        assert payload['iss'] == self.SERVICE_ACCOUNT_EMAIL
+        assert payload['aud'] == 'http://example.com/path'
+
+    def test_refresh(self):
+        token = self._get_token('http://example.com/path')
+
+        with mock.patch(
+                'google.auth._helpers.utcnow',
+                return_value=_helpers.utcnow() + datetime.timedelta(
+                    seconds=1)):
+            self.credentials.refresh(None)
+            new_token = self._get_token('http://example.com/path')
+
+        # A rejected token is replaced rather than used again.
+        assert new_token != token
+        assert jwt.decode(new_token, PUBLIC_CERT_BYTES)['aud'] == (
+            'http://example.com/path')
+
+    def test_before_request_reuses_token(self):
+        token = self._get_token('http://example.com/path?a=1')
+
+        with mock.patch('google.auth.jwt.Encoder.encode') as encode:
+            assert self._get_token('http://example.com/path?b=2') == token
+            assert not encode.called
+
+    def test_before_request_token_per_audience(self):
+        token_a = self._get_token('http://a.example.com/')
+        token_b = self._get_token('http://b.example.com/')
+
+        assert token_a != token_b
+        assert jwt.decode(token_b, PUBLIC_CERT_BYTES)['aud'] == (
+            'http://b.example.com/')
+
+    def test_before_request_evicts_least_recently_used(self):
+        token_a = self._get_token('http://a.example.com/')
+        self._get_token('http://b.example.com/')
+        self._get_token('http://c.example.com/')
+
+        assert len(self.credentials._cache) == 2
+        # The token for a was evicted, so a new one is made.
+        with mock.patch('google.auth.jwt.Encoder.encode', return_value=b'new'):
+            assert self._get_token('http://a.example.com/') != token_a
+
+    def test_before_request_renews_before_expiry(self):
+        token = self._get_token('http://example.com/')
+        payload = jwt.decode(token, PUBLIC_CERT_BYTES)
+
+        renew_at = payload['exp'] - _helpers.CLOCK_SKEW_SECS
+        with mock.patch('time.time', return_value=renew_at - 1):
+            assert self._get_token('http://example.com/') == token
+        with mock.patch('time.time', return_value=renew_at):
+            with mock.patch(
+                    'google.auth.jwt.Encoder.encode', return_value=b'new'):
+                assert self._get_token('http://example.com/') == 'new'
@@ -0,0 +1,254 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import io
+import os
+import socket
+import stat
+import threading
+
+import mock
+import pytest
+
+from google.auth import credentials
+from google.auth import exceptions
+from google.auth import token_broker
+
+
+class FakeTokenEndpointCredentials(credentials.Credentials):
+    def __init__(self):
+        super(FakeTokenEndpointCredentials, self).__init__()
+        self.refresh_count = 0
+        self.error = None
+
+    def refresh(self, request):
+        if self.error is not None:
+            raise self.error
+        self.refresh_count += 1
+        self.token = 'token-{}'.format(self.refresh_count)
+        self.expiry = datetime.datetime(2100, 1, 1)
+
+
+@pytest.fixture
+def source_credentials():
+    return FakeTokenEndpointCredentials()
+
+
+@pytest.fixture
+def socket_path(tmpdir):
+    return str(tmpdir.join('token.sock'))
+
+
+@pytest.fixture
+def broker(socket_path, source_credentials):
+    broker = token_broker.TokenBroker(
+        socket_path, source_credentials, mock.sentinel.request)
+    thread = threading.Thread(
+        target=broker.serve_forever, kwargs={'poll_interval': 0.01})
+    thread.start()
+    yield broker
+    broker.shutdown()
+    thread.join()
+    broker.close()
+
+
+def test_refresh(broker, socket_path, source_credentials):
+    client = token_broker.Credentials(socket_path)
+
+    client.refresh(None)
+
+    assert client.token == 'token-1'
+    assert client.expiry == datetime.datetime(2100, 1, 1)
+    assert client.valid
+
+
+def test_refresh_shares_token(broker, socket_path, source_credentials):
+    clients = [token_broker.Credentials(socket_path) for _ in range(5)]
+
+    for client in clients:
+        client.refresh(None)
+
+    assert source_credentials.refresh_count == 1
+    assert [client.token for client in clients] == ['token-1'] * 5
+
+
+def test_refresh_rejected_token(broker, socket_path, source_credentials):
+    client = token_broker.Credentials(socket_path)
+    client.refresh(None)
+
+    # Refreshing again means the current token was rejected.
+    client.refresh(None)
+
+    assert source_credentials.refresh_count == 2
+    assert client.token == 'token-2'
+
+
+def test_refresh_broker_error(broker, socket_path, source_credentials):
+    source_credentials.error = exceptions.RefreshError('no token for you')
+    client = token_broker.Credentials(socket_path)
+
+    with pytest.raises(exceptions.RefreshError) as excinfo:
+        client.refresh(None)
+
+    assert excinfo.match('no token for you')
+
+
+def test_refresh_no_broker(socket_path):
+    client = token_broker.Credentials(socket_path)
+
+    with pytest.raises(exceptions.RefreshError) as excinfo:
+        client.refresh(None)
+
+    assert excinfo.match(socket_path)
+
+
+def test_refresh_no_expiry(broker, socket_path):
+    with mock.patch.object(
+            broker, 'get_token',
+            return_value={'access_token': 'token', 'expiry': None}):
+        client = token_broker.Credentials(socket_path)
+        client.refresh(None)
+
+    assert client.token == 'token'
+    assert client.expiry is None
+
+
+def test_refresh_invalid_response(broker, socket_path):
+    with mock.patch.object(broker, 'get_token', return_value={}):
+        client = token_broker.Credentials(socket_path)
+
+        with pytest.raises(exceptions.RefreshError) as excinfo:
+            client.refresh(None)
+
+    assert excinfo.match('No access token')
+
+
+def test_broker_invalid_request(broker, socket_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+    sock_file = sock.makefile('rwb')
+    sock_file.write(b'[]\n')
+    sock_file.flush()
+
+    response = token_broker._read_message(sock_file)
+
+    sock_file.close()
+    sock.close()
+    assert response['error'].startswith('Invalid request')
+
+
+def test_broker_socket_permissions(broker, socket_path):
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+
+@mock.patch('os.umask', autospec=True)
+def test_broker_socket_mode_on_listen(umask, socket_path, source_credentials):
+    modes = []
+    original_activate = token_broker._Server.server_activate
+
+    def server_activate(server):
+        modes.append(stat.S_IMODE(os.stat(socket_path).st_mode))
+        original_activate(server)
+
+    with mock.patch.object(
+            token_broker._Server, 'server_activate', server_activate):
+        broker = token_broker.TokenBroker(
+            socket_path, source_credentials, mock.sentinel.request)
+    broker.close()
+
+    # The socket's mode was set before anyone could connect, without
+    # changing the process-wide umask.
+    assert modes == [0o600]
+    assert not umask.called
+
+
+@mock.patch('os.chmod', autospec=True, side_effect=OSError())
+def test_broker_chmod_error(chmod, socket_path, source_credentials):
+    with mock.patch.object(
+            token_broker._Server, 'server_close', autospec=True) as close:
+        with pytest.raises(OSError):
+            token_broker.TokenBroker(
+                socket_path, source_credentials, mock.sentinel.request)
+
+    assert close.called
+
+
+def test_broker_bind_error(tmpdir, source_credentials):
+    socket_path = str(tmpdir.join('missing', 'token.sock'))
+
+    with mock.patch.object(
+            token_broker._Server, 'server_close', autospec=True) as close:
+        with pytest.raises(socket.error):
+            token_broker.TokenBroker(
+                socket_path, source_credentials, mock.sentinel.request)
+
+    assert close.called
+
+
+def test_broker_close_socket_removed(socket_path, source_credentials):
+    broker = token_broker.TokenBroker(
+        socket_path, source_credentials, mock.sentinel.request)
+    os.unlink(socket_path)
+
+    broker.close()
+
+    assert not os.path.exists(socket_path)
+
+
+def test_read_message_incomplete():
+    with pytest.raises(ValueError) as excinfo:
+        token_broker._read_message(io.BytesIO(b'{"access_token": "t'))
+
+    assert excinfo.match('Incomplete message')
+
+
+def test_broker_replaces_stale_socket(socket_path, source_credentials):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    broker = token_broker.TokenBroker(
+        socket_path, source_credentials, mock.sentinel.request)
+    broker.close()
+
+    assert not os.path.exists(socket_path)
+
+
+def test_broker_keeps_other_files(socket_path, source_credentials):
+    with open(socket_path, 'w') as file_obj:
+        file_obj.write('data')
+
+    with pytest.raises(socket.error):
+        token_broker.TokenBroker(
+            socket_path, source_credentials, mock.sentinel.request)
+
+    with open(socket_path) as file_obj:
+        assert file_obj.read() == 'data'
+
+
+@mock.patch('google.auth.token_broker.TokenBroker', autospec=True)
+@mock.patch(
+    'google.auth.default', autospec=True,
+    return_value=(mock.sentinel.credentials, None))
+def test_main(default, broker_class):
+    token_broker.main(['--socket', 'token.sock', '--scopes', 'a', 'b'])
+
+    default.assert_called_once_with(scopes=['a', 'b'])
+    socket_path, source_credentials, _ = broker_class.call_args[0]
+    assert socket_path == 'token.sock'
+    assert source_credentials == mock.sentinel.credentials
+    broker = broker_class.return_value
+    broker.serve_forever.assert_called_once_with()
+    broker.close.assert_called_once_with()
@@ -0,0 +1,163 @@
+# Copyright 2016 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import os
+import stat
+
+import mock
+import pytest
+
+from google.auth import _cache
+from google.auth import _helpers
+from google.auth import token_cache
+
+
+def test_make_key():
+    key = token_cache.make_key('type', 'email', ['scope'], None)
+
+    assert key == token_cache.make_key('type', 'email', ['scope'], None)
+    assert key != token_cache.make_key('type', 'email', ['other'], None)
+    assert key != token_cache.make_key('type', 'email', ['scope'], 'sub')
+
+
+def test_make_key_claims_order():
+    assert (token_cache.make_key({'a': 1, 'b': 2}) ==
+            token_cache.make_key({'b': 2, 'a': 1}))
+
+
+class TestSQLiteTokenCache(object):
+    @pytest.fixture
+    def path(self, tmpdir):
+        return str(tmpdir.join('tokens.db'))
+
+    @pytest.fixture
+    def cache(self, path):
+        return token_cache.SQLiteTokenCache(path)
+
+    def test_get_missing(self, cache):
+        assert cache.get('key') is None
+
+    def test_set_and_get(self, cache):
+        expiry = datetime.datetime(2100, 1, 1)
+
+        cache.set('key', 'token', expiry)
+
+        assert cache.get('key') == ('token', expiry)
+
+    def test_set_and_get_no_expiry(self, cache):
+        cache.set('key', 'token', None)
+
+        assert cache.get('key') == ('token', None)
+
+    def test_set_replaces(self, cache):
+        cache.set('key', 'token', None)
+        cache.set('key', 'token2', None)
+
+        assert cache.get('key') == ('token2', None)
+
+    def test_get_expired(self, cache):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=1)
+
+        cache.set('key', 'token', expiry)
+
+        # Tokens that expire within the clock skew are not returned.
+        assert cache.get('key') is None
+
+    def test_set_purges_expired(self, cache, path):
+        expired = _helpers.utcnow() - datetime.timedelta(hours=1)
+        cache.set('expired', 'token', expired)
+        cache.set('key', 'token', None)
+
+        connection = cache._connect()
+        rows = connection.execute('SELECT key FROM tokens').fetchall()
+        connection.close()
+
+        assert rows == [('key',)]
+
+    def test_shared_between_instances(self, cache, path):
+        expiry = datetime.datetime(2100, 1, 1)
+        cache.set('key', 'token', expiry)
+
+        other_cache = token_cache.SQLiteTokenCache(path)
+
+        assert other_cache.get('key') == ('token', expiry)
+
+    def test_file_permissions(self, cache, path):
+        cache.set('key', 'token', None)
+
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        assert mode == 0o600
+
+
+class TestMemoryTokenCache(object):
+    @pytest.fixture
+    def cache(self):
+        return token_cache.MemoryTokenCache(maxsize=2)
+
+    def test_get_missing(self, cache):
+        assert cache.get('key') is None
+
+    def test_set_and_get(self, cache):
+        expiry = datetime.datetime(2100, 1, 1)
+
+        cache.set('key', 'token', expiry)
+
+        assert cache.get('key') == ('token', expiry)
+        assert len(cache) == 1
+
+    def test_set_and_get_no_expiry(self, cache):
+        cache.set('key', 'token', None)
+
+        assert cache.get('key') == ('token', None)
+
+    def test_get_expired(self, cache):
+        expiry = _helpers.utcnow() + datetime.timedelta(seconds=1)
+
+        cache.set('key', 'token', expiry)
+
+        assert cache.get('key') is None
+        # The entry was evicted by the lookup.
+        assert len(cache) == 0
+
+    def test_get_expired_mocked_time(self, cache):
+        expiry = datetime.datetime(2100, 1, 1)
+        cache.set('key', 'token', expiry)
+
+        with mock.patch(
+                'google.auth._helpers.utcnow', return_value=expiry):
+            assert cache.get('key') is None
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.set('a', 'token-a', None)
+        cache.set('b', 'token-b', None)
+        cache.get('a')
+        cache.set('c', 'token-c', None)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == ('token-a', None)
+        assert cache.get('c') == ('token-c', None)
+
+    def test_clear_and_info(self, cache):
+        cache.set('key', 'token', None)
+        cache.get('key')
+        cache.get('other')
+
+        assert cache.info() == _cache.CacheInfo(
+            hits=1, misses=1, maxsize=2, currsize=1)
+
+        cache.clear()
+
+        assert cache.info() == _cache.CacheInfo(
+            hits=0, misses=0, maxsize=2, currsize=0)
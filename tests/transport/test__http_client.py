@@ -12,7 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import errno
+import os
+import socket
+import threading
+
+import mock
 import pytest
+from six.moves import BaseHTTPServer
+from six.moves import http_client
 
 from google.auth import exceptions
 import google.auth.transport._http_client
@@ -27,6 +35,222 @@ class TestRequestResponse(compliance.RequestResponseTests):
     def test_non_http(self):
         request = self.make_request()
         with pytest.raises(exceptions.TransportError) as excinfo:
-            request(url='https://{}'.format(compliance.NXDOMAIN), method='GET')
+            request(url='ftp://{}'.format(compliance.NXDOMAIN), method='GET')
+
+        assert excinfo.match('ftp')
+
+
+class KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Send the headers and body without waiting for the client's delayed
+    # ACK, as a real server would.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.client_ports.add(self.client_address[1])
+        body = b'content'
+        self.send_response(http_client.OK)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def keep_alive_server():
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.client_ports = set()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def url(keep_alive_server):
+    keep_alive_server.client_ports.clear()
+    return 'http://127.0.0.1:{}/'.format(keep_alive_server.server_port)
+
+
+class TestConnectionPool(object):
+    def test_reuses_connection(self, keep_alive_server, url):
+        pool = google.auth.transport._http_client.ConnectionPool()
+        request = google.auth.transport._http_client.Request(pool=pool)
+
+        for _ in range(3):
+            response = request(url=url, timeout=5)
+            assert response.status == http_client.OK
+            assert response.data == b'content'
+
+        assert len(keep_alive_server.client_ports) == 1
+        pool.clear()
+
+    def test_idle_timeout(self, keep_alive_server, url):
+        pool = google.auth.transport._http_client.ConnectionPool(
+            idle_timeout=0)
+        request = google.auth.transport._http_client.Request(pool=pool)
+
+        request(url=url)
+        request(url=url)
+
+        assert len(keep_alive_server.client_ports) == 2
+
+    def test_max_idle_per_host(self):
+        pool = google.auth.transport._http_client.ConnectionPool(
+            max_idle_per_host=1)
+        first, second = mock.Mock(sock=None), mock.Mock(sock=None)
+
+        pool.release('http', 'example.com', first)
+        pool.release('http', 'example.com', second)
+
+        first.close.assert_called_once_with()
+        connection, reused = pool.acquire('http', 'example.com', 5)
+        assert connection is second
+        assert reused
+        assert second.timeout == 5
+
+    def test_acquire_other_host(self):
+        pool = google.auth.transport._http_client.ConnectionPool()
+        pool.release('http', 'example.com', mock.Mock(sock=None))
+
+        connection, reused = pool.acquire('http', 'example.org', 5)
+
+        assert connection.host == 'example.org'
+        assert not reused
+
+    def test_acquire_https(self):
+        pool = google.auth.transport._http_client.ConnectionPool()
+
+        connection, reused = pool.acquire('https', 'example.com:8443', 5)
+
+        assert isinstance(connection, http_client.HTTPSConnection)
+        assert connection.port == 8443
+        assert not reused
+
+    def test_acquire_sets_socket_timeout(self):
+        pool = google.auth.transport._http_client.ConnectionPool()
+        connection = mock.Mock()
+        pool.release('http', 'example.com', connection)
+
+        pool.acquire('http', 'example.com', socket._GLOBAL_DEFAULT_TIMEOUT)
+
+        connection.sock.settimeout.assert_called_once_with(
+            socket.getdefaulttimeout())
+
+    def test_fork(self):
+        pool = google.auth.transport._http_client.ConnectionPool()
+        connection = mock.Mock(sock=None)
+        pool.release('http', 'example.com', connection)
+
+        with mock.patch('os.getpid', return_value=-1):
+            new_connection, reused = pool.acquire('http', 'example.com', 5)
+
+        assert new_connection is not connection
+        assert not reused
+        # The parent's connection is left alone.
+        assert not connection.close.called
+
+    def test_initialized_by_another_thread(self):
+        pool = google.auth.transport._http_client.ConnectionPool()
+
+        class InitLock(object):
+            def __enter__(self):
+                # Another thread initialized the pool while this one was
+                # waiting for the lock.
+                pool._pid = os.getpid()
+
+            def __exit__(self, *args):
+                pass
+
+        pool._init_lock = InitLock()
+
+        pool._reset_if_needed()
+
+        assert pool._idle is None
+
+    def test_clear(self):
+        pool = google.auth.transport._http_client.ConnectionPool()
+        connection = mock.Mock(sock=None)
+        pool.release('http', 'example.com', connection)
+
+        pool.clear()
+
+        connection.close.assert_called_once_with()
+        assert not pool.acquire('http', 'example.com', 5)[1]
+
+
+@pytest.mark.parametrize('error', [
+    socket.error(errno.ECONNRESET, 'Connection reset'),
+    socket.error(errno.EPIPE, 'Broken pipe'),
+    http_client.BadStatusLine('')])
+def test_request_retries_stale_connection(url, error):
+    pool = google.auth.transport._http_client.ConnectionPool()
+    stale = mock.Mock(sock=None)
+    stale.request.side_effect = error
+    pool.release('http', url[len('http://'):-1], stale)
+    request = google.auth.transport._http_client.Request(pool=pool)
+
+    response = request(url=url)
+
+    assert response.status == http_client.OK
+    stale.close.assert_called_once_with()
+    pool.clear()
+
+
+@pytest.mark.parametrize('error', [
+    socket.timeout('timed out'),
+    socket.error(errno.ECONNREFUSED, 'Connection refused'),
+    http_client.IncompleteRead(b'')])
+def test_request_reused_connection_error_not_retried(error):
+    pool = mock.create_autospec(
+        google.auth.transport._http_client.ConnectionPool, instance=True)
+    connection = mock.Mock()
+    connection.getresponse.side_effect = error
+    pool.acquire.return_value = (connection, True)
+    request = google.auth.transport._http_client.Request(pool=pool)
+
+    # The request may have reached the server, so it isn't sent again.
+    with pytest.raises(exceptions.TransportError):
+        request(url='http://example.com', method='POST', body=b'data')
+
+    connection.close.assert_called_once_with()
+    assert connection.request.call_count == 1
+    assert pool.acquire.call_count == 1
+
+
+def test_request_new_connection_error():
+    pool = mock.create_autospec(
+        google.auth.transport._http_client.ConnectionPool, instance=True)
+    connection = mock.Mock()
+    connection.request.side_effect = socket.error('Connection refused')
+    pool.acquire.return_value = (connection, False)
+    request = google.auth.transport._http_client.Request(pool=pool)
+
+    with pytest.raises(exceptions.TransportError):
+        request(url='http://example.com')
+
+    connection.close.assert_called_once_with()
+    assert pool.acquire.call_count == 1
+    assert not pool.release.called
+
+
+def test_request_server_closes_connection():
+    pool = mock.create_autospec(
+        google.auth.transport._http_client.ConnectionPool, instance=True)
+    connection = mock.Mock()
+    raw_response = connection.getresponse.return_value
+    raw_response.status = http_client.OK
+    raw_response.getheaders.return_value = []
+    raw_response.read.return_value = b''
+    raw_response.will_close = True
+    pool.acquire.return_value = (connection, False)
+    request = google.auth.transport._http_client.Request(pool=pool)
+
+    request(url='http://example.com')
 
-        assert excinfo.match('https')
+    connection.close.assert_called_once_with()
+    assert not pool.release.called
@@ -17,6 +17,7 @@ import requests
 import requests.adapters
 from six.moves import http_client
 
+import google.auth.credentials
 import google.auth.transport.requests
 from tests.transport import compliance
 
@@ -47,6 +48,20 @@ class MockCredentials(object):
         self.token += '1'
 
 
+class CredentialsImpl(google.auth.credentials.Credentials):
+    def __init__(self):
+        super(CredentialsImpl, self).__init__()
+        self.token = 'token'
+        self.refresh_count = 0
+
+    def apply(self, headers, token=None):
+        headers['authorization'] = self.token
+
+    def refresh(self, request):
+        self.refresh_count += 1
+        self.token += '1'
+
+
 class MockAdapter(requests.adapters.BaseAdapter):
     def __init__(self, responses, headers=None):
         self.responses = responses
@@ -116,3 +131,41 @@ class TestAuthorizedHttp(object):
 
         assert mock_adapter.requests[1].url == self.TEST_URL
         assert mock_adapter.requests[1].headers['authorization'] == 'token1'
+
+    def test_request_refresh_single_flight(self):
+        credentials = CredentialsImpl()
+        mock_adapter = MockAdapter([
+            make_response(status=http_client.UNAUTHORIZED),
+            make_response()])
+
+        authed_session = google.auth.transport.requests.AuthorizedSession(
+            credentials)
+        authed_session.mount(self.TEST_URL, mock_adapter)
+
+        authed_session.request('GET', self.TEST_URL)
+
+        # The credentials were valid, but the token was rejected.
+        assert credentials.refresh_count == 1
+        assert mock_adapter.requests[1].headers['authorization'] == 'token1'
+
+    def test_request_refresh_token_replaced(self):
+        credentials = CredentialsImpl()
+
+        class ReplacingAdapter(MockAdapter):
+            def send(self, request, **kwargs):
+                # Another thread refreshes while the request is in flight.
+                credentials.token = 'other'
+                return super(ReplacingAdapter, self).send(request, **kwargs)
+
+        mock_adapter = ReplacingAdapter([
+            make_response(status=http_client.UNAUTHORIZED),
+            make_response()])
+
+        authed_session = google.auth.transport.requests.AuthorizedSession(
+            credentials)
+        authed_session.mount(self.TEST_URL, mock_adapter)
+
+        authed_session.request('GET', self.TEST_URL)
+
+        assert credentials.refresh_count == 0
+        assert mock_adapter.requests[1].headers['authorization'] == 'other'
@@ -16,6 +16,7 @@ import mock
 from six.moves import http_client
 import urllib3
 
+import google.auth.credentials
 import google.auth.transport.urllib3
 from tests.transport import compliance
 
@@ -58,6 +59,20 @@ class MockCredentials(object):
         self.token += '1'
 
 
+class CredentialsImpl(google.auth.credentials.Credentials):
+    def __init__(self):
+        super(CredentialsImpl, self).__init__()
+        self.token = 'token'
+        self.refresh_count = 0
+
+    def apply(self, headers, token=None):
+        headers['authorization'] = self.token
+
+    def refresh(self, request):
+        self.refresh_count += 1
+        self.token += '1'
+
+
 class MockHttp(object):
     def __init__(self, responses, headers=None):
         self.responses = responses
@@ -121,6 +136,41 @@ class TestAuthorizedHttp(object):
             ('GET', self.TEST_URL, None, {'authorization': 'token'}, {}),
             ('GET', self.TEST_URL, None, {'authorization': 'token1'}, {})]
 
+    def test_urlopen_refresh_single_flight(self):
+        credentials = CredentialsImpl()
+        mock_http = MockHttp([
+            MockResponse(status=http_client.UNAUTHORIZED), MockResponse()])
+
+        authed_http = google.auth.transport.urllib3.AuthorizedHttp(
+            credentials, http=mock_http)
+
+        authed_http.urlopen('GET', self.TEST_URL)
+
+        # The credentials were valid, but the token was rejected.
+        assert credentials.refresh_count == 1
+        assert mock_http.requests[1][3] == {'authorization': 'token1'}
+
+    def test_urlopen_refresh_token_replaced(self):
+        credentials = CredentialsImpl()
+
+        class ReplacingHttp(MockHttp):
+            def urlopen(self, method, url, **kwargs):
+                # Another thread refreshes while the request is in flight.
+                credentials.token = 'other'
+                return super(ReplacingHttp, self).urlopen(
+                    method, url, **kwargs)
+
+        mock_http = ReplacingHttp([
+            MockResponse(status=http_client.UNAUTHORIZED), MockResponse()])
+
+        authed_http = google.auth.transport.urllib3.AuthorizedHttp(
+            credentials, http=mock_http)
+
+        authed_http.urlopen('GET', self.TEST_URL)
+
+        assert credentials.refresh_count == 0
+        assert mock_http.requests[1][3] == {'authorization': 'other'}
+
     def test_proxies(self):
         mock_http = mock.MagicMock()
 